@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+EXIF元数据持久缓存模块
+将提取的拍摄日期和常用标签保存在SQLite数据库中，文件未变化时不再解析EXIF
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# 添加路径
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import Config
+
+# 缓存表结构版本，结构或元数据内容变化时递增，旧数据会被丢弃
+SCHEMA_VERSION = 2
+
+# 累计这么多次写入后提交一次，批量处理大量文件时不必每条记录都同步到磁盘
+COMMIT_INTERVAL = 200
+
+MetadataLoader = Callable[[str], Dict[str, Any]]
+
+# 待写入缓存的记录: (绝对路径, 文件大小, 修改时间ns, 元数据)
+CacheEntry = Tuple[str, int, int, Dict[str, Any]]
+
+
+class TransientMetadata(dict):
+    """提取时发生I/O错误（如网络存储暂时不可用、权限错误）得到的元数据
+
+    提取函数返回该类型时结果不写入缓存，文件恢复可读后重新提取。
+    """
+
+
+class ExifMetadataCache:
+    """按 (绝对路径, 文件大小, 修改时间ns) 缓存EXIF元数据（线程安全）
+
+    每个路径只保留一条记录，文件大小或修改时间变化时重新提取并覆盖。
+    写入按 COMMIT_INTERVAL 批量提交，使用完毕后需调用 flush 或 close。
+    数据库无法打开时退化为只在本进程内有效的内存数据库。
+    """
+
+    def __init__(self, loader: MetadataLoader, db_path: str = None):
+        """初始化缓存
+
+        Args:
+            loader: 缓存未命中时调用的元数据提取函数，返回可JSON序列化的字典
+            db_path: 数据库文件路径，默认为配置目录下的 Config.EXIF_CACHE_FILE
+        """
+        self.loader = loader
+        self.db_path = db_path or Config.EXIF_CACHE_FILE
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending_writes = 0
+        self._lock = threading.Lock()
+
+    def _reset_lock(self):
+        """重建锁并丢弃连接（在fork出的子进程中调用，SQLite连接不能跨进程共享）"""
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pending_writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """打开数据库连接（调用方需持有锁）"""
+        if self._conn is not None:
+            return self._conn
+
+        try:
+            directory = os.path.dirname(os.path.abspath(self.db_path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        except (sqlite3.Error, OSError) as e:
+            print(f"Open EXIF cache failed, using memory cache: {e}")
+            conn = sqlite3.connect(":memory:", check_same_thread=False)
+
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            conn.execute("DROP TABLE IF EXISTS exif_metadata")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS exif_metadata ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " metadata TEXT NOT NULL)"
+        )
+        conn.commit()
+        self._conn = conn
+        return conn
+
+    def get(self, path: str, size: int, mtime_ns: int) -> Optional[Dict[str, Any]]:
+        """获取缓存的元数据，未命中或文件已变化时返回None"""
+        with self._lock:
+            try:
+                row = self._connect().execute(
+                    "SELECT size, mtime_ns, metadata FROM exif_metadata WHERE path = ?",
+                    (path,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"Read EXIF cache failed: {e}")
+                return None
+
+        if row is None or row[0] != size or row[1] != mtime_ns:
+            return None
+        return json.loads(row[2])
+
+    def put(self, path: str, size: int, mtime_ns: int, metadata: Dict[str, Any]):
+        """写入元数据，覆盖该路径的旧记录，累计到 COMMIT_INTERVAL 次后提交"""
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO exif_metadata (path, size, mtime_ns, metadata)"
+                    " VALUES (?, ?, ?, ?)",
+                    (path, size, mtime_ns, json.dumps(metadata, ensure_ascii=False))
+                )
+                self._pending_writes += 1
+                if self._pending_writes >= COMMIT_INTERVAL:
+                    conn.commit()
+                    self._pending_writes = 0
+            except sqlite3.Error as e:
+                print(f"Write EXIF cache failed: {e}")
+
+    def lookup(self, image_path: str) -> Tuple[Dict[str, Any], Optional[CacheEntry]]:
+        """获取图片的EXIF元数据但不写入缓存
+
+        Returns:
+            (元数据, 待写入的记录)，命中缓存或结果不应缓存时记录为None；
+            记录可交给另一进程中的缓存调用 put 保存（如命令行脚本只由主进程写入）
+        """
+        path = os.path.abspath(image_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # 文件不可访问时不缓存，由提取函数自行处理
+            return self.loader(image_path), None
+
+        metadata = self.get(path, stat.st_size, stat.st_mtime_ns)
+        if metadata is not None:
+            with self._lock:
+                self.hits += 1
+            return metadata, None
+
+        with self._lock:
+            self.misses += 1
+        metadata = self.loader(image_path)
+        if isinstance(metadata, TransientMetadata):
+            return metadata, None
+        return metadata, (path, stat.st_size, stat.st_mtime_ns, metadata)
+
+    def get_metadata(self, image_path: str) -> Dict[str, Any]:
+        """获取图片的EXIF元数据，文件未变化时直接使用缓存"""
+        metadata, entry = self.lookup(image_path)
+        if entry is not None:
+            self.put(*entry)
+        return metadata
+
+    def clear(self):
+        """清空缓存并重置计数"""
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute("DELETE FROM exif_metadata")
+                conn.commit()
+                self._pending_writes = 0
+            except sqlite3.Error as e:
+                print(f"Clear EXIF cache failed: {e}")
+            self.hits = 0
+            self.misses = 0
+
+    def flush(self):
+        """提交尚未提交的写入"""
+        with self._lock:
+            if self._conn is not None and self._pending_writes:
+                try:
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    print(f"Write EXIF cache failed: {e}")
+                self._pending_writes = 0
+
+    def close(self):
+        """提交写入并关闭数据库连接"""
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取缓存统计信息"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""
+EXIF头部读取模块
+只定位到 APP1/TIFF 头并遍历 IFD0 和 Exif 子IFD 读取所需标签，不解析整个文件
+"""
+
+import io
+import struct
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterable, Optional, Tuple, Union
+
+# 常用标签
+TAG_MAKE = 0x010F
+TAG_MODEL = 0x0110
+TAG_ORIENTATION = 0x0112
+TAG_DATETIME = 0x0132
+TAG_THUMBNAIL_OFFSET = 0x0201
+TAG_THUMBNAIL_LENGTH = 0x0202
+TAG_EXIF_IFD = 0x8769
+TAG_EXPOSURE_TIME = 0x829A
+TAG_F_NUMBER = 0x829D
+TAG_ISO = 0x8827
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_DATETIME_DIGITIZED = 0x9004
+TAG_FOCAL_LENGTH = 0x920A
+TAG_PIXEL_WIDTH = 0xA002
+TAG_PIXEL_HEIGHT = 0xA003
+TAG_LENS_MODEL = 0xA434
+
+# 日期标签按优先级排列
+DATE_TAGS = (TAG_DATETIME_ORIGINAL, TAG_DATETIME_DIGITIZED, TAG_DATETIME)
+
+# 常用标签 -> 元数据字段名
+COMMON_TAGS = {
+    TAG_MAKE: 'make',
+    TAG_MODEL: 'model',
+    TAG_ORIENTATION: 'orientation',
+    TAG_EXPOSURE_TIME: 'exposure_time',
+    TAG_F_NUMBER: 'f_number',
+    TAG_ISO: 'iso',
+    TAG_FOCAL_LENGTH: 'focal_length',
+    TAG_PIXEL_WIDTH: 'width',
+    TAG_PIXEL_HEIGHT: 'height',
+    TAG_LENS_MODEL: 'lens_model',
+}
+
+# 值为有理数的常用标签
+RATIONAL_TAGS = {TAG_EXPOSURE_TIME, TAG_F_NUMBER, TAG_FOCAL_LENGTH}
+
+# 数据类型 -> (单个值的字节数, struct格式)
+_TYPE_FORMATS = {
+    1: (1, 'B'),   # BYTE
+    2: (1, 's'),   # ASCII
+    3: (2, 'H'),   # SHORT
+    4: (4, 'L'),   # LONG
+    5: (8, 'LL'),  # RATIONAL
+    6: (1, 'b'),   # SBYTE
+    7: (1, 's'),   # UNDEFINED
+    8: (2, 'h'),   # SSHORT
+    9: (4, 'l'),   # SLONG
+    10: (8, 'll'), # SRATIONAL
+}
+
+# 单个IFD最多读取的条目数，防止损坏文件导致读取过多数据
+MAX_IFD_ENTRIES = 1024
+# 单个标签值最多读取的字节数
+MAX_VALUE_SIZE = 64 * 1024
+
+Source = Union[str, bytes, BinaryIO]
+
+
+class ExifFormatError(ValueError):
+    """文件格式不受支持或EXIF结构损坏"""
+
+
+class _TiffReader:
+    """在TIFF结构上按需读取IFD条目和标签值"""
+
+    def __init__(self, stream: BinaryIO, base: int):
+        self.stream = stream
+        self.base = base
+        stream.seek(base)
+        header = stream.read(8)
+        if len(header) < 8 or header[:2] not in (b'II', b'MM'):
+            raise ExifFormatError("Invalid TIFF header")
+        self.order = '<' if header[:2] == b'II' else '>'
+        magic, self.first_ifd = struct.unpack(self.order + 'HL', header[2:])
+        if magic != 42:
+            raise ExifFormatError("Invalid TIFF magic number")
+
+    def read_at(self, offset: int, size: int) -> bytes:
+        self.stream.seek(self.base + offset)
+        data = self.stream.read(size)
+        if len(data) < size:
+            raise ExifFormatError("Unexpected end of EXIF data")
+        return data
+
+    def read_entries(self, offset: int) -> Dict[int, tuple]:
+        """一次读取整个IFD条目表，返回 {标签: (类型, 数量, 值或偏移字段)}"""
+        count, = struct.unpack(self.order + 'H', self.read_at(offset, 2))
+        if count > MAX_IFD_ENTRIES:
+            raise ExifFormatError("Too many IFD entries")
+        table = self.read_at(offset + 2, count * 12)
+        entries = {}
+        for i in range(count):
+            tag, type_id, value_count = struct.unpack(self.order + 'HHL', table[i * 12:i * 12 + 8])
+            entries[tag] = (type_id, value_count, table[i * 12 + 8:i * 12 + 12])
+        return entries
+
+    def read_next_ifd(self, offset: int) -> int:
+        """读取IFD之后的下一个IFD偏移，没有时为0"""
+        count, = struct.unpack(self.order + 'H', self.read_at(offset, 2))
+        return struct.unpack(self.order + 'L', self.read_at(offset + 2 + count * 12, 4))[0]
+
+    def read_value(self, entry: tuple) -> Any:
+        """读取并解码标签值，不支持的类型返回None"""
+        type_id, count, field = entry
+        if type_id not in _TYPE_FORMATS:
+            return None
+        unit, fmt = _TYPE_FORMATS[type_id]
+        size = unit * count
+        if size > MAX_VALUE_SIZE:
+            return None
+        if size <= 4:
+            data = field[:size]
+        else:
+            data = self.read_at(struct.unpack(self.order + 'L', field)[0], size)
+
+        if type_id == 2:
+            return data.split(b'\0', 1)[0].decode('ascii', 'replace').strip()
+        if type_id == 7:
+            return data
+        values = struct.unpack(self.order + fmt * count, data)
+        if type_id in (5, 10):
+            values = tuple(zip(values[0::2], values[1::2]))
+        return values[0] if count == 1 else values
+
+
+def _find_tiff_base(stream: BinaryIO) -> Optional[int]:
+    """定位TIFF头的偏移，JPEG只扫描到APP1段，不含EXIF时返回None"""
+    stream.seek(0)
+    head = stream.read(4)
+    if head[:2] in (b'II', b'MM'):
+        return 0
+    if head[:2] != b'\xff\xd8':
+        raise ExifFormatError("Unsupported file format")
+
+    # 逐段跳过JPEG标记段，直到找到EXIF APP1或图像数据开始
+    position = 2
+    while True:
+        stream.seek(position)
+        marker = stream.read(4)
+        if len(marker) < 4 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code == 0xFF:
+            # 填充字节
+            position += 1
+            continue
+        if code in (0xD9, 0xDA):
+            # EOI / SOS 之后不会再有APP1
+            return None
+        length, = struct.unpack('>H', marker[2:])
+        if code == 0xE1 and stream.read(6) == b'Exif\0\0':
+            return position + 10
+        position += 2 + length
+
+
+def _open_source(source: Source):
+    """将路径、字节串或文件对象统一为可随机访问的流"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        data = bytes(source)
+        # 允许直接传入APP1段数据（以 "Exif\0\0" 开头）
+        if data.startswith(b'Exif\0\0'):
+            data = data[6:]
+        return io.BytesIO(data), False
+    if isinstance(source, str):
+        return open(source, 'rb'), True
+    return source, False
+
+
+def read_exif_tags(source: Source, tags: Iterable[int]) -> Dict[int, Any]:
+    """读取指定的EXIF标签
+
+    只读取TIFF头、IFD0和（需要时的）Exif子IFD的条目表，以及所需标签的值；
+    所需标签都已找到时不再读取Exif子IFD。
+
+    Args:
+        source: 文件路径、文件数据/APP1段数据或可随机访问的二进制文件对象
+        tags: 需要读取的标签
+
+    Returns:
+        {标签: 值}，只包含找到的标签；文件不含EXIF时返回空字典
+
+    Raises:
+        ExifFormatError: 文件格式不受支持或EXIF结构损坏
+    """
+    wanted = set(tags)
+    stream, owned = _open_source(source)
+    try:
+        base = _find_tiff_base(stream)
+        if base is None:
+            return {}
+        reader = _TiffReader(stream, base)
+
+        entries = reader.read_entries(reader.first_ifd)
+        found = {tag: entries[tag] for tag in wanted if tag in entries}
+
+        # 仍有标签未找到时才读取Exif子IFD
+        if len(found) < len(wanted) and TAG_EXIF_IFD in entries:
+            exif_offset = reader.read_value(entries[TAG_EXIF_IFD])
+            if isinstance(exif_offset, int):
+                exif_entries = reader.read_entries(exif_offset)
+                for tag in wanted:
+                    if tag in exif_entries:
+                        found[tag] = exif_entries[tag]
+
+        values = {}
+        for tag, entry in found.items():
+            value = reader.read_value(entry)
+            if value is not None:
+                values[tag] = value
+        return values
+
+    except (struct.error, OSError) as e:
+        raise ExifFormatError(str(e))
+    finally:
+        if owned:
+            stream.close()
+
+
+def parse_exif_date(value: Any) -> Optional[str]:
+    """将EXIF日期 "2023:01:15 12:30:45" 转换为 "2023-01-15"，无效时返回None"""
+    if not isinstance(value, str):
+        return None
+    formatted_date = value.split(' ')[0].replace(':', '-')
+    try:
+        # 验证日期格式
+        datetime.strptime(formatted_date, "%Y-%m-%d")
+    except ValueError:
+        return None
+    return formatted_date
+
+
+def read_exif_date(source: Source) -> Optional[str]:
+    """按 DateTimeOriginal、DateTimeDigitized、DateTime 的优先级读取拍摄日期
+
+    Raises:
+        ExifFormatError: 文件格式不受支持或EXIF结构损坏
+    """
+    values = read_exif_tags(source, DATE_TAGS)
+    for tag in DATE_TAGS:
+        date = parse_exif_date(values.get(tag))
+        if date:
+            return date
+    return None
+
+
+def read_exif_thumbnail(source: Source) -> Tuple[Optional[bytes], int]:
+    """读取IFD1中内嵌的JPEG缩略图和IFD0中的方向标签
+
+    Returns:
+        (缩略图JPEG数据，没有时为None; 方向，没有时为1)
+
+    Raises:
+        ExifFormatError: 文件格式不受支持或EXIF结构损坏
+    """
+    stream, owned = _open_source(source)
+    try:
+        base = _find_tiff_base(stream)
+        if base is None:
+            return None, 1
+        reader = _TiffReader(stream, base)
+
+        entries = reader.read_entries(reader.first_ifd)
+        orientation = reader.read_value(entries[TAG_ORIENTATION]) if TAG_ORIENTATION in entries else None
+        if not isinstance(orientation, int) or not 1 <= orientation <= 8:
+            orientation = 1
+
+        ifd1 = reader.read_next_ifd(reader.first_ifd)
+        if not ifd1:
+            return None, orientation
+        entries = reader.read_entries(ifd1)
+        offset = reader.read_value(entries[TAG_THUMBNAIL_OFFSET]) if TAG_THUMBNAIL_OFFSET in entries else None
+        length = reader.read_value(entries[TAG_THUMBNAIL_LENGTH]) if TAG_THUMBNAIL_LENGTH in entries else None
+        if not isinstance(offset, int) or not isinstance(length, int) or not 0 < length <= MAX_VALUE_SIZE:
+            return None, orientation
+
+        data = reader.read_at(offset, length)
+        if not data.startswith(b'\xff\xd8'):
+            return None, orientation
+        return data, orientation
+
+    except (struct.error, OSError) as e:
+        raise ExifFormatError(str(e))
+    finally:
+        if owned:
+            stream.close()
+
+
+def _plain_value(value: Any, rational: bool) -> Any:
+    """将标签值转换为可JSON序列化的形式：多值取第一个，有理数为 [分子, 分母]"""
+    if isinstance(value, bytes):
+        return None
+    if rational:
+        if isinstance(value[0], tuple):
+            value = value[0]
+        return list(value)
+    if isinstance(value, tuple):
+        return value[0] if value else None
+    return value
+
+
+def metadata_from_tags(values: Dict[int, Any]) -> Dict[str, Any]:
+    """将 read_exif_tags 读取的标签值转换为元数据字典
+
+    Returns:
+        {'date': 拍摄日期或None, 'datetime': 原始日期时间, 'make': ..., ...}，
+        只包含 values 中存在的常用标签，值均可JSON序列化
+    """
+    metadata = {'date': None}
+    for tag in DATE_TAGS:
+        date = parse_exif_date(values.get(tag))
+        if date:
+            metadata['date'] = date
+            metadata['datetime'] = values[tag]
+            break
+
+    for tag, name in COMMON_TAGS.items():
+        if tag in values:
+            value = _plain_value(values[tag], tag in RATIONAL_TAGS)
+            if value is not None and value != '':
+                metadata[name] = value
+    return metadata
+
+
+def read_exif_metadata(source: Source) -> Dict[str, Any]:
+    """读取拍摄日期和常用EXIF标签，返回值见 metadata_from_tags
+
+    Raises:
+        ExifFormatError: 文件格式不受支持或EXIF结构损坏
+    """
+    return metadata_from_tags(read_exif_tags(source, DATE_TAGS + tuple(COMMON_TAGS)))
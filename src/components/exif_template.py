@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+EXIF文本模板模块
+将 "{date:%Y.%m.%d} · {model} · ISO{iso} · {focal}mm" 这样的模板预先解析为字段列表，
+渲染时每张图片只需读取一次模板引用到的EXIF标签
+"""
+
+import string
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from components.exif_reader import (
+    DATE_TAGS, TAG_EXPOSURE_TIME, TAG_F_NUMBER, TAG_FOCAL_LENGTH, TAG_ISO, TAG_LENS_MODEL,
+    TAG_MAKE, TAG_MODEL, TAG_PIXEL_HEIGHT, TAG_PIXEL_WIDTH
+)
+
+# 模板字段 -> (元数据字段, 所需的EXIF标签)
+TEMPLATE_FIELDS = {
+    'date': ('date', DATE_TAGS),
+    'make': ('make', (TAG_MAKE,)),
+    'model': ('model', (TAG_MODEL,)),
+    'lens': ('lens_model', (TAG_LENS_MODEL,)),
+    'iso': ('iso', (TAG_ISO,)),
+    'focal': ('focal_length', (TAG_FOCAL_LENGTH,)),
+    'aperture': ('f_number', (TAG_F_NUMBER,)),
+    'exposure': ('exposure_time', (TAG_EXPOSURE_TIME,)),
+    'width': ('width', (TAG_PIXEL_WIDTH,)),
+    'height': ('height', (TAG_PIXEL_HEIGHT,)),
+}
+
+DEFAULT_DATE_FORMAT = "%Y-%m-%d"
+
+
+def metadata_datetime(metadata: Dict[str, Any]) -> Optional[datetime]:
+    """从元数据中取得拍摄时间，只有日期时时间部分为0点，没有时返回None"""
+    value = metadata.get('datetime')
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value[:19], "%Y:%m:%d %H:%M:%S")
+        except ValueError:
+            pass
+    date = metadata.get('date')
+    if date:
+        try:
+            return datetime.strptime(date, "%Y-%m-%d")
+        except ValueError:
+            pass
+    return None
+
+
+def _format_number(value: Any, spec: str) -> str:
+    """格式化数值，有理数 [分子, 分母] 先转为小数，默认去掉多余的0"""
+    if isinstance(value, list):
+        value = value[0] / value[1] if value[1] else 0
+    if spec:
+        return format(value, spec)
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+def _format_exposure(value: Any, spec: str) -> str:
+    """格式化曝光时间，不足1秒时显示为 1/125 的形式"""
+    if not spec and isinstance(value, list) and value[0] > 0 and value[0] < value[1]:
+        return f"1/{round(value[1] / value[0])}"
+    return _format_number(value, spec)
+
+
+class ExifTemplate:
+    """预先解析的EXIF文本模板（不可变，可序列化后传给子进程）
+
+    模板为 str.format 语法，字段见 TEMPLATE_FIELDS；{date} 的格式说明为strftime格式，
+    其他数值字段为 format() 格式说明。元数据中缺少的字段渲染为空字符串。
+    """
+
+    __slots__ = ('source', 'segments', 'tags', 'uses_date')
+
+    def __init__(self, source: str):
+        segments = []
+        tags = set()
+        for literal, field, spec, conversion in string.Formatter().parse(source):
+            if field is not None:
+                if field not in TEMPLATE_FIELDS:
+                    raise ValueError(f"Unknown template field: {field}")
+                if conversion:
+                    raise ValueError(f"Conversion is not supported: {field}!{conversion}")
+                tags.update(TEMPLATE_FIELDS[field][1])
+            segments.append((literal, field, spec or ''))
+
+        object.__setattr__(self, 'source', source)
+        object.__setattr__(self, 'segments', tuple(segments))
+        object.__setattr__(self, 'tags', frozenset(tags))
+        object.__setattr__(self, 'uses_date', any(field == 'date' for _, field, _ in segments))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return compile_template, (self.source,)
+
+    def render(self, metadata: Dict[str, Any], date: datetime = None) -> str:
+        """按元数据生成文本
+
+        Args:
+            metadata: EXIF元数据字典（见 exif_reader.metadata_from_tags）
+            date: {date} 使用的时间，默认取自元数据
+        """
+        if date is None and self.uses_date:
+            date = metadata_datetime(metadata)
+
+        parts = []
+        for literal, field, spec in self.segments:
+            parts.append(literal)
+            if field is None:
+                continue
+            if field == 'date':
+                if date is not None:
+                    parts.append(date.strftime(spec or DEFAULT_DATE_FORMAT))
+                continue
+
+            value = metadata.get(TEMPLATE_FIELDS[field][0])
+            if value is None:
+                continue
+            if field == 'exposure':
+                parts.append(_format_exposure(value, spec))
+            elif isinstance(value, str):
+                parts.append(format(value, spec))
+            else:
+                parts.append(_format_number(value, spec))
+        return "".join(parts)
+
+    def get_sample_text(self) -> str:
+        """生成代表渲染结果字符集的样例，用于编译时选择字体"""
+        literals = "".join(literal for literal, _, _ in self.segments)
+        return f"{literals}{self.render({}, datetime.now())}{string.ascii_letters}{string.digits}./-"
+
+
+@lru_cache(maxsize=64)
+def compile_template(source: str) -> ExifTemplate:
+    """解析模板，相同的模板只解析一次
+
+    Raises:
+        ValueError: 模板语法错误或引用了未知字段
+    """
+    return ExifTemplate(source)
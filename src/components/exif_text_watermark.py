@@ -1,19 +1,30 @@
 # -*- coding: utf-8 -*-
 """
 EXIF文本水印处理模块
-从图片EXIF信息中提取日期并作为水印
+从图片EXIF信息中提取日期或按文本模板组合EXIF字段作为水印
 """
 
 import os
 import sys
 from typing import Tuple, Optional, Dict, Any
 from datetime import datetime
+from functools import partial
 from PIL import Image, ImageDraw, ImageFont
 
 # 添加路径
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from config import Config
+from components.exif_cache import ExifMetadataCache, TransientMetadata
+from components.exif_reader import (
+    DATE_TAGS, TAG_EXIF_IFD, ExifFormatError, metadata_from_tags, parse_exif_date,
+    read_exif_date, read_exif_metadata, read_exif_tags
+)
+from components.exif_template import ExifTemplate, compile_template
+from components.font_coverage import get_font_for_text, resolve_font_path_for_text
+from components.font_registry import get_font
+from components.text_effects import draw_text_with_effects
+from components.watermark_plan import ExifWatermarkPlan, calculate_position, make_anchor
 
 # 尝试导入EXIF处理库
 try:
@@ -28,11 +39,235 @@ try:
 except ImportError:
     EXIFREAD_AVAILABLE = False
 
+def load_exif_metadata(image_path: str) -> Dict[str, Any]:
+    """提取拍摄日期和常用EXIF标签（不使用缓存）"""
+    # 优先使用只读取文件头的内置读取器
+    try:
+        return read_exif_metadata(image_path)
+    except ExifFormatError:
+        pass  # 不支持的格式或损坏的EXIF交给EXIF库处理
+    except OSError as e:
+        # 文件暂时无法读取时不缓存结果，恢复可读后重新提取
+        print(f"Read EXIF failed: {e}")
+        return TransientMetadata(date=None)
+    
+    # 其次使用piexif，备用使用exifread，只能获取日期
+    date = None
+    if PIEXIF_AVAILABLE:
+        date = _extract_date_piexif(image_path)
+    elif EXIFREAD_AVAILABLE:
+        date = _extract_date_exifread(image_path)
+    return {'date': date}
+
+
+# 进程内共享的EXIF元数据缓存，持久保存在配置目录中，文件未变化时不再解析EXIF
+exif_cache = ExifMetadataCache(load_exif_metadata)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=exif_cache._reset_lock)
+
+
+def extract_date_from_exif(image_path: str) -> Optional[str]:
+    """从EXIF信息中提取日期（优先使用缓存）"""
+    try:
+        return exif_cache.get_metadata(image_path).get('date')
+        
+    except Exception as e:
+        print(f"Extract EXIF date failed: {e}")
+        return None
+
+
+def _extract_date_piexif(image_path: str) -> Optional[str]:
+    """使用piexif提取日期"""
+    try:
+        exif_data = piexif.load(image_path)
+        
+        # 尝试不同的日期字段
+        date_fields = [
+            ('Exif', piexif.ExifIFD.DateTimeOriginal),
+            ('Exif', piexif.ExifIFD.DateTimeDigitized),
+            ('0th', piexif.ImageIFD.DateTime)
+        ]
+        
+        for group, field in date_fields:
+            try:
+                if group in exif_data and field in exif_data[group]:
+                    date_str = exif_data[group][field].decode('utf-8')
+                    # 转换格式 "2023:01:15 12:30:45" -> "2023-01-15"
+                    date_part = date_str.split(' ')[0]
+                    formatted_date = date_part.replace(':', '-')
+                    
+                    # 验证日期格式
+                    datetime.strptime(formatted_date, "%Y-%m-%d")
+                    return formatted_date
+            except:
+                continue
+        
+        return None
+        
+    except Exception as e:
+        print(f"Extract date with piexif failed: {e}")
+        return None
+
+
+def _extract_date_exifread(image_path: str) -> Optional[str]:
+    """使用exifread提取日期"""
+    try:
+        with open(image_path, 'rb') as f:
+            tags = exifread.process_file(f)
+        
+        # 尝试不同的日期标签
+        date_tags = [
+            'EXIF DateTimeOriginal',
+            'EXIF DateTimeDigitized',
+            'Image DateTime'
+        ]
+        
+        for tag_name in date_tags:
+            if tag_name in tags:
+                date_str = str(tags[tag_name])
+                # 转换格式
+                date_part = date_str.split(' ')[0]
+                formatted_date = date_part.replace(':', '-')
+                
+                # 验证日期格式
+                datetime.strptime(formatted_date, "%Y-%m-%d")
+                return formatted_date
+        
+        return None
+        
+    except Exception as e:
+        print(f"Extract date with exifread failed: {e}")
+        return None
+
+
+def get_file_modification_date(image_path: str, date_format: str) -> str:
+    """获取文件修改日期作为备用"""
+    try:
+        mtime = os.path.getmtime(image_path)
+        return datetime.fromtimestamp(mtime).strftime(date_format)
+    except:
+        return datetime.now().strftime(date_format)
+
+
+def extract_date_from_image(image: Image.Image = None, exif_data: bytes = None) -> Optional[str]:
+    """从内存中的EXIF数据提取日期，不访问文件
+    
+    Args:
+        image: 已解码的图片，依次尝试 image.info['exif'] 中的原始APP1数据和 image.getexif()
+        exif_data: 已读入内存的APP1段或TIFF格式EXIF数据，优先使用
+    """
+    try:
+        if exif_data is None and image is not None:
+            exif_data = image.info.get('exif')
+        if exif_data:
+            try:
+                return read_exif_date(exif_data)
+            except ExifFormatError:
+                pass  # 原始数据无法解析时尝试PIL解析的EXIF
+        
+        if image is not None:
+            exif = image.getexif()
+            if exif:
+                exif_ifd = exif.get_ifd(TAG_EXIF_IFD)
+                for tag in DATE_TAGS:
+                    date = parse_exif_date(exif_ifd.get(tag, exif.get(tag)))
+                    if date:
+                        return date
+        return None
+        
+    except Exception as e:
+        print(f"Extract EXIF date from image failed: {e}")
+        return None
+
+
+def build_watermark_text(image_path: Optional[str], date_format: str, fallback_to_file_time: bool,
+                         prefix_text: str = "", suffix_text: str = "",
+                         image: Image.Image = None, exif_data: bytes = None,
+                         metadata: Dict[str, Any] = None) -> str:
+    """生成水印文本
+    
+    模块级函数不依赖水印对象，编译后的渲染计划通过它为每张图片生成文本。
+    已预读的元数据优先；其次使用内存中的EXIF数据，没有日期时才按路径读取；
+    没有路径时不使用文件时间。
+    """
+    # 尝试从EXIF获取日期
+    exif_date = None
+    if metadata is not None and 'date' in metadata:
+        # 预读结果来自同一文件，其中没有日期时无需再次读取
+        exif_date = metadata['date']
+    else:
+        if image is not None or exif_data is not None:
+            exif_date = extract_date_from_image(image, exif_data)
+        if not exif_date and image_path:
+            exif_date = extract_date_from_exif(image_path)
+    
+    if exif_date:
+        date_text = exif_date
+    elif fallback_to_file_time and image_path:
+        date_text = get_file_modification_date(image_path, date_format)
+    else:
+        return ""  # 如果不允许备用，返回空字符串
+    
+    # 格式化最终文本
+    final_text = f"{prefix_text}{date_text}{suffix_text}"
+    return final_text.strip()
+
+
+def load_template_metadata(template: ExifTemplate, image_path: Optional[str],
+                           image: Image.Image = None, exif_data: bytes = None) -> Dict[str, Any]:
+    """为模板读取一次元数据
+    
+    内存中有EXIF数据时只解析模板引用到的标签；否则按路径读取（使用缓存）。
+    """
+    if exif_data is None and image is not None:
+        exif_data = image.info.get('exif')
+    if exif_data:
+        try:
+            values = read_exif_tags(exif_data, template.tags)
+            if values:
+                return metadata_from_tags(values)
+        except ExifFormatError:
+            pass  # 内存中的数据无法解析时按路径读取
+    
+    if image_path:
+        try:
+            return exif_cache.get_metadata(image_path)
+        except Exception as e:
+            print(f"Load EXIF metadata failed: {e}")
+    return {}
+
+
+def build_template_text(image_path: Optional[str], template: ExifTemplate, fallback_to_file_time: bool,
+                        image: Image.Image = None, exif_data: bytes = None,
+                        metadata: Dict[str, Any] = None) -> str:
+    """按预先解析的模板生成水印文本
+    
+    每张图片只读取一次元数据：已预读的元数据优先，其次为内存中的EXIF数据，最后按路径读取。
+    模板引用了日期但没有EXIF日期时，按 fallback_to_file_time 使用文件时间或返回空字符串。
+    """
+    if metadata is None:
+        metadata = load_template_metadata(template, image_path, image, exif_data)
+    
+    date = None
+    if template.uses_date and not metadata.get('date'):
+        if not (fallback_to_file_time and image_path):
+            return ""
+        try:
+            date = datetime.fromtimestamp(os.path.getmtime(image_path))
+        except OSError:
+            date = datetime.now()
+    
+    return template.render(metadata, date).strip()
+
+
 class ExifTextWatermark:
     """EXIF文本水印类"""
     
     def __init__(self):
         """初始化EXIF文本水印"""
+        # 当前设置编译出的渲染计划，设置变化后重新编译
+        self._plan: Optional[ExifWatermarkPlan] = None
         self.font_size = 24
         self.font_family = "STHeiti Medium.ttc"  # 使用支持中文的默认字体
         self.color = "#FFFFFF"
@@ -51,9 +286,14 @@ class ExifTextWatermark:
         self.fallback_to_file_time = True  # 如果没有EXIF日期，是否使用文件修改时间
         self.prefix_text = ""  # 前缀文本，如 "拍摄于: "
         self.suffix_text = ""  # 后缀文本
-        
-        # 字体缓存
-        self._font_cache = {}
+        # 文本模板，如 "{date:%Y.%m.%d} · {model} · ISO{iso}"，非空时代替日期和前后缀
+        self.text_template = ""
+    
+    def __setattr__(self, name, value):
+        # set_* 方法、load_from_dict 和对话框直接赋值都会修改设置，统一在此丢弃已编译的计划
+        if not name.startswith('_'):
+            object.__setattr__(self, '_plan', None)
+        object.__setattr__(self, name, value)
     
     def set_font_size(self, size: int):
         """设置字体大小"""
@@ -62,7 +302,6 @@ class ExifTextWatermark:
     def set_font_family(self, family: str):
         """设置字体族"""
         self.font_family = family
-        self._font_cache.clear()
     
     def set_color(self, color: str):
         """设置颜色"""
@@ -96,162 +335,54 @@ class ExifTextWatermark:
         self.prefix_text = prefix
         self.suffix_text = suffix
     
+    def set_text_template(self, template: str) -> bool:
+        """设置文本模板，模板无效时不修改并返回False"""
+        try:
+            if template:
+                compile_template(template)
+        except ValueError as e:
+            print(f"Invalid EXIF text template: {e}")
+            return False
+        self.text_template = template
+        return True
+    
     def extract_date_from_exif(self, image_path: str) -> Optional[str]:
         """从EXIF信息中提取日期"""
-        try:
-            # 优先使用piexif
-            if PIEXIF_AVAILABLE:
-                return self._extract_date_piexif(image_path)
-            
-            # 备用使用exifread
-            if EXIFREAD_AVAILABLE:
-                return self._extract_date_exifread(image_path)
-            
-            return None
-            
-        except Exception as e:
-            print(f"Extract EXIF date failed: {e}")
-            return None
+        return extract_date_from_exif(image_path)
     
     def _extract_date_piexif(self, image_path: str) -> Optional[str]:
         """使用piexif提取日期"""
-        try:
-            exif_data = piexif.load(image_path)
-            
-            # 尝试不同的日期字段
-            date_fields = [
-                ('Exif', piexif.ExifIFD.DateTimeOriginal),
-                ('Exif', piexif.ExifIFD.DateTimeDigitized),
-                ('0th', piexif.ImageIFD.DateTime)
-            ]
-            
-            for group, field in date_fields:
-                try:
-                    if group in exif_data and field in exif_data[group]:
-                        date_str = exif_data[group][field].decode('utf-8')
-                        # 转换格式 "2023:01:15 12:30:45" -> "2023-01-15"
-                        date_part = date_str.split(' ')[0]
-                        formatted_date = date_part.replace(':', '-')
-                        
-                        # 验证日期格式
-                        datetime.strptime(formatted_date, "%Y-%m-%d")
-                        return formatted_date
-                except:
-                    continue
-            
-            return None
-            
-        except Exception as e:
-            print(f"Extract date with piexif failed: {e}")
-            return None
+        return _extract_date_piexif(image_path)
     
     def _extract_date_exifread(self, image_path: str) -> Optional[str]:
         """使用exifread提取日期"""
-        try:
-            with open(image_path, 'rb') as f:
-                tags = exifread.process_file(f)
-            
-            # 尝试不同的日期标签
-            date_tags = [
-                'EXIF DateTimeOriginal',
-                'EXIF DateTimeDigitized',
-                'Image DateTime'
-            ]
-            
-            for tag_name in date_tags:
-                if tag_name in tags:
-                    date_str = str(tags[tag_name])
-                    # 转换格式
-                    date_part = date_str.split(' ')[0]
-                    formatted_date = date_part.replace(':', '-')
-                    
-                    # 验证日期格式
-                    datetime.strptime(formatted_date, "%Y-%m-%d")
-                    return formatted_date
-            
-            return None
-            
-        except Exception as e:
-            print(f"Extract date with exifread failed: {e}")
-            return None
+        return _extract_date_exifread(image_path)
     
     def get_file_modification_date(self, image_path: str) -> str:
         """获取文件修改日期作为备用"""
-        try:
-            mtime = os.path.getmtime(image_path)
-            return datetime.fromtimestamp(mtime).strftime(self.date_format)
-        except:
-            return datetime.now().strftime(self.date_format)
+        return get_file_modification_date(image_path, self.date_format)
     
-    def generate_watermark_text(self, image_path: str) -> str:
-        """生成水印文本"""
-        # 尝试从EXIF获取日期
-        exif_date = self.extract_date_from_exif(image_path)
-        
-        if exif_date:
-            date_text = exif_date
-        elif self.fallback_to_file_time:
-            date_text = self.get_file_modification_date(image_path)
-        else:
-            return ""  # 如果不允许备用，返回空字符串
-        
-        # 格式化最终文本
-        final_text = f"{self.prefix_text}{date_text}{self.suffix_text}"
-        return final_text.strip()
+    def generate_watermark_text(self, image_path: str = None, image: Image.Image = None,
+                                exif_data: bytes = None, metadata: Dict[str, Any] = None) -> str:
+        """生成水印文本，提供预读的元数据、已解码的图片或EXIF数据时优先使用"""
+        if self.text_template:
+            return build_template_text(image_path, compile_template(self.text_template),
+                                       self.fallback_to_file_time, image, exif_data, metadata)
+        return build_watermark_text(image_path, self.date_format, self.fallback_to_file_time,
+                                    self.prefix_text, self.suffix_text, image, exif_data, metadata)
     
     def _get_font(self, size: int = None) -> ImageFont.ImageFont:
         """获取字体对象，优先选择支持中文的字体"""
         if size is None:
             size = self.font_size
-        
-        cache_key = f"{self.font_family}_{size}"
-        if cache_key in self._font_cache:
-            return self._font_cache[cache_key]
-        
-        font = None
-        
-        # 首先尝试用户指定的字体
-        try:
-            font = ImageFont.truetype(self.font_family, size)
-        except (OSError, IOError):
-            # 如果用户指定字体失败，尝试支持中文的系统字体
-            chinese_fonts = [
-                # macOS 中文字体
-                "/System/Library/Fonts/STHeiti Medium.ttc",
-                "/System/Library/Fonts/Hiragino Sans GB.ttc", 
-                "/System/Library/Fonts/Supplemental/Songti.ttc",
-                "STHeiti Medium.ttc",
-                "Hiragino Sans GB.ttc",
-                # 通用字体（也支持中文）
-                "Arial.ttf",
-                "Helvetica.ttc",
-                # Windows 中文字体（如果在Windows上运行）
-                "C:/Windows/Fonts/simsun.ttc",
-                "C:/Windows/Fonts/simhei.ttf", 
-                "C:/Windows/Fonts/msyh.ttc",
-                # Linux 中文字体
-                "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
-                "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc"
-            ]
-            
-            for font_path in chinese_fonts:
-                try:
-                    font = ImageFont.truetype(font_path, size)
-                    print(f"Using fallback Chinese font: {font_path}")
-                    break
-                except (OSError, IOError):
-                    continue
-            
-            # 如果所有中文字体都失败，使用默认字体
-            if font is None:
-                try:
-                    font = ImageFont.load_default()
-                    print("Warning: Using default font, Chinese characters may not display correctly")
-                except:
-                    font = ImageFont.load_default()
-        
-        self._font_cache[cache_key] = font
-        return font
+        # 字体文件的查找、加载和缓存由进程内共享的字体注册表完成
+        return get_font(self.font_family, size)
+    
+    def _get_text_font(self, text: str, size: int = None) -> ImageFont.ImageFont:
+        """获取能显示指定文本的字体，配置的字体缺少字形时自动改用覆盖该文本的已安装字体"""
+        if size is None:
+            size = self.font_size
+        return get_font_for_text(self.font_family, text, size)
     
     def _hex_to_rgba(self, hex_color: str, alpha: int = 255) -> Tuple[int, int, int, int]:
         """将十六进制颜色转换为RGBA"""
@@ -270,98 +401,88 @@ class ExifTextWatermark:
     def _calculate_position(self, image_size: Tuple[int, int], 
                           text_size: Tuple[int, int]) -> Tuple[int, int]:
         """计算文本位置"""
-        img_width, img_height = image_size
-        text_width, text_height = text_size
-        
-        # 如果有自定义位置，使用自定义位置
-        if self.custom_position:
-            return self.custom_position
-        
-        # 边距
-        margin = min(img_width, img_height) // 20
-        
-        position_map = {
-            "top_left": (margin, margin),
-            "top_center": ((img_width - text_width) // 2, margin),
-            "top_right": (img_width - text_width - margin, margin),
-            "center_left": (margin, (img_height - text_height) // 2),
-            "center": ((img_width - text_width) // 2, (img_height - text_height) // 2),
-            "center_right": (img_width - text_width - margin, (img_height - text_height) // 2),
-            "bottom_left": (margin, img_height - text_height - margin),
-            "bottom_center": ((img_width - text_width) // 2, img_height - text_height - margin),
-            "bottom_right": (img_width - text_width - margin, img_height - text_height - margin)
-        }
-        
-        return position_map.get(self.position, position_map["bottom_right"])
+        return calculate_position(image_size, text_size, self.position, self.custom_position)
     
     def _draw_text_with_effects(self, draw: ImageDraw.Draw, position: Tuple[int, int], 
                                text: str, font: ImageFont.ImageFont, 
                                fill_color: Tuple[int, int, int, int]):
         """绘制带效果的文本"""
-        x, y = position
-        
-        # 绘制阴影
-        if self.shadow:
-            shadow_color = self._hex_to_rgba(self.shadow_color, fill_color[3])
-            shadow_offset = max(1, self.font_size // 20)
-            draw.text((x + shadow_offset, y + shadow_offset), text, font=font, fill=shadow_color)
-        
-        # 绘制描边
-        if self.outline:
-            outline_color = self._hex_to_rgba(self.outline_color, fill_color[3])
-            for dx in range(-self.outline_width, self.outline_width + 1):
-                for dy in range(-self.outline_width, self.outline_width + 1):
-                    if dx != 0 or dy != 0:
-                        draw.text((x + dx, y + dy), text, font=font, fill=outline_color)
-        
-        # 绘制主文本
-        draw.text((x, y), text, font=font, fill=fill_color)
+        shadow_color = self._hex_to_rgba(self.shadow_color, fill_color[3]) if self.shadow else None
+        outline_color = self._hex_to_rgba(self.outline_color, fill_color[3]) if self.outline else None
+        draw_text_with_effects(draw, position, text, font, fill_color,
+                               shadow_color, self._get_shadow_offset(),
+                               outline_color, self.outline_width)
     
-    def apply_to_image_with_path(self, image: Image.Image, image_path: str) -> Optional[Image.Image]:
-        """将EXIF水印应用到图片上（需要图片路径来提取EXIF）"""
+    def _get_shadow_offset(self) -> int:
+        """阴影偏移量随字号变化"""
+        return max(1, self.font_size // 20)
+    
+    def _get_sample_text(self) -> str:
+        """生成代表水印文本字符集的样例，用于编译时选择字体"""
+        if self.text_template:
+            return compile_template(self.text_template).get_sample_text()
         try:
-            # 生成水印文本
-            watermark_text = self.generate_watermark_text(image_path)
-            if not watermark_text:
-                return image  # 如果没有日期信息，返回原图
-            
-            # 确保图片是RGBA模式
-            if image.mode != 'RGBA':
-                result_image = image.convert('RGBA')
-            else:
-                result_image = image.copy()
-            
-            # 创建绘制对象
-            draw = ImageDraw.Draw(result_image)
-            
-            # 获取字体
-            font = self._get_font()
-            
-            # 计算文本尺寸
-            bbox = draw.textbbox((0, 0), watermark_text, font=font)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-            
-            # 计算位置
-            position = self._calculate_position(image.size, (text_width, text_height))
-            
-            # 计算透明度
-            alpha = int(255 * self.transparency / 100)
-            fill_color = self._hex_to_rgba(self.color, alpha)
-            
-            # 绘制文本
-            self._draw_text_with_effects(draw, position, watermark_text, font, fill_color)
-            
-            # 旋转处理
-            if self.angle != 0:
-                result_image = result_image.rotate(self.angle, expand=True, fillcolor=(0, 0, 0, 0))
-            
-            return result_image
+            date_text = datetime.now().strftime(self.date_format)
+        except Exception:
+            date_text = ""
+        return f"{self.prefix_text}0123456789-{date_text}{self.suffix_text}"
+    
+    def compile(self) -> ExifWatermarkPlan:
+        """将当前设置编译为不可变的渲染计划
+        
+        字体文件按前后缀和日期格式（或文本模板）的字符集在编译时解析，模板只解析一次，
+        颜色和效果参数预先计算；水印文本在渲染时按图片路径生成。
+        计划在设置变化前一直复用，预览和逐张应用水印时不重复编译。
+        """
+        if self._plan is None:
+            self._plan = self._build_plan()
+        return self._plan
+    
+    def _build_plan(self) -> ExifWatermarkPlan:
+        """按当前设置编译渲染计划"""
+        alpha = int(255 * self.transparency / 100)
+        if self.text_template:
+            text_source = partial(build_template_text,
+                                  template=compile_template(self.text_template),
+                                  fallback_to_file_time=self.fallback_to_file_time)
+        else:
+            text_source = partial(build_watermark_text,
+                                  date_format=self.date_format,
+                                  fallback_to_file_time=self.fallback_to_file_time,
+                                  prefix_text=self.prefix_text,
+                                  suffix_text=self.suffix_text)
+        return ExifWatermarkPlan(
+            text_source=text_source,
+            font_path=resolve_font_path_for_text(self.font_family, self._get_sample_text()),
+            font_index=0,
+            font_size=self.font_size,
+            fill_color=self._hex_to_rgba(self.color, alpha),
+            shadow_color=self._hex_to_rgba(self.shadow_color, alpha) if self.shadow else None,
+            shadow_offset=self._get_shadow_offset(),
+            outline_color=self._hex_to_rgba(self.outline_color, alpha) if self.outline else None,
+            outline_width=self.outline_width,
+            anchor=make_anchor(self.position, self.custom_position),
+            angle=self.angle
+        )
+    
+    def apply_to_image(self, image: Image.Image, image_path: str = None,
+                       exif_data: bytes = None, metadata: Dict[str, Any] = None) -> Optional[Image.Image]:
+        """将EXIF水印应用到图片上
+        
+        EXIF依次取自预读的 metadata、exif_data（内存中的APP1段数据）、图片自带的EXIF，
+        都没有日期时才按 image_path 读取文件，可用于内存中或流式读取的图片。
+        """
+        try:
+            return self.compile().render(image, image_path, metadata, exif_data=exif_data)
             
         except Exception as e:
             print(f"Apply EXIF watermark failed: {e}")
             return image
     
+    def apply_to_image_with_path(self, image: Image.Image, image_path: str) -> Optional[Image.Image]:
+        """将EXIF水印应用到图片上（需要图片路径来提取EXIF）"""
+        return self.apply_to_image(image, image_path)
+    
     def get_watermark_info(self) -> Dict[str, Any]:
         """获取水印信息"""
         return {
@@ -380,7 +501,8 @@ class ExifTextWatermark:
             'date_format': self.date_format,
             'fallback_to_file_time': self.fallback_to_file_time,
             'prefix_text': self.prefix_text,
-            'suffix_text': self.suffix_text
+            'suffix_text': self.suffix_text,
+            'text_template': self.text_template
         }
     
     def load_from_dict(self, data: Dict[str, Any]):
@@ -402,9 +524,8 @@ class ExifTextWatermark:
             self.fallback_to_file_time = data.get('fallback_to_file_time', True)
             self.prefix_text = data.get('prefix_text', '')
             self.suffix_text = data.get('suffix_text', '')
-            
-            # 清除字体缓存
-            self._font_cache.clear()
+            if not self.set_text_template(data.get('text_template', '')):
+                self.text_template = ''
             
         except Exception as e:
             print(f"Load EXIF watermark from dict failed: {e}")
@@ -3,14 +3,30 @@
 简单的 EXIF 日期水印脚本
 用法:
   python exif_watermark.py <图片或目录> --size medium --color white --pos bottom-right
+  python exif_watermark.py <目录> --recursive --jobs 8 --incremental
+  python exif_watermark.py <目录> --exif-cache ~/.cache/exif_cache.db
+
+每个文件的处理结果以JSON行的形式输出到标准输出，最后输出一行汇总。
 """
 import os
 import sys
+import json
+import time
+import hashlib
 import argparse
+import contextlib
+from typing import Optional
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
 from PIL import Image, ImageDraw, ImageFont
-import piexif
 import datetime
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from components.exif_cache import ExifMetadataCache
+from components.exif_text_watermark import load_exif_metadata
+from components.font_registry import font_registry
+
 SUPPORTED_FORMATS = ('.jpg', '.jpeg', '.png')
 COLOR_MAP = {
     'white': (255, 255, 255),
@@ -22,35 +38,81 @@ COLOR_MAP = {
 SIZE_MAP = {'small': 24, 'medium': 36, 'large': 48}
 POS_MAP = ['top-left', 'center', 'bottom-right']
 
+OUTPUT_DIR_NAME = '_watermark'
+# 输出目录中记录每个输出文件所用设置的清单，供增量模式使用
+MANIFEST_NAME = '.exif_watermark.json'
+# 绘制方式变化时递增，使增量模式重新生成旧的输出
+RENDER_VERSION = 1
+# 每处理这么多文件保存一次清单，中断后已完成的文件不必重做
+MANIFEST_SAVE_INTERVAL = 1000
+
+
+# 由 --exif-cache 指定的EXIF缓存（每个进程各自打开，只有主进程写入）
+_exif_cache: Optional[ExifMetadataCache] = None
+
+
+def _forget_exif_cache():
+    """fork出的子进程不能使用父进程的SQLite连接，重新打开"""
+    global _exif_cache
+    _exif_cache = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_exif_cache)
 
-def extract_date(img_path):
-    # 尝试用 piexif 读取常见字段
+
+def get_exif_cache(db_path):
+    """获取本进程中 db_path 对应的EXIF缓存"""
+    global _exif_cache
+    if _exif_cache is None or _exif_cache.db_path != db_path:
+        _exif_cache = ExifMetadataCache(load_exif_metadata, db_path)
+    return _exif_cache
+
+
+def extract_date(img_path, exif_cache_path=None):
+    """读取拍摄日期，返回 (日期, 待写入EXIF缓存的记录)
+
+    未指定缓存时每次都解析EXIF；指定时只读取缓存，未命中的结果作为记录返回，
+    由主进程统一写入，避免多个子进程同时写数据库。
+    """
     try:
-        exif = piexif.load(img_path)
-    except Exception:
-        exif = None
-    if exif:
-        try:
-            v = exif.get('Exif', {}).get(piexif.ExifIFD.DateTimeOriginal)
-            if v:
-                return v.decode().split(' ')[0].replace(':', '-')
-            v = exif.get('Exif', {}).get(piexif.ExifIFD.DateTimeDigitized)
-            if v:
-                return v.decode().split(' ')[0].replace(':', '-')
-            v = exif.get('0th', {}).get(piexif.ImageIFD.DateTime)
-            if v:
-                return v.decode().split(' ')[0].replace(':', '-')
-        except Exception:
-            pass
-    return None
+        if exif_cache_path is None:
+            return load_exif_metadata(img_path).get('date'), None
+        metadata, entry = get_exif_cache(exif_cache_path).lookup(img_path)
+        return metadata.get('date'), entry
+    except Exception as e:
+        print(f"Extract EXIF date failed: {e}")
+        return None, None
+
+
+# Arial不可用时使用的PIL默认字体（按需加载）
+_default_font = None
+
+
+def get_label_font(font_size):
+    """获取日期标签字体：优先使用Arial，不可用时使用PIL默认字体
+
+    日期标签只含ASCII字符，不使用字体注册表的中文备用字体，也不输出相关警告。
+    """
+    global _default_font
+    path = font_registry.resolve("arial.ttf")
+    font = font_registry.load(path, font_size) if path else None
+    if font is not None:
+        return font
+    if _default_font is None:
+        _default_font = ImageFont.load_default()
+    return _default_font
 
 
 def add_watermark(img, text, font_size, color, pos):
+    """绘制带半透明背景的日期标签
+
+    只在标签覆盖的区域内合成，RGB图片会被直接修改并返回，开销与图片尺寸无关。
+    """
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
     draw = ImageDraw.Draw(img)
-    try:
-        font = ImageFont.truetype("arial.ttf", font_size)
-    except Exception:
-        font = ImageFont.load_default()
+    font = get_label_font(font_size)
     # 计算文字尺寸
     try:
         bbox = draw.textbbox((0, 0), text, font=font)
@@ -76,72 +138,246 @@ def add_watermark(img, text, font_size, color, pos):
     rect_x1 = x + text_w + rect_pad
     rect_y1 = y + text_h + rect_pad
     try:
-        # 复制一层 RGBA
-        overlay = Image.new('RGBA', img.size, (0, 0, 0, 0))
+        # 标签区域：背景矩形（含右下边界）与文字实际边界框的并集，裁剪到图片范围内
+        text_box = draw.textbbox((x, y), text, font=font)
+        left = max(0, min(rect_x0, text_box[0]))
+        top = max(0, min(rect_y0, text_box[1]))
+        right = min(w, max(rect_x1 + 1, text_box[2]))
+        bottom = min(h, max(rect_y1 + 1, text_box[3]))
+        if left >= right or top >= bottom:
+            return img
+
+        # 只在标签区域内叠加半透明背景并绘制文字
+        region = img.crop((left, top, right, bottom)).convert('RGBA')
+        overlay = Image.new('RGBA', region.size, (0, 0, 0, 0))
         odraw = ImageDraw.Draw(overlay)
-        odraw.rectangle([rect_x0, rect_y0, rect_x1, rect_y1], fill=(0, 0, 0, 120))
-        # 合并
-        img = img.convert('RGBA')
-        img = Image.alpha_composite(img, overlay)
-        draw = ImageDraw.Draw(img)
-        draw.text((x, y), text, font=font, fill=color + (255,) if isinstance(color, tuple) else color)
-        return img.convert('RGB')
+        odraw.rectangle([rect_x0 - left, rect_y0 - top, rect_x1 - left, rect_y1 - top], fill=(0, 0, 0, 120))
+        region = Image.alpha_composite(region, overlay)
+        ImageDraw.Draw(region).text((x - left, y - top), text, font=font,
+                                    fill=color + (255,) if isinstance(color, tuple) else color)
+        img.paste(region.convert('RGB'), (left, top))
+        return img
     except Exception:
         draw.rectangle([rect_x0, rect_y0, rect_x1, rect_y1], fill=(0, 0, 0))
         draw.text((x, y), text, font=font, fill=color)
         return img
 
 
-def process_file(path, out_dir, font_size, color, pos, fallback='filetime'):
-    date = extract_date(path)
-    if not date and fallback == 'filetime':
+def process_file(path, out_dir, font_size, color, pos, fallback='filetime', exif_cache_path=None):
+    """为单个文件添加日期水印并保存到 out_dir，返回处理结果
+
+    可在子进程中运行；库函数的诊断输出被转到标准错误，不与JSON行混在一起。
+    使用EXIF缓存且未命中时，结果的 exif_entry 为待写入缓存的记录。
+    """
+    result = {'source': path, 'output': os.path.join(out_dir, os.path.basename(path))}
+    with contextlib.redirect_stdout(sys.stderr):
+        date, entry = extract_date(path, exif_cache_path)
+        if entry is not None:
+            result['exif_entry'] = entry
+        if not date and fallback == 'filetime':
+            try:
+                ts = os.path.getmtime(path)
+                date = datetime.datetime.fromtimestamp(ts).strftime('%Y-%m-%d')
+            except Exception:
+                date = None
+        if not date:
+            result.update(status='skipped', reason='no-date')
+            return result
         try:
-            ts = os.path.getmtime(path)
-            date = datetime.datetime.fromtimestamp(ts).strftime('%Y-%m-%d')
-        except Exception:
-            date = None
-    if not date:
-        print('跳过：未找到日期 -', os.path.basename(path))
-        return
+            img = Image.open(path).convert('RGB')
+            img = add_watermark(img, date, font_size, color, pos)
+            os.makedirs(out_dir, exist_ok=True)
+            img.save(result['output'])
+            result['status'] = 'done'
+        except Exception as e:
+            result.update(status='failed', error=str(e))
+    return result
+
+
+def collect_files(input_path, recursive=False):
+    """收集支持的图片文件；递归时跳过输出目录"""
+    if os.path.isfile(input_path):
+        return [input_path] if input_path.lower().endswith(SUPPORTED_FORMATS) else []
+    if not recursive:
+        return sorted(os.path.join(input_path, f) for f in os.listdir(input_path)
+                      if f.lower().endswith(SUPPORTED_FORMATS))
+
+    files = []
+    for root, dirs, names in os.walk(input_path):
+        dirs[:] = sorted(d for d in dirs if d != OUTPUT_DIR_NAME)
+        files.extend(os.path.join(root, f) for f in sorted(names) if f.lower().endswith(SUPPORTED_FORMATS))
+    return files
+
+
+def settings_hash(font_size, color, pos, fallback):
+    """计算影响输出结果的设置的摘要"""
+    settings = [RENDER_VERSION, font_size, list(color), pos, fallback]
+    return hashlib.sha1(json.dumps(settings).encode('utf-8')).hexdigest()
+
+
+def load_manifest(out_dir):
+    """读取输出清单 {相对路径: 设置摘要}，不存在或损坏时返回空字典"""
     try:
-        img = Image.open(path).convert('RGB')
-        img = add_watermark(img, date, font_size, color, pos)
-        out_path = os.path.join(out_dir, os.path.basename(path))
-        img.save(out_path)
-        print('已处理：', os.path.basename(path))
-    except Exception as e:
-        print('处理失败：', os.path.basename(path), e)
+        with open(os.path.join(out_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        return manifest if isinstance(manifest, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(out_dir, manifest):
+    """原子地写入输出清单"""
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def is_up_to_date(source, output, recorded_hash, current_hash):
+    """输出文件比源文件新且由相同设置生成时无需重新处理"""
+    if recorded_hash != current_hash:
+        return False
+    try:
+        return os.path.getmtime(output) >= os.path.getmtime(source)
+    except OSError:
+        return False
+
+
+def failed_result(task, error):
+    """任务未能返回结果（如子进程崩溃）时的失败记录"""
+    path, out_dir = task[0], task[1]
+    return {'source': path, 'output': os.path.join(out_dir, os.path.basename(path)),
+            'status': 'failed', 'error': str(error) or type(error).__name__}
+
+
+def run_tasks(tasks, jobs):
+    """执行处理任务，按完成顺序逐个返回结果
+
+    jobs 大于1时使用进程池，同时提交的任务数有上限，避免大批量时占用过多内存。
+    单个任务出错或进程池损坏时该任务记为失败，不中断其余任务的输出。
+    """
+    if jobs <= 1:
+        for task in tasks:
+            try:
+                yield process_file(*task)
+            except Exception as e:
+                yield failed_result(task, e)
+        return
+
+    def collect(future):
+        task = pending.pop(future)
+        try:
+            return future.result()
+        except Exception as e:
+            return failed_result(task, e)
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = {}
+        for task in tasks:
+            if len(pending) >= jobs * 4:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield collect(future)
+            try:
+                pending[executor.submit(process_file, *task)] = task
+            except BrokenProcessPool as e:
+                yield failed_result(task, e)
+        for future in as_completed(list(pending)):
+            yield collect(future)
+
 
+def emit(record):
+    """输出一行JSON进度"""
+    print(json.dumps(record, ensure_ascii=False), flush=True)
 
-def main():
+
+def main(argv=None):
     parser = argparse.ArgumentParser()
     parser.add_argument('input')
     parser.add_argument('--size', choices=SIZE_MAP.keys(), default='medium')
     parser.add_argument('--color', choices=COLOR_MAP.keys(), default='white')
     parser.add_argument('--pos', choices=POS_MAP, default='bottom-right')
     parser.add_argument('--fallback', choices=['none', 'filetime'], default='filetime')
-    args = parser.parse_args()
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='并行处理的进程数，0 表示使用全部CPU核心')
+    parser.add_argument('--recursive', '-r', action='store_true', help='递归处理子目录，输出保持目录结构')
+    parser.add_argument('--incremental', action='store_true',
+                        help='跳过输出比源文件新且设置相同的文件')
+    parser.add_argument('--exif-cache', metavar='PATH',
+                        help='EXIF缓存数据库路径，再次处理未变化的文件时不再解析EXIF')
+    args = parser.parse_args(argv)
     input_path = args.input
     font_size = SIZE_MAP[args.size]
     color = COLOR_MAP[args.color]
     pos = args.pos
     fallback = args.fallback
-    if not os.path.exists(input_path):
-        print('路径不存在')
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    exif_cache_path = os.path.abspath(os.path.expanduser(args.exif_cache)) if args.exif_cache else None
+
+    def fail(message):
+        emit(dict(event='error', error=message))
         sys.exit(1)
+
+    if not os.path.exists(input_path):
+        fail('路径不存在')
+    files = collect_files(input_path, args.recursive)
     if os.path.isfile(input_path):
-        files = [input_path] if input_path.lower().endswith(SUPPORTED_FORMATS) else []
         parent = os.path.dirname(input_path) or '.'
     else:
-        files = [os.path.join(input_path, f) for f in os.listdir(input_path) if f.lower().endswith(SUPPORTED_FORMATS)]
         parent = input_path
-    out_dir = os.path.join(parent, '_watermark')
-    os.makedirs(out_dir, exist_ok=True)
     if not files:
-        print('未找到图片')
-        sys.exit(1)
-    for f in files:
-        process_file(f, out_dir, font_size, color, pos, fallback)
+        fail('未找到图片')
+    out_dir = os.path.join(parent, OUTPUT_DIR_NAME)
+    os.makedirs(out_dir, exist_ok=True)
+
+    current_hash = settings_hash(font_size, color, pos, fallback)
+    manifest = load_manifest(out_dir)
+    counts = {'done': 0, 'skipped': 0, 'failed': 0}
+    start = time.perf_counter()
+    index = 0
+
+    def report(result):
+        nonlocal index
+        index += 1
+        counts[result['status']] += 1
+        emit(dict(event='file', index=index, total=len(files), **result))
+
+    tasks = []
+    for path in files:
+        relative = os.path.relpath(path, parent)
+        target_dir = os.path.join(out_dir, os.path.dirname(relative))
+        output = os.path.join(target_dir, os.path.basename(path))
+        key = relative.replace(os.sep, '/')
+        if args.incremental and is_up_to_date(path, output, manifest.get(key), current_hash):
+            report({'source': path, 'output': output, 'status': 'skipped', 'reason': 'up-to-date'})
+            continue
+        tasks.append((path, target_dir, font_size, color, pos, fallback, exif_cache_path))
+
+    exif_cache = get_exif_cache(exif_cache_path) if exif_cache_path else None
+    processed = 0
+    try:
+        for result in run_tasks(tasks, jobs):
+            entry = result.pop('exif_entry', None)
+            if entry is not None:
+                with contextlib.redirect_stdout(sys.stderr):
+                    exif_cache.put(*entry)
+            key = os.path.relpath(result['source'], parent).replace(os.sep, '/')
+            if result['status'] == 'done':
+                manifest[key] = current_hash
+            else:
+                manifest.pop(key, None)
+            report(result)
+            processed += 1
+            if processed % MANIFEST_SAVE_INTERVAL == 0:
+                save_manifest(out_dir, manifest)
+    finally:
+        save_manifest(out_dir, manifest)
+        if exif_cache is not None:
+            with contextlib.redirect_stdout(sys.stderr):
+                exif_cache.close()
+
+    emit(dict(event='summary', total=len(files), seconds=round(time.perf_counter() - start, 3), **counts))
 
 if __name__ == '__main__':
     main()
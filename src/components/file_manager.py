@@ -4,14 +4,44 @@
 处理图片导入、验证和导出功能
 """
 
+import io
+import math
 import os
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from typing import List, Optional, Tuple
+from typing import Iterator, List, Optional, Tuple
 from PIL import Image
 import shutil
 
 from config import Config
+from components.exif_reader import ExifFormatError, TAG_ORIENTATION, read_exif_thumbnail
+from components.image_probe import probe_image
+from utils.image_utils import apply_orientation
+
+# 文件头标识 -> 图片格式，导入时只读取文件开头几个字节判断格式
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'BM', 'BMP'),
+    (b'II*\x00', 'TIFF'),
+    (b'MM\x00*', 'TIFF'),
+)
+
+# 判断格式需要读取的字节数
+SNIFF_SIZE = 8
+
+
+def sniff_image_format(file_path: str) -> Optional[str]:
+    """根据文件头判断图片格式，不是支持的图片格式或无法读取时返回None"""
+    try:
+        with open(file_path, 'rb') as f:
+            header = f.read(SNIFF_SIZE)
+    except OSError:
+        return None
+    for signature, image_format in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    return None
 
 class ImageFileManager:
     """图片文件管理器"""
@@ -92,12 +122,7 @@ class ImageFileManager:
             if not folder_path:
                 return []
             
-            image_files = []
-            for root, dirs, files in os.walk(folder_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    if self.validate_image_file(file_path):
-                        image_files.append(file_path)
+            image_files = list(self.scan_folder(folder_path))
             
             if not image_files:
                 messagebox.showinfo("提示", "所选文件夹中没有找到支持的图片文件")
@@ -108,8 +133,62 @@ class ImageFileManager:
             messagebox.showerror("错误", f"导入文件夹失败: {e}")
             return []
     
+    def scan_folder(self, folder_path: str, index=None) -> Iterator[str]:
+        """逐个返回文件夹（含子文件夹）中的图片文件路径
+        
+        使用 os.scandir 遍历并复用目录项的文件信息，先按扩展名和文件大小过滤，
+        再读取文件头确认格式。完整的图片校验推迟到导出时进行。
+        
+        Args:
+            folder_path: 文件夹路径
+            index: 图片库索引，索引中未变化的文件不再读取文件头
+        """
+        pending = [folder_path]
+        while pending:
+            directory = pending.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError as e:
+                print(f"读取文件夹失败 {directory}: {e}")
+                continue
+            
+            subdirs = []
+            for entry in entries:
+                try:
+                    # 与 os.walk 相同，不进入指向目录的符号链接
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                        continue
+                    if not Config.validate_image_format(entry.name) or not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    if stat.st_size > self.max_file_size:
+                        continue
+                except OSError:
+                    continue
+                
+                if index is not None and index.is_unchanged(entry.path, stat):
+                    yield entry.path
+                elif sniff_image_format(entry.path) is not None:
+                    yield entry.path
+            
+            # 按名称顺序访问子文件夹
+            pending.extend(reversed(subdirs))
+    
+    def quick_validate_image_file(self, file_path: str) -> bool:
+        """快速验证图片文件：只检查扩展名、文件大小和文件头"""
+        if not Config.validate_image_format(file_path):
+            return False
+        try:
+            if os.path.getsize(file_path) > self.max_file_size:
+                return False
+        except OSError:
+            return False
+        return sniff_image_format(file_path) is not None
+    
     def validate_image_file(self, file_path: str) -> bool:
-        """验证图片文件"""
+        """验证图片文件（读取并校验整个文件）"""
         try:
             # 检查文件是否存在
             if not os.path.exists(file_path):
@@ -134,28 +213,31 @@ class ImageFileManager:
             return False
     
     def get_image_info(self, file_path: str) -> Optional[dict]:
-        """获取图片信息"""
+        """获取图片信息（只读取文件头中的尺寸和格式记录）"""
         try:
-            with Image.open(file_path) as img:
-                return {
-                    'path': file_path,
-                    'filename': os.path.basename(file_path),
-                    'size': img.size,
-                    'mode': img.mode,
-                    'format': img.format,
-                    'file_size': os.path.getsize(file_path)
-                }
+            return probe_image(file_path)
         except Exception as e:
             print(f"获取图片信息失败: {e}")
             return None
     
     def create_thumbnail(self, file_path: str, size: Tuple[int, int] = None) -> Optional[Image.Image]:
-        """创建缩略图"""
+        """创建缩略图
+        
+        优先使用EXIF中内嵌的缩略图，不必解码整张照片；没有内嵌缩略图或其尺寸
+        不足时才解码原图。缩略图按EXIF方向转为正向。
+        """
         try:
             if size is None:
                 size = Config.THUMBNAIL_SIZE
             
             with Image.open(file_path) as img:
+                exif_data = img.info.get('exif')
+                if exif_data:
+                    thumbnail = self._create_thumbnail_from_exif(exif_data, img.size, size)
+                    if thumbnail is not None:
+                        return thumbnail
+                
+                orientation = img.getexif().get(TAG_ORIENTATION, 1)
                 # 保持宽高比
                 # 兼容不同PIL版本
                 try:
@@ -163,10 +245,60 @@ class ImageFileManager:
                 except AttributeError:
                     # 较老版本的PIL使用LANCZOS
                     img.thumbnail(size, Image.LANCZOS)
-                return img.copy()
+                return apply_orientation(img.copy(), orientation)
         except Exception as e:
             print(f"Create thumbnail failed: {e}")
             return None
+    
+    def _create_thumbnail_from_exif(self, exif_data: bytes, image_size: Tuple[int, int],
+                                    size: Tuple[int, int]) -> Optional[Image.Image]:
+        """从EXIF内嵌的缩略图生成缩略图，没有可用的内嵌缩略图时返回None"""
+        try:
+            data, orientation = read_exif_thumbnail(exif_data)
+            if data is None:
+                return None
+            embedded = Image.open(io.BytesIO(data))
+            embedded.load()
+        except (ExifFormatError, OSError):
+            return None
+        
+        # 内嵌缩略图常为固定的160x120，与原图比例不同时居中裁掉补齐用的黑边
+        width, height = image_size
+        embedded_width, embedded_height = embedded.size
+        if embedded_width * height > embedded_height * width:
+            crop_width = round(embedded_height * width / height)
+            left = (embedded_width - crop_width) // 2
+            embedded = embedded.crop((left, 0, left + crop_width, embedded_height))
+        elif embedded_width * height < embedded_height * width:
+            crop_height = round(embedded_width * height / width)
+            top = (embedded_height - crop_height) // 2
+            embedded = embedded.crop((0, top, embedded_width, top + crop_height))
+        
+        # 内嵌缩略图小于目标尺寸时放大会模糊，改为解码原图
+        target_size = self._get_thumbnail_size(image_size, size)
+        if embedded.width < target_size[0] or embedded.height < target_size[1]:
+            return None
+        
+        if embedded.size != target_size:
+            # 兼容不同PIL版本
+            try:
+                embedded = embedded.resize(target_size, Image.Resampling.LANCZOS)
+            except AttributeError:
+                embedded = embedded.resize(target_size, Image.LANCZOS)
+        return apply_orientation(embedded, orientation)
+    
+    def _get_thumbnail_size(self, image_size: Tuple[int, int], size: Tuple[int, int]) -> Tuple[int, int]:
+        """计算 Image.thumbnail 为该尺寸的图片生成的缩略图大小"""
+        width, height = image_size
+        x, y = min(size[0], width), min(size[1], height)
+        aspect = width / height
+        if x / y >= aspect:
+            candidates = (math.floor(y * aspect), math.ceil(y * aspect))
+            x = max(min(candidates, key=lambda n: abs(aspect - n / y)), 1)
+        else:
+            candidates = (math.floor(x / aspect), math.ceil(x / aspect))
+            y = max(min(candidates, key=lambda n: 0 if n == 0 else abs(aspect - x / n)), 1)
+        return x, y
 
 class ExportManager:
     """导出管理器"""
@@ -276,41 +408,48 @@ class ExportManager:
                 self.export_settings['filename_suffix']
             )
             
-            # 确保输出目录存在
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
-            # 应用图片尺寸调整
-            watermarked_image = self._apply_resize(watermarked_image)
-            
-            # 保存图片
-            if self.export_settings['format'].lower() == 'jpg':
-                # JPEG格式需要转换为RGB模式
-                if watermarked_image.mode in ('RGBA', 'LA', 'P'):
-                    # 创建白色背景
-                    background = Image.new('RGB', watermarked_image.size, (255, 255, 255))
-                    if watermarked_image.mode == 'P':
-                        watermarked_image = watermarked_image.convert('RGBA')
-                    background.paste(watermarked_image, mask=watermarked_image.split()[-1] if watermarked_image.mode == 'RGBA' else None)
-                    watermarked_image = background
-                elif watermarked_image.mode != 'RGB':
-                    watermarked_image = watermarked_image.convert('RGB')
-                
-                watermarked_image.save(
-                    output_path,
-                    'JPEG',
-                    quality=self.export_settings['quality'],
-                    optimize=True
-                )
-            else:
-                # PNG格式
-                watermarked_image.save(output_path, 'PNG', optimize=True)
-            
+            self.save_image(watermarked_image, output_path)
             return True
             
         except Exception as e:
             messagebox.showerror("错误", f"导出图片失败: {e}")
             return False
     
+    def save_image(self, watermarked_image: Image.Image, output_path: str):
+        """按导出设置调整尺寸并保存到指定路径（已存在时覆盖）
+        
+        Raises:
+            OSError: 无法写入输出文件
+        """
+        # 确保输出目录存在
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        
+        # 应用图片尺寸调整
+        watermarked_image = self._apply_resize(watermarked_image)
+        
+        # 保存图片
+        if self.export_settings['format'].lower() == 'jpg':
+            # JPEG格式需要转换为RGB模式
+            if watermarked_image.mode in ('RGBA', 'LA', 'P'):
+                # 创建白色背景
+                background = Image.new('RGB', watermarked_image.size, (255, 255, 255))
+                if watermarked_image.mode == 'P':
+                    watermarked_image = watermarked_image.convert('RGBA')
+                background.paste(watermarked_image, mask=watermarked_image.split()[-1] if watermarked_image.mode == 'RGBA' else None)
+                watermarked_image = background
+            elif watermarked_image.mode != 'RGB':
+                watermarked_image = watermarked_image.convert('RGB')
+            
+            watermarked_image.save(
+                output_path,
+                'JPEG',
+                quality=self.export_settings['quality'],
+                optimize=True
+            )
+        else:
+            # PNG格式
+            watermarked_image.save(output_path, 'PNG', optimize=True)
+    
     def export_batch(self, image_data: List[Tuple[str, Image.Image]], progress_callback=None) -> Tuple[int, int]:
         """批量导出图片"""
         try:
@@ -0,0 +1,589 @@
+# -*- coding: utf-8 -*-
+"""
+文件夹监视模块
+监视导入文件夹（Linux上使用inotify，其他平台定时读取文件状态），图片写入完成后
+按当前模板添加水印并导出；导出记录追加到输出文件夹中的日志，重新启动后
+已导出且未变化的文件不再处理
+
+用法（无界面）:
+  python folder_watch.py <监视文件夹> --template <模板名称> [--output <输出文件夹>]
+  python folder_watch.py <监视文件夹> --template <模板名称> --once
+
+每个文件的处理结果以JSON行的形式输出到标准输出。
+"""
+
+import os
+import sys
+import json
+import time
+import ctypes
+import ctypes.util
+import select
+import struct
+import argparse
+import threading
+import contextlib
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+from PIL import Image
+
+# 添加路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from components.exif_text_watermark import exif_cache
+from components.file_manager import ExportManager, ImageFileManager
+
+# 输出文件夹中的导出日志
+JOURNAL_NAME = '.watch_journal.jsonl'
+
+# 未指定输出文件夹时使用监视文件夹下的子文件夹
+OUTPUT_DIR_NAME = '_watermark'
+
+# inotify 事件（见 <sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+# 写入、关闭、移入和新建都可能意味着文件有了新内容；修改时间被复制工具改写时只有 IN_ATTRIB
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_ONLYDIR
+
+# struct inotify_event 的固定部分: wd, mask, cookie, len
+EVENT_HEADER = struct.Struct('iIII')
+
+# 文件签名: (大小, 修改时间ns)
+Signature = Tuple[int, int]
+
+
+def _is_within(path: str, folder: Optional[str]) -> bool:
+    """判断 path 是否为 folder 本身或其子路径"""
+    if not folder:
+        return False
+    path, folder = os.path.normcase(path), os.path.normcase(folder)
+    return path == folder or path.startswith(folder.rstrip(os.sep) + os.sep)
+
+
+def _is_candidate(name: str) -> bool:
+    """按文件名判断是否需要监视：支持的图片格式，且不是隐藏文件（复制工具的临时文件常以.开头）"""
+    return not name.startswith('.') and Config.validate_image_format(name)
+
+
+def walk_images(folder: str, exclude: str = None) -> Iterator[Tuple[str, os.stat_result]]:
+    """逐个返回文件夹（含子文件夹）中的图片文件及其状态，跳过隐藏项和 exclude 文件夹"""
+    stack = [folder]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if not _is_within(entry.path, exclude):
+                        stack.append(entry.path)
+                elif _is_candidate(entry.name) and entry.is_file():
+                    yield entry.path, entry.stat()
+            except OSError:
+                continue
+
+
+class _PollingBackend:
+    """定时读取文件状态（所有平台可用）"""
+
+    name = 'polling'
+
+    def __init__(self, stop_event: threading.Event):
+        self._stop_event = stop_event
+
+    def wait(self, timeout: float) -> Optional[Set[str]]:
+        """等待 timeout 秒，返回None表示需要重新遍历整个文件夹"""
+        self._stop_event.wait(timeout)
+        return None
+
+    def close(self):
+        pass
+
+
+class _InotifyBackend:
+    """Linux inotify 监视（通过ctypes调用libc），监视文件夹及其全部子文件夹
+
+    Raises:
+        OSError: 当前系统不支持inotify或监视数量超过系统限制
+    """
+
+    name = 'inotify'
+
+    def __init__(self, folder: str, exclude: str = None):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify is not supported by libc")
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._libc = libc
+        self._fd = fd
+        self.exclude = exclude
+        self._directories: Dict[int, str] = {}
+        try:
+            self.watch_tree(folder)
+        except OSError:
+            self.close()
+            raise
+
+    def watch_tree(self, folder: str):
+        """监视文件夹及其全部子文件夹（已监视的文件夹会更新路径）"""
+        stack = [folder]
+        while stack:
+            directory = stack.pop()
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                if not os.path.isdir(directory):
+                    # 文件夹在遍历期间被删除或移走
+                    continue
+                raise OSError(errno, f"inotify_add_watch failed: {directory}")
+            self._directories[wd] = directory
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if (not entry.name.startswith('.') and entry.is_dir(follow_symlinks=False)
+                                and not _is_within(entry.path, self.exclude)):
+                            stack.append(entry.path)
+            except OSError:
+                continue
+
+    def wait(self, timeout: float) -> Optional[Set[str]]:
+        """等待事件（最多 timeout 秒），返回发生变化的文件和新文件夹的路径
+
+        事件队列溢出时返回None，表示需要重新遍历整个文件夹。
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        overflow = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset + EVENT_HEADER.size <= len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                if mask & IN_IGNORED:
+                    self._directories.pop(wd, None)
+                    continue
+                directory = self._directories.get(wd)
+                if directory is None or not name or name.startswith('.'):
+                    continue
+                path = os.path.join(directory, name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and not _is_within(path, self.exclude):
+                        # 新文件夹中在开始监视之前写入的文件由调用方遍历补上
+                        self.watch_tree(path)
+                        changed.add(path)
+                elif _is_candidate(name):
+                    changed.add(path)
+        return None if overflow else changed
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class FolderWatcher:
+    """监视文件夹中新增或变化的图片，文件状态稳定后才视为写入完成
+
+    每个文件记录最近一次看到的 (大小, 修改时间ns) 及其开始保持不变的时间，
+    非空且保持不变超过 settle_time 秒后返回一次；之后再次变化会重新等待。
+    复制工具常保留源文件的修改时间，因此不能按修改时间判断文件是否写完。
+    """
+
+    def __init__(self, folder: str, exclude: str = None, settle_time: float = None,
+                 poll_interval: float = None, use_inotify: bool = True):
+        """初始化监视器
+
+        Args:
+            folder: 监视的文件夹
+            exclude: 不监视的子文件夹（如位于监视文件夹内的输出文件夹）
+            settle_time: 文件状态保持不变多久（秒）后视为写入完成
+            poll_interval: 检查文件的间隔（秒）
+            use_inotify: 是否优先使用inotify
+        """
+        self.folder = os.path.abspath(folder)
+        self.exclude = os.path.abspath(exclude) if exclude else None
+        self.settle_time = Config.WATCH_SETTLE_TIME if settle_time is None else settle_time
+        self.poll_interval = poll_interval or Config.WATCH_POLL_INTERVAL
+        self.use_inotify = use_inotify
+        self._pending: Dict[str, Tuple[Signature, float]] = {}
+        self._reported: Dict[str, Signature] = {}
+        self._rescan = True
+        self._stop_event = threading.Event()
+        self._backend = None
+
+    @property
+    def backend_name(self) -> Optional[str]:
+        return self._backend.name if self._backend else None
+
+    @property
+    def idle(self) -> bool:
+        """已遍历过文件夹且没有等待写入完成的文件"""
+        return not self._rescan and not self._pending
+
+    def start(self):
+        """开始监视；inotify不可用时改为定时读取文件状态"""
+        if self._backend is not None:
+            return
+        if self.use_inotify:
+            try:
+                self._backend = _InotifyBackend(self.folder, self.exclude)
+                return
+            except OSError as e:
+                print(f"inotify不可用，改为定时检查文件: {e}")
+        self._backend = _PollingBackend(self._stop_event)
+
+    def stop(self):
+        """结束正在进行的等待"""
+        self._stop_event.set()
+
+    def close(self):
+        if self._backend is not None:
+            self._backend.close()
+            self._backend = None
+
+    def poll(self, timeout: float = None) -> List[Tuple[str, Signature]]:
+        """等待文件变化（最多 timeout 秒），返回已写入完成的 (图片路径, 签名)"""
+        if self._backend is None:
+            self.start()
+        try:
+            changed = self._backend.wait(self.poll_interval if timeout is None else timeout)
+        except OSError as e:
+            print(f"inotify监视失败，改为定时检查文件: {e}")
+            self._backend.close()
+            self._backend = _PollingBackend(self._stop_event)
+            changed = None
+
+        now = time.monotonic()
+        if changed is None or self._rescan:
+            self._rescan = False
+            seen = set()
+            for path, stat in walk_images(self.folder, self.exclude):
+                seen.add(path)
+                self._observe(path, stat, now)
+            for path in list(self._pending):
+                if path not in seen:
+                    del self._pending[path]
+        else:
+            for path in changed | set(self._pending):
+                self._check(path, now)
+        return self._collect_ready(now)
+
+    def _check(self, path: str, now: float):
+        """读取单个路径的状态；文件夹则遍历其中的图片"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._pending.pop(path, None)
+            self._reported.pop(path, None)
+            return
+        if os.path.isdir(path):
+            for file_path, file_stat in walk_images(path, self.exclude):
+                self._observe(file_path, file_stat, now)
+        else:
+            self._observe(path, stat, now)
+
+    def _observe(self, path: str, stat: os.stat_result, now: float):
+        signature = (stat.st_size, stat.st_mtime_ns)
+        if self._reported.get(path) == signature:
+            return
+        pending = self._pending.get(path)
+        if pending is None or pending[0] != signature:
+            self._pending[path] = (signature, now)
+
+    def _collect_ready(self, now: float) -> List[Tuple[str, Signature]]:
+        ready = []
+        for path, (signature, since) in list(self._pending.items()):
+            if signature[0] > 0 and now - since >= self.settle_time:
+                del self._pending[path]
+                self._reported[path] = signature
+                ready.append((path, signature))
+        return sorted(ready)
+
+
+class WatchJournal:
+    """导出日志（每行一条JSON记录，只追加）
+
+    记录源文件相对于监视文件夹的路径、导出时的大小和修改时间以及输出文件，
+    同一文件以最后一条记录为准。打开时读回全部记录，有过期或不完整的行时重写日志。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, dict] = {}
+        self._file = None
+
+    def open(self):
+        """读回已有记录并打开日志以便追加"""
+        lines = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 中断时最后一行可能只写了一半
+                        continue
+                    if isinstance(record, dict) and 'source' in record:
+                        self.entries[record['source']] = record
+        except OSError:
+            pass
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if lines != len(self.entries):
+            self._rewrite()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _rewrite(self):
+        """原子地重写日志，每个文件只保留最后一条记录"""
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for record in self.entries.values():
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        os.replace(temp_path, self.path)
+
+    def is_done(self, source: str, signature: Signature) -> bool:
+        """判断文件是否已以相同的大小和修改时间导出过"""
+        record = self.entries.get(source)
+        return record is not None and (record.get('size'), record.get('mtime_ns')) == tuple(signature)
+
+    def record(self, source: str, signature: Signature, output: str):
+        """追加一条导出记录"""
+        record = {'source': source, 'size': signature[0], 'mtime_ns': signature[1], 'output': output}
+        self.entries[source] = record
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class HotFolderWatch:
+    """监视文件夹并按渲染计划导出新增或变化的图片
+
+    图片写入完成后用 plan 添加水印，按 export_manager 的导出设置保存到其输出文件夹；
+    变化的图片覆盖上次导出的文件。每个文件处理完后调用 on_result(处理结果)，
+    结果与 exif_watermark 脚本的JSON行格式相同。
+    """
+
+    def __init__(self, watch_folder: str, plan, export_manager: ExportManager,
+                 on_result: Callable[[dict], None] = None, settle_time: float = None,
+                 poll_interval: float = None, use_inotify: bool = True):
+        """初始化监视任务
+
+        Raises:
+            ValueError: 没有可用的渲染计划、未设置输出文件夹，或输出文件夹就是监视文件夹
+        """
+        if plan is None:
+            # 不导出没有水印的副本
+            raise ValueError("当前水印不可用，请先完成水印设置（图片水印需选择水印图片）")
+        self.watch_folder = os.path.abspath(watch_folder)
+        if not export_manager.output_folder:
+            raise ValueError("请先设置输出文件夹")
+        output_folder = os.path.abspath(export_manager.output_folder)
+        if os.path.normcase(output_folder) == os.path.normcase(self.watch_folder):
+            raise ValueError("输出文件夹不能与监视文件夹相同")
+
+        self.plan = plan
+        self.export_manager = export_manager
+        self.on_result = on_result
+        self.file_manager = ImageFileManager()
+        self.journal = WatchJournal(os.path.join(output_folder, JOURNAL_NAME))
+        self.watcher = FolderWatcher(self.watch_folder, output_folder, settle_time,
+                                     poll_interval, use_inotify)
+        self.counts = {'done': 0, 'skipped': 0, 'failed': 0}
+        self._stop_event = threading.Event()
+
+    def run(self, once: bool = False):
+        """在当前线程中监视，直到调用 stop；once 为True时处理完现有文件后返回"""
+        self.journal.open()
+        self.watcher.start()
+        try:
+            while not self._stop_event.is_set():
+                ready = self.watcher.poll()
+                for path, signature in ready:
+                    if self._stop_event.is_set():
+                        break
+                    self.process(path, signature)
+                if ready:
+                    # 一批文件处理完后提交EXIF缓存的写入
+                    exif_cache.flush()
+                if once and self.watcher.idle:
+                    break
+        finally:
+            self.watcher.close()
+            self.journal.close()
+            exif_cache.flush()
+
+    def stop(self):
+        """停止监视（正在处理的文件处理完后返回）"""
+        self._stop_event.set()
+        self.watcher.stop()
+
+    def process(self, path: str, signature: Signature) -> dict:
+        """为写入完成的图片添加水印并导出，返回处理结果"""
+        source = os.path.relpath(path, self.watch_folder).replace(os.sep, '/')
+        record = self.journal.entries.get(source)
+        if self.journal.is_done(source, signature):
+            result = {'source': path, 'output': record['output'], 'status': 'skipped', 'reason': 'up-to-date'}
+        else:
+            output = record['output'] if record else self.export_manager.generate_filename(path)
+            result = {'source': path, 'output': output}
+            try:
+                if not self.file_manager.validate_image_file(path):
+                    result.update(status='failed', error='invalid image')
+                else:
+                    with Image.open(path) as img:
+                        image = img.copy()
+                    image = self.plan.render(image, path)
+                    self.export_manager.save_image(image, output)
+                    self.journal.record(source, signature, output)
+                    result['status'] = 'done'
+            except Exception as e:
+                result.update(status='failed', error=str(e))
+
+        self.counts[result['status']] += 1
+        if self.on_result:
+            self.on_result(result)
+        return result
+
+
+def compile_template(template):
+    """按模板的水印类型创建水印并编译为渲染计划"""
+    from components.text_watermark import TextWatermark
+    from components.image_watermark import ImageWatermark
+    from components.exif_text_watermark import ExifTextWatermark
+
+    if template.watermark_type == 'image':
+        watermark = ImageWatermark()
+        watermark.load_from_dict(template.image_settings)
+    elif template.watermark_type == 'exif':
+        watermark = ExifTextWatermark()
+        watermark.load_from_dict(template.exif_settings)
+    else:
+        watermark = TextWatermark()
+        watermark.load_from_dict(template.text_settings)
+        if 'rotation_angle' in template.advanced_settings:
+            watermark.angle = template.advanced_settings['rotation_angle']
+    return watermark.compile()
+
+
+def create_export_manager(template, output_folder: str) -> ExportManager:
+    """按模板的导出设置（格式、命名、质量、尺寸）创建导出管理器"""
+    settings = template.export_settings or {}
+    naming = settings.get('naming', 'original')
+    prefix = settings.get('prefix', '') if naming in ('prefix', 'both') else ''
+    suffix = settings.get('suffix', '') if naming in ('suffix', 'both') else ''
+
+    resize_settings = dict(settings.get('resize_settings', {}))
+    if resize_settings.get('percent'):
+        # 模板中保存的是百分数
+        resize_settings['percent'] = float(resize_settings['percent']) / 100
+
+    export_manager = ExportManager()
+    export_manager.output_folder = output_folder
+    export_manager.update_export_settings({
+        'format': settings.get('format', 'jpg'),
+        'quality': settings.get('quality', 95),
+        'filename_prefix': prefix,
+        'filename_suffix': suffix,
+        'resize_settings': resize_settings
+    })
+    return export_manager
+
+
+def emit(record, stream=None):
+    """输出一行JSON进度"""
+    print(json.dumps(record, ensure_ascii=False), file=stream or sys.stdout, flush=True)
+
+
+def main(argv=None):
+    from components.template_manager import TemplateManager
+
+    parser = argparse.ArgumentParser(description='监视文件夹，按模板为新增或变化的图片添加水印')
+    parser.add_argument('folder')
+    parser.add_argument('--template', '-t', help='模板名称，默认使用配置中的默认模板')
+    parser.add_argument('--output', '-o', help=f'输出文件夹，默认为监视文件夹下的 {OUTPUT_DIR_NAME}')
+    parser.add_argument('--settle', type=float, default=Config.WATCH_SETTLE_TIME,
+                        help='文件大小和修改时间保持不变多少秒后视为写入完成')
+    parser.add_argument('--interval', type=float, default=Config.WATCH_POLL_INTERVAL,
+                        help='检查文件的间隔（秒）')
+    parser.add_argument('--polling', action='store_true', help='不使用inotify，定时读取文件状态')
+    parser.add_argument('--once', action='store_true', help='处理完现有文件后退出')
+    args = parser.parse_args(argv)
+
+    stdout = sys.stdout
+
+    def report(record):
+        emit(record, stdout)
+
+    def fail(message):
+        report(dict(event='error', error=message))
+        sys.exit(1)
+
+    if not os.path.isdir(args.folder):
+        fail('文件夹不存在')
+    template_name = args.template or Config.load_config().get('default_template', '')
+    if not template_name:
+        fail('请使用 --template 指定模板')
+
+    # 库函数的诊断输出被转到标准错误，不与JSON行混在一起
+    with contextlib.redirect_stdout(sys.stderr):
+        template = TemplateManager().load_template(template_name)
+        if template is None:
+            fail(f'模板不存在: {template_name}')
+
+        output_folder = args.output or os.path.join(args.folder, OUTPUT_DIR_NAME)
+        export_manager = create_export_manager(template, output_folder)
+        try:
+            watch = HotFolderWatch(args.folder, compile_template(template), export_manager, report,
+                                   args.settle, args.interval, not args.polling)
+        except ValueError as e:
+            fail(str(e))
+        try:
+            watch.watcher.start()
+            report(dict(event='watch', folder=watch.watch_folder, output=os.path.abspath(output_folder),
+                        template=template.name, backend=watch.watcher.backend_name))
+            watch.run(args.once)
+        except KeyboardInterrupt:
+            pass
+        except OSError as e:
+            fail(f'监视文件夹失败: {e}')
+        finally:
+            watch.stop()
+    report(dict(event='summary', **watch.counts))
+
+
+if __name__ == '__main__':
+    main()
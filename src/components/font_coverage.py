@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+字体字符覆盖索引模块
+记录每个已安装字体cmap表覆盖的字符范围，为水印文本选择能完整显示的字体
+"""
+
+import os
+import sys
+import json
+import struct
+import threading
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+from PIL import ImageFont
+
+# 添加路径
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import Config
+from components.font_registry import font_registry, FALLBACK_FONTS, FontRegistry
+
+# 覆盖索引缓存文件格式版本
+COVERAGE_CACHE_VERSION = 1
+
+Ranges = List[Tuple[int, int]]
+
+
+def _merge_ranges(ranges: Ranges) -> Ranges:
+    """合并相邻或重叠的字符范围"""
+    merged: Ranges = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _parse_format4(data: bytes, offset: int) -> Ranges:
+    """解析cmap格式4子表（BMP字符）"""
+    seg_count = struct.unpack_from('>H', data, offset + 6)[0] // 2
+    end_codes = struct.unpack_from(f'>{seg_count}H', data, offset + 14)
+    start_offset = offset + 16 + seg_count * 2
+    start_codes = struct.unpack_from(f'>{seg_count}H', data, start_offset)
+    id_deltas = struct.unpack_from(f'>{seg_count}h', data, start_offset + seg_count * 2)
+    range_offset_pos = start_offset + seg_count * 4
+    id_range_offsets = struct.unpack_from(f'>{seg_count}H', data, range_offset_pos)
+    
+    ranges: Ranges = []
+    for i in range(seg_count):
+        start, end = start_codes[i], end_codes[i]
+        if start == 0xFFFF:
+            continue
+        if id_range_offsets[i] == 0:
+            ranges.append((start, end))
+            continue
+        # 通过glyphIdArray映射的字符需要逐个排除映射到缺失字形(0)的字符
+        base = range_offset_pos + i * 2 + id_range_offsets[i]
+        for code in range(start, end + 1):
+            pos = base + (code - start) * 2
+            if pos + 2 > len(data):
+                break
+            if struct.unpack_from('>H', data, pos)[0] != 0:
+                ranges.append((code, code))
+    return ranges
+
+
+def _parse_format12(data: bytes, offset: int) -> Ranges:
+    """解析cmap格式12子表（完整Unicode字符）"""
+    group_count = struct.unpack_from('>I', data, offset + 12)[0]
+    ranges: Ranges = []
+    for i in range(group_count):
+        start, end, _ = struct.unpack_from('>III', data, offset + 16 + i * 12)
+        ranges.append((start, end))
+    return ranges
+
+
+def read_cmap_ranges(path: str, font_index: int = 0) -> Ranges:
+    """读取字体文件cmap表覆盖的Unicode字符范围
+    
+    只读取文件头、表目录和cmap表本身，不加载字形数据。
+    """
+    with open(path, 'rb') as f:
+        header = f.read(12)
+        offset = 0
+        if header[:4] == b'ttcf':
+            # 字体集合：定位到指定索引的字体
+            f.seek(12 + font_index * 4)
+            offset = struct.unpack('>I', f.read(4))[0]
+            f.seek(offset)
+            header = f.read(12)
+        
+        table_count = struct.unpack_from('>H', header, 4)[0]
+        f.seek(offset + 12)
+        directory = f.read(table_count * 16)
+        
+        cmap = None
+        for i in range(table_count):
+            tag, _, table_offset, length = struct.unpack_from('>4sIII', directory, i * 16)
+            if tag == b'cmap':
+                f.seek(table_offset)
+                cmap = f.read(length)
+                break
+    
+    if not cmap:
+        return []
+    
+    ranges: Ranges = []
+    subtable_count = struct.unpack_from('>H', cmap, 2)[0]
+    for i in range(subtable_count):
+        platform_id, encoding_id, sub_offset = struct.unpack_from('>HHI', cmap, 4 + i * 8)
+        # 只使用Unicode编码的子表
+        if not (platform_id == 0 or (platform_id == 3 and encoding_id in (1, 10))):
+            continue
+        subtable_format = struct.unpack_from('>H', cmap, sub_offset)[0]
+        if subtable_format == 4:
+            ranges.extend(_parse_format4(cmap, sub_offset))
+        elif subtable_format == 12:
+            ranges.extend(_parse_format12(cmap, sub_offset))
+    
+    return _merge_ranges(ranges)
+
+
+def _required_chars(text: str) -> List[int]:
+    """获取文本中需要字体提供字形的字符（忽略空白和控制字符）"""
+    return sorted({ord(ch) for ch in text if not ch.isspace() and ord(ch) >= 0x20})
+
+
+def _count_covered(ranges: Ranges, starts: List[int], chars: List[int]) -> int:
+    """统计字符列表中被字符范围覆盖的数量"""
+    covered = 0
+    for code in chars:
+        i = bisect_right(starts, code) - 1
+        if i >= 0 and ranges[i][1] >= code:
+            covered += 1
+    return covered
+
+
+class FontCoverageIndex:
+    """字体字符覆盖索引（线程安全）
+    
+    首次使用时读取全部已安装字体的cmap表，结果按文件大小和修改时间
+    持久化到缓存文件，之后启动只重新解析发生变化的字体。
+    """
+    
+    def __init__(self, registry: FontRegistry = None, cache_file: str = None):
+        """初始化覆盖索引
+        
+        Args:
+            registry: 提供字体文件列表的字体注册表
+            cache_file: 覆盖索引缓存文件路径
+        """
+        self.registry = registry or font_registry
+        self.cache_file = cache_file if cache_file is not None else Config.FONT_COVERAGE_CACHE
+        self._lock = threading.RLock()
+        self._coverage: Optional[Dict[str, Tuple[Ranges, List[int]]]] = None
+        self._best_font: Dict[frozenset, Optional[str]] = {}
+    
+    def _reset_lock(self):
+        """重建锁（在fork出的子进程中调用，避免继承已被占用的锁）"""
+        self._lock = threading.RLock()
+    
+    def _load_cache(self) -> Dict[str, dict]:
+        """读取覆盖索引缓存文件"""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == COVERAGE_CACHE_VERSION:
+                return data.get('fonts', {})
+        except (OSError, ValueError):
+            pass
+        return {}
+    
+    def _save_cache(self, fonts: Dict[str, dict]):
+        """写入覆盖索引缓存文件"""
+        try:
+            cache_dir = os.path.dirname(self.cache_file)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            temp_file = f"{self.cache_file}.tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': COVERAGE_CACHE_VERSION, 'fonts': fonts}, f)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            print(f"保存字体覆盖索引失败: {e}")
+    
+    def _build(self) -> Dict[str, Tuple[Ranges, List[int]]]:
+        """建立覆盖索引，未变化的字体直接使用缓存"""
+        cached = self._load_cache()
+        fonts: Dict[str, dict] = {}
+        changed = False
+        
+        for path in self.registry.get_font_paths():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entry = cached.get(path)
+            if not entry or entry.get('size') != stat.st_size or entry.get('mtime') != stat.st_mtime:
+                try:
+                    ranges = read_cmap_ranges(path)
+                except (OSError, struct.error) as e:
+                    print(f"读取字体字符表失败 {path}: {e}")
+                    ranges = []
+                entry = {'size': stat.st_size, 'mtime': stat.st_mtime, 'ranges': ranges}
+                changed = True
+            fonts[path] = entry
+        
+        if changed or len(fonts) != len(cached):
+            self._save_cache(fonts)
+        
+        coverage = {}
+        for path, entry in fonts.items():
+            ranges = [tuple(r) for r in entry['ranges']]
+            coverage[path] = (ranges, [r[0] for r in ranges])
+        return coverage
+    
+    def _get_coverage(self) -> Dict[str, Tuple[Ranges, List[int]]]:
+        """获取覆盖索引（首次调用时建立）"""
+        with self._lock:
+            if self._coverage is None:
+                self._coverage = self._build()
+            return self._coverage
+    
+    def covers(self, path: Optional[str], text: str) -> bool:
+        """判断字体是否能显示文本中的全部字符"""
+        chars = _required_chars(text)
+        if path is None:
+            # 默认字体只保证覆盖ASCII字符
+            return all(code < 0x80 for code in chars)
+        
+        entry = self._get_coverage().get(path)
+        if entry is None:
+            try:
+                ranges = read_cmap_ranges(path)
+            except (OSError, struct.error):
+                return True
+            entry = (ranges, [r[0] for r in ranges])
+            with self._lock:
+                self._coverage[path] = entry
+        ranges, starts = entry
+        return _count_covered(ranges, starts, chars) == len(chars)
+    
+    def find_best_font(self, text: str) -> Optional[str]:
+        """为文本选择覆盖字符最多的字体，覆盖相同时优先选择备用字体列表中靠前的字体"""
+        chars = _required_chars(text)
+        if not chars:
+            return None
+        key = frozenset(chars)
+        
+        with self._lock:
+            if key in self._best_font:
+                return self._best_font[key]
+            
+            preferred = {}
+            for rank, candidate in enumerate(FALLBACK_FONTS):
+                path = self.registry.resolve(candidate)
+                if path and path not in preferred:
+                    preferred[path] = rank
+            
+            best_path, best_score = None, None
+            for path, (ranges, starts) in sorted(self._get_coverage().items()):
+                covered = _count_covered(ranges, starts, chars)
+                if covered == 0:
+                    continue
+                score = (covered, -preferred.get(path, len(FALLBACK_FONTS)))
+                if best_score is None or score > best_score:
+                    best_path, best_score = path, score
+            
+            self._best_font[key] = best_path
+            return best_path
+    
+    def clear(self):
+        """清空内存中的覆盖索引（字体安装或卸载后调用）"""
+        with self._lock:
+            self._coverage = None
+            self._best_font.clear()
+
+
+# 进程内共享的字体覆盖索引
+coverage_index = FontCoverageIndex()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=coverage_index._reset_lock)
+
+
+def resolve_font_path_for_text(family: str, text: str) -> Optional[str]:
+    """解析能显示文本的字体文件路径
+    
+    优先使用指定字体；指定字体无法显示文本中的全部字符时，
+    改用覆盖字符最多的已安装字体。没有可用字体文件时返回None（默认字体）。
+    """
+    path = font_registry.resolve(family) or font_registry.resolve_fallback()
+    if coverage_index.covers(path, text):
+        return path
+    return coverage_index.find_best_font(text) or path
+
+
+def get_font_for_text(family: str, text: str, size: int) -> ImageFont.ImageFont:
+    """获取能显示文本的字体"""
+    path = resolve_font_path_for_text(family, text)
+    font = font_registry.load(path, size) if path else None
+    if font is not None:
+        return font
+    return font_registry.get_font(family, size)
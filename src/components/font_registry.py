@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+字体注册表模块
+进程内共享的字体查找与缓存，系统字体目录只扫描一次
+"""
+
+import os
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+from PIL import ImageFont
+
+# 字体文件扩展名
+FONT_EXTENSIONS = ('.ttf', '.ttc', '.otf', '.otc')
+
+# 用户指定字体不可用时依次尝试的字体（优先支持中文）
+FALLBACK_FONTS = [
+    # macOS 中文字体
+    "/System/Library/Fonts/STHeiti Medium.ttc",
+    "/System/Library/Fonts/Hiragino Sans GB.ttc",
+    "/System/Library/Fonts/Supplemental/Songti.ttc",
+    "STHeiti Medium.ttc",
+    "Hiragino Sans GB.ttc",
+    # 通用字体（也支持中文）
+    "Arial.ttf",
+    "Helvetica.ttc",
+    # Windows 中文字体
+    "C:/Windows/Fonts/simsun.ttc",
+    "C:/Windows/Fonts/simhei.ttf",
+    "C:/Windows/Fonts/msyh.ttc",
+    # Linux 中文字体
+    "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc"
+]
+
+
+def get_system_font_dirs() -> List[str]:
+    """获取当前平台的系统字体目录"""
+    home = os.path.expanduser("~")
+    if sys.platform == "win32":
+        windir = os.environ.get("WINDIR", "C:/Windows")
+        dirs = [os.path.join(windir, "Fonts")]
+        local_appdata = os.environ.get("LOCALAPPDATA")
+        if local_appdata:
+            dirs.append(os.path.join(local_appdata, "Microsoft", "Windows", "Fonts"))
+        return dirs
+    if sys.platform == "darwin":
+        return [
+            "/System/Library/Fonts",
+            "/Library/Fonts",
+            os.path.join(home, "Library", "Fonts")
+        ]
+    
+    data_dirs = os.environ.get("XDG_DATA_DIRS", "/usr/local/share:/usr/share").split(":")
+    dirs = [os.path.join(d, "fonts") for d in data_dirs if d]
+    dirs.append(os.path.join(os.environ.get("XDG_DATA_HOME", os.path.join(home, ".local", "share")), "fonts"))
+    dirs.append(os.path.join(home, ".fonts"))
+    return dirs
+
+
+def _normalize_name(name: str) -> str:
+    """规范化字体名称：小写并去掉空格、连字符和下划线"""
+    return "".join(ch for ch in name.lower() if ch not in " -_")
+
+
+class FontRegistry:
+    """字体注册表（线程安全）
+    
+    首次使用时扫描一次系统字体目录，记住每个字体族解析到的字体文件，
+    并按 (路径, 字号, 字体索引) 缓存 FreeTypeFont 对象。
+    """
+    
+    def __init__(self, font_dirs: List[str] = None):
+        """初始化字体注册表
+        
+        Args:
+            font_dirs: 要扫描的字体目录，默认使用系统字体目录
+        """
+        self.font_dirs = font_dirs
+        self._lock = threading.RLock()
+        self._index: Optional[Dict[str, str]] = None
+        self._resolved: Dict[str, Optional[str]] = {}
+        self._fallback_path: Optional[str] = None
+        self._fallback_resolved = False
+        self._fonts: Dict[Tuple[Optional[str], int, int], ImageFont.ImageFont] = {}
+    
+    def _reset_lock(self):
+        """重建锁（在fork出的子进程中调用，避免继承已被占用的锁）"""
+        self._lock = threading.RLock()
+    
+    def _scan(self) -> Dict[str, str]:
+        """扫描字体目录，建立文件名到路径的索引"""
+        index: Dict[str, str] = {}
+        for font_dir in self.font_dirs if self.font_dirs is not None else get_system_font_dirs():
+            if not os.path.isdir(font_dir):
+                continue
+            for root, dirs, files in os.walk(font_dir):
+                for filename in files:
+                    stem, ext = os.path.splitext(filename)
+                    if ext.lower() not in FONT_EXTENSIONS:
+                        continue
+                    path = os.path.join(root, filename)
+                    # 同名字体以先扫描到的为准
+                    for key in (filename.lower(), stem.lower(), _normalize_name(stem)):
+                        index.setdefault(key, path)
+        return index
+    
+    def get_font_paths(self) -> List[str]:
+        """获取扫描到的全部字体文件路径"""
+        with self._lock:
+            if self._index is None:
+                self._index = self._scan()
+            return sorted(set(self._index.values()))
+    
+    def _lookup(self, family: str) -> Optional[str]:
+        """在字体索引中查找字体文件，不加载字体"""
+        if os.path.isfile(family):
+            return os.path.abspath(family)
+        
+        if self._index is None:
+            self._index = self._scan()
+        
+        name = os.path.basename(family)
+        stem = os.path.splitext(name)[0]
+        for key in (name.lower(), stem.lower(), _normalize_name(stem)):
+            if key in self._index:
+                return self._index[key]
+        return None
+    
+    def resolve(self, family: str) -> Optional[str]:
+        """将字体族名称、文件名或路径解析为字体文件路径
+        
+        解析结果（包括解析失败）会被记住，同一字体族只查找一次。
+        """
+        if not family:
+            return None
+        with self._lock:
+            if family not in self._resolved:
+                self._resolved[family] = self._lookup(family)
+            return self._resolved[family]
+    
+    def resolve_fallback(self) -> Optional[str]:
+        """解析第一个可用的备用字体"""
+        with self._lock:
+            if not self._fallback_resolved:
+                for candidate in FALLBACK_FONTS:
+                    path = self.resolve(candidate)
+                    if path:
+                        print(f"Using fallback Chinese font: {path}")
+                        self._fallback_path = path
+                        break
+                self._fallback_resolved = True
+            return self._fallback_path
+    
+    def load(self, path: Optional[str], size: int, index: int = 0) -> Optional[ImageFont.ImageFont]:
+        """按 (路径, 字号, 字体索引) 加载并缓存字体对象"""
+        key = (path, size, index)
+        with self._lock:
+            if key in self._fonts:
+                return self._fonts[key]
+            
+            font = None
+            if path is None:
+                try:
+                    font = ImageFont.load_default(size=size)
+                except TypeError:
+                    # 较老版本的PIL不支持指定默认字体大小
+                    font = ImageFont.load_default()
+            else:
+                try:
+                    font = ImageFont.truetype(path, size, index=index)
+                except (OSError, IOError) as e:
+                    print(f"Load font failed {path}: {e}")
+                    return None
+            
+            self._fonts[key] = font
+            return font
+    
+    def get_font(self, family: str, size: int, index: int = 0) -> ImageFont.ImageFont:
+        """获取字体对象，用户指定字体不可用时依次使用备用字体和默认字体"""
+        path = self.resolve(family)
+        font = self.load(path, size, index) if path else None
+        if font is not None:
+            return font
+        
+        fallback_path = self.resolve_fallback()
+        font = self.load(fallback_path, size) if fallback_path else None
+        if font is not None:
+            return font
+        
+        # 检查和加载在同一把锁内完成，同一字号的警告只输出一次
+        with self._lock:
+            if not self._fonts.get((None, size, 0)):
+                print("Warning: Using default font, Chinese characters may not display correctly")
+            return self.load(None, size)
+    
+    def clear(self):
+        """清空已加载的字体和解析结果（字体安装或卸载后调用）"""
+        with self._lock:
+            self._index = None
+            self._resolved.clear()
+            self._fallback_path = None
+            self._fallback_resolved = False
+            self._fonts.clear()
+
+
+# 进程内共享的字体注册表
+font_registry = FontRegistry()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=font_registry._reset_lock)
+
+
+def get_font(family: str, size: int, index: int = 0) -> ImageFont.ImageFont:
+    """从共享字体注册表获取字体对象"""
+    return font_registry.get_font(family, size, index)
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+字形图集模块
+EXIF日期水印只用到很少的字符（数字、分隔符和固定的前后缀），
+每个字形只光栅化一次，标签由缓存的字形按字体的步进宽度拼接而成
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from PIL import Image, ImageFont
+
+# 每个图集缓存的拼接标签数量（批量处理时同一天拍摄的照片共用同一个标签）
+LABEL_CACHE_SIZE = 256
+
+# 进程内最多保留的图集数量
+MAX_ATLASES = 32
+
+# 兼容不同PIL版本
+LAYOUT_BASIC = ImageFont.Layout.BASIC if hasattr(ImageFont, 'Layout') else ImageFont.LAYOUT_BASIC
+
+# ImageDraw.text 用 stroke_filled=True 光栅化描边层，旧版PIL没有该参数，描边时只能直接绘制；
+# 新版PIL的签名只有 **kwargs，因此在第一次描边时实际调用一次来判断（None 表示尚未判断）
+STROKE_FILLED_SUPPORTED: Optional[bool] = None
+
+# 标签: (与 textbbox 一致的文本边界框, L模式遮罩, 遮罩左上角相对于文本绘制原点的偏移)
+Label = Tuple[Tuple[int, int, int, int], Image.Image, Tuple[int, int]]
+
+
+class GlyphAtlas:
+    """单个字体的字形图集（线程安全）
+
+    按 (字符, 描边宽度) 缓存灰度遮罩、遮罩偏移和步进宽度（1/64像素），以及拼接好的标签。
+    遮罩与颜色无关，阴影和文本共用同一遮罩、按各自颜色填充；字形的叠加方式
+    和填充方式都与 ImageDraw.text 相同，因此结果与直接绘制逐像素一致。
+
+    只处理基本排版且相邻字符之间没有字距调整的文本，其余情况
+    （含换行、字距对、复杂排版）返回None，由调用方直接绘制。
+    """
+
+    def __init__(self, font: ImageFont.FreeTypeFont):
+        self.font = font
+        self._glyphs: Dict[Tuple[str, int], Tuple[Optional[Image.Image], Tuple[int, int], int]] = {}
+        self._kerned_pairs: Dict[str, bool] = {}
+        self._labels: "OrderedDict[Tuple[str, int], Optional[Label]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _advance(self, text: str) -> int:
+        """文本的步进宽度，单位为1/64像素"""
+        return round(self.font.getlength(text, 'L') * 64)
+
+    def get_glyph(self, char: str, stroke_width: int = 0) -> Tuple[Optional[Image.Image], Tuple[int, int], int]:
+        """获取字符的 (遮罩, 遮罩偏移, 步进宽度)，空白字符的遮罩为None"""
+        key = (char, stroke_width)
+        glyph = self._glyphs.get(key)
+        if glyph is None:
+            if stroke_width:
+                core, offset = self.font.getmask2(char, 'L', stroke_width=stroke_width,
+                                                  stroke_filled=True)
+            else:
+                core, offset = self.font.getmask2(char, 'L')
+            width, height = core.size
+            mask = Image.frombytes('L', core.size, bytes(core)) if width and height else None
+            glyph = (mask, tuple(offset), self._advance(char))
+            self._glyphs[key] = glyph
+        return glyph
+
+    def is_kerned(self, pair: str) -> bool:
+        """判断两个相邻字符之间是否有字距调整"""
+        kerned = self._kerned_pairs.get(pair)
+        if kerned is None:
+            kerned = self._advance(pair) != self.get_glyph(pair[0])[2] + self.get_glyph(pair[1])[2]
+            self._kerned_pairs[pair] = kerned
+        return kerned
+
+    def assemble(self, text: str, stroke_width: int = 0) -> Optional[Label]:
+        """用缓存的字形拼接标签（stroke_width 非0时为描边层），无法与直接绘制保持一致时返回None"""
+        if not text or '\n' in text or '\r' in text:
+            return None
+        if stroke_width and not stroke_filled_supported(self.font):
+            return None
+        if any(self.is_kerned(text[i:i + 2]) for i in range(len(text) - 1)):
+            return None
+
+        pieces = []
+        pen = 0
+        for char in text:
+            mask, (offset_x, offset_y), advance = self.get_glyph(char, stroke_width)
+            if mask is not None:
+                pieces.append((mask, (pen // 64 + offset_x, offset_y)))
+            pen += advance
+        if not pieces:
+            return None
+
+        left = min(x for _, (x, _) in pieces)
+        top = min(y for _, (_, y) in pieces)
+        right = max(x + mask.width for mask, (x, _) in pieces)
+        bottom = max(y + mask.height for mask, (_, y) in pieces)
+
+        # 以字形遮罩为透明度逐个叠加，相邻字形重叠处与整串光栅化的结果一致
+        label_mask = Image.new('L', (right - left, bottom - top), 0)
+        for mask, (x, y) in pieces:
+            label_mask.paste(255, (x - left, y - top, x - left + mask.width, y - top + mask.height), mask)
+
+        bbox = self.font.getbbox(text, 'L')
+        return (bbox, label_mask, (left, top))
+
+    def get_label(self, text: str, stroke_width: int = 0) -> Optional[Label]:
+        """获取拼接好的标签（优先使用缓存）"""
+        key = (text, stroke_width)
+        with self._lock:
+            if key in self._labels:
+                self._labels.move_to_end(key)
+                return self._labels[key]
+
+            label = self.assemble(text, stroke_width)
+            self._labels[key] = label
+            while len(self._labels) > LABEL_CACHE_SIZE:
+                self._labels.popitem(last=False)
+            return label
+
+
+def stroke_filled_supported(font: ImageFont.FreeTypeFont) -> bool:
+    """判断当前PIL的 getmask2 是否支持 stroke_filled 参数（结果在进程内缓存）"""
+    global STROKE_FILLED_SUPPORTED
+    if STROKE_FILLED_SUPPORTED is None:
+        try:
+            font.getmask2('a', 'L', stroke_width=1, stroke_filled=True)
+            STROKE_FILLED_SUPPORTED = True
+        except TypeError:
+            STROKE_FILLED_SUPPORTED = False
+    return STROKE_FILLED_SUPPORTED
+
+
+_atlases: "OrderedDict[ImageFont.ImageFont, GlyphAtlas]" = OrderedDict()
+_atlases_lock = threading.Lock()
+
+
+def get_glyph_atlas(font: ImageFont.ImageFont) -> Optional[GlyphAtlas]:
+    """获取字体对应的字形图集，字体不支持按字形拼接时返回None
+
+    字体对象由字体注册表按 (路径, 字号, 字体索引) 共享，同一字体只建立一个图集。
+    """
+    if not isinstance(font, ImageFont.FreeTypeFont) or not hasattr(font, 'getlength'):
+        return None
+    # 复杂排版（Raqm）会做字形替换和组合，无法按单个字符拼接
+    if font.layout_engine != LAYOUT_BASIC:
+        return None
+
+    with _atlases_lock:
+        atlas = _atlases.get(font)
+        if atlas is None:
+            atlas = GlyphAtlas(font)
+            _atlases[font] = atlas
+            while len(_atlases) > MAX_ATLASES:
+                _atlases.popitem(last=False)
+        else:
+            _atlases.move_to_end(font)
+        return atlas
+
+
+def paste_label(image: Image.Image, label: Label, position: Tuple[int, int],
+                color: Tuple[int, int, int, int]):
+    """按标签遮罩在指定文本绘制原点处填充颜色（原地修改），等价于 ImageDraw.text"""
+    _, mask, (offset_x, offset_y) = label
+    x, y = position[0] + offset_x, position[1] + offset_y
+    image.paste(color, (x, y, x + mask.width, y + mask.height), mask)
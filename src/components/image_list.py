@@ -5,59 +5,53 @@
 """
 
 import os
-from typing import List, Dict, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Callable, Tuple
 from PIL import Image
 import threading
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from config import Config
+from components.library_index import LibraryIndex, library_index
 
 class ImageListManager:
     """图片列表管理器"""
     
-    def __init__(self):
-        """初始化图片列表管理器"""
+    def __init__(self, index: LibraryIndex = None):
+        """初始化图片列表管理器
+        
+        Args:
+            index: 保存图片信息和缩略图位置的图片库索引，默认为进程内共享的索引
+        """
         self.image_list: List[Dict] = []
+        self._paths = set()  # 已添加的图片路径，用于快速去重
+        self.library_index = index or library_index  # 持久保存图片信息和缩略图位置
         self.thumbnail_cache: Dict[str, Image.Image] = {}
         self.current_index = 0
         self.callbacks: List[Callable] = []
+        
+        # 后台预读EXIF元数据和创建缩略图的线程池（按需创建，线程数有上限）
+        self._metadata_executor: Optional[ThreadPoolExecutor] = None
+        self._thumbnail_executor: Optional[ThreadPoolExecutor] = None
+        self._metadata_lock = threading.Lock()
+        # 已提交但尚未完成的任务，取消时逐个取消（cancel_futures 需要 Python 3.9）
+        self._pending_futures = set()
     
     def add_image(self, file_path: str) -> bool:
         """添加图片到列表"""
         try:
             # 检查是否已存在
-            if self._find_image_by_path(file_path) is not None:
+            if file_path in self._paths:
                 return False
             
-            # 获取图片信息
-            from components.file_manager import ImageFileManager
-            file_manager = ImageFileManager()
-            image_info = file_manager.get_image_info(file_path)
+            # 获取图片信息（文件未变化时使用索引）
+            image_info = self.library_index.get_image_info(file_path)
             
             if not image_info:
                 return False
             
-            # 添加到列表
-            image_data = {
-                'path': file_path,
-                'filename': image_info['filename'],
-                'size': image_info['size'],
-                'mode': image_info['mode'],
-                'format': image_info['format'],
-                'file_size': image_info['file_size'],
-                'thumbnail': None,
-                'loaded': False
-            }
-            
-            self.image_list.append(image_data)
-            
-            # 如果这是第一张图片，设置为当前图片
-            if len(self.image_list) == 1:
-                self.current_index = 0
-            
-            # 异步创建缩略图
-            self._create_thumbnail_async(image_data)
+            image_data = self._append_image(file_path, image_info)
             
             # 通知回调
             self._notify_callbacks('image_added', image_data)
@@ -72,12 +66,69 @@ class ImageListManager:
             print(f"添加图片失败: {e}")
             return False
     
+    def add_images(self, items: List[Tuple[str, Dict]]) -> int:
+        """批量添加已读取图片信息的图片，只通知一次回调
+        
+        Args:
+            items: (图片路径, get_image_info 返回的图片信息) 列表
+        
+        Returns:
+            实际添加的图片数量（已在列表中的图片会被跳过）
+        """
+        was_empty = not self.image_list
+        added = []
+        for file_path, image_info in items:
+            if file_path in self._paths:
+                continue
+            try:
+                added.append(self._append_image(file_path, image_info))
+            except Exception as e:
+                print(f"添加图片失败: {e}")
+        
+        if added:
+            self._notify_callbacks('images_added', added)
+            if was_empty:
+                self._notify_callbacks('current_changed', self.get_current_image())
+        return len(added)
+    
+    def _append_image(self, file_path: str, image_info: Dict) -> Dict:
+        """将图片条目追加到列表末尾，并在后台创建缩略图和预读EXIF"""
+        # 添加到列表
+        image_data = {
+            'path': file_path,
+            'filename': image_info['filename'],
+            'size': image_info['size'],
+            'mode': image_info['mode'],
+            'format': image_info['format'],
+            'file_size': image_info['file_size'],
+            'thumbnail': None,
+            'loaded': False,
+            'exif': None,  # 后台预读的EXIF元数据（拍摄日期、方向、尺寸等）
+            'exif_date': image_info.get('exif_date')  # 索引中记录的拍摄日期
+        }
+        
+        self.image_list.append(image_data)
+        self._paths.add(file_path)
+        
+        # 如果这是第一张图片，设置为当前图片
+        if len(self.image_list) == 1:
+            self.current_index = 0
+        
+        # 异步创建缩略图
+        self._create_thumbnail_async(image_data)
+        
+        # 后台预读EXIF元数据
+        self._prefetch_metadata_async(image_data)
+        
+        return image_data
+    
     def remove_image(self, file_path: str) -> bool:
         """从列表移除图片"""
         try:
             index = self._find_image_by_path(file_path)
             if index is not None:
                 image_data = self.image_list.pop(index)
+                self._paths.discard(file_path)
                 
                 # 清理缩略图缓存
                 if file_path in self.thumbnail_cache:
@@ -101,8 +152,10 @@ class ImageListManager:
         """清空图片列表"""
         try:
             self.image_list.clear()
+            self._paths.clear()
             self.thumbnail_cache.clear()
             self.current_index = 0
+            self.cancel_metadata_prefetch()
             
             # 通知回调
             self._notify_callbacks('list_cleared', None)
@@ -185,9 +238,14 @@ class ImageListManager:
             try:
                 file_path = image_data['path']
                 if file_path not in self.thumbnail_cache:
-                    from components.file_manager import ImageFileManager
-                    file_manager = ImageFileManager()
-                    thumbnail = file_manager.create_thumbnail(file_path)
+                    # 优先使用索引中缓存的缩略图
+                    thumbnail = self.library_index.load_thumbnail(file_path)
+                    if thumbnail is None:
+                        from components.file_manager import ImageFileManager
+                        file_manager = ImageFileManager()
+                        thumbnail = file_manager.create_thumbnail(file_path)
+                        if thumbnail:
+                            self.library_index.store_thumbnail(file_path, thumbnail)
                     if thumbnail:
                         self.thumbnail_cache[file_path] = thumbnail
                         image_data['thumbnail'] = thumbnail
@@ -195,10 +253,58 @@ class ImageListManager:
             except Exception as e:
                 print(f"Create thumbnail failed: {e}")
         
-        # 在新线程中创建缩略图
-        thread = threading.Thread(target=create_thumbnail)
-        thread.daemon = True
-        thread.start()
+        # 在线程池中创建缩略图，一次导入大量图片时线程数不会随图片数增长
+        with self._metadata_lock:
+            if self._thumbnail_executor is None:
+                self._thumbnail_executor = ThreadPoolExecutor(
+                    max_workers=Config.METADATA_WORKERS,
+                    thread_name_prefix="thumbnail"
+                )
+            self._track_future(self._thumbnail_executor.submit(create_thumbnail))
+    
+    def _get_metadata_executor(self) -> ThreadPoolExecutor:
+        """获取EXIF预读线程池（调用方需持有锁）"""
+        if self._metadata_executor is None:
+            self._metadata_executor = ThreadPoolExecutor(
+                max_workers=Config.METADATA_WORKERS,
+                thread_name_prefix="exif-prefetch"
+            )
+        return self._metadata_executor
+    
+    def _track_future(self, future):
+        """记录任务直到完成（调用方需持有锁）"""
+        pending = self._pending_futures
+        pending.add(future)
+        future.add_done_callback(pending.discard)
+    
+    def _prefetch_metadata_async(self, image_data: Dict):
+        """在后台线程池中提取EXIF元数据并保存到列表条目中"""
+        def prefetch_metadata():
+            try:
+                from components.exif_text_watermark import exif_cache
+                image_data['exif'] = exif_cache.get_metadata(image_data['path'])
+                image_data['exif_date'] = image_data['exif'].get('date')
+                self.library_index.set_exif_date(image_data['path'], image_data['exif_date'])
+                self._notify_callbacks('metadata_loaded', image_data)
+            except Exception as e:
+                print(f"Prefetch EXIF metadata failed: {e}")
+        
+        with self._metadata_lock:
+            self._track_future(self._get_metadata_executor().submit(prefetch_metadata))
+    
+    def cancel_metadata_prefetch(self):
+        """取消尚未开始的EXIF预读和缩略图任务"""
+        with self._metadata_lock:
+            executors = (self._metadata_executor, self._thumbnail_executor)
+            self._metadata_executor = None
+            self._thumbnail_executor = None
+            futures = list(self._pending_futures)
+            self._pending_futures = set()
+        for future in futures:
+            future.cancel()
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown(wait=False)
     
     def add_callback(self, callback: Callable):
         """添加回调函数"""
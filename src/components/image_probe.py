@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+图片信息探测模块
+只读取文件头中的尺寸和像素格式记录（JPEG SOFn、PNG IHDR、BMP信息头、TIFF IFD0），
+不初始化解码器；无法确定与PIL一致的结果时改用PIL打开
+"""
+
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Iterable, List, Optional, Tuple
+from PIL import Image
+
+from config import Config
+from components.exif_reader import ExifFormatError, _TiffReader
+
+# JPEG SOFn 标记（不含 DHT、JPG 和 DAC）
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                    0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# JPEG 分量数 -> PIL模式
+JPEG_MODES = {1: 'L', 3: 'RGB', 4: 'CMYK'}
+
+# PNG (位深, 颜色类型) -> PIL模式；16位灰度在不同PIL版本中模式不同，交给PIL
+PNG_MODES = {
+    (1, 0): '1', (2, 0): 'L', (4, 0): 'L', (8, 0): 'L',
+    (8, 2): 'RGB', (16, 2): 'RGB',
+    (1, 3): 'P', (2, 3): 'P', (4, 3): 'P', (8, 3): 'P',
+    (8, 4): 'LA', (16, 4): 'RGBA',
+    (8, 6): 'RGBA', (16, 6): 'RGBA',
+}
+
+# BMP 位数 -> PIL模式（仅未压缩的真彩色；调色板图片可能被PIL识别为灰度，交给PIL）
+BMP_MODES = {16: 'RGB', 24: 'RGB', 32: 'RGB'}
+
+# TIFF 标签
+TAG_IMAGE_WIDTH = 0x0100
+TAG_IMAGE_LENGTH = 0x0101
+TAG_BITS_PER_SAMPLE = 0x0102
+TAG_PHOTOMETRIC = 0x0106
+TAG_FILL_ORDER = 0x010A
+TAG_SAMPLES_PER_PIXEL = 0x0115
+TAG_EXTRA_SAMPLES = 0x0152
+TAG_SAMPLE_FORMAT = 0x0153
+
+# TIFF (光度解释, 每个样本的位数, 附加样本) -> PIL模式
+TIFF_MODES = {
+    (1, (8,), ()): 'L',
+    (2, (8, 8, 8), ()): 'RGB',
+    (2, (8, 8, 8, 8), (2,)): 'RGBA',
+}
+
+
+def _probe_jpeg(f: BinaryIO) -> Optional[Tuple[Tuple[int, int], str]]:
+    """逐段跳过JPEG标记段直到SOFn，读取尺寸和分量数"""
+    position = 2
+    while True:
+        f.seek(position)
+        marker = f.read(4)
+        if len(marker) < 4 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code == 0xFF:
+            # 填充字节
+            position += 1
+            continue
+        if code in (0xD9, 0xDA):
+            return None
+        length, = struct.unpack('>H', marker[2:])
+        if code == 0xE2 and f.read(4) == b'MPF\0':
+            # 多图片对象（MPO）由PIL识别格式
+            return None
+        if code in JPEG_SOF_MARKERS:
+            f.seek(position + 4)
+            precision, height, width, components = struct.unpack('>BHHB', f.read(6))
+            if precision != 8 or components not in JPEG_MODES:
+                return None
+            return (width, height), JPEG_MODES[components]
+        position += 2 + length
+
+
+def _probe_png(f: BinaryIO) -> Optional[Tuple[Tuple[int, int], str]]:
+    """读取紧跟在PNG签名之后的IHDR块"""
+    f.seek(8)
+    chunk = f.read(8 + 13)
+    if len(chunk) < 21 or chunk[4:8] != b'IHDR':
+        return None
+    width, height, bit_depth, color_type = struct.unpack('>LLBB', chunk[8:18])
+    mode = PNG_MODES.get((bit_depth, color_type))
+    return ((width, height), mode) if mode else None
+
+
+def _probe_bmp(f: BinaryIO) -> Optional[Tuple[Tuple[int, int], str]]:
+    """读取BMP信息头（BITMAPINFOHEADER及其扩展版本）"""
+    f.seek(14)
+    header = f.read(20)
+    if len(header) < 20:
+        return None
+    header_size, width, height, _, bits, compression = struct.unpack('<LllHHL', header)
+    if header_size < 40 or compression != 0 or bits not in BMP_MODES:
+        return None
+    # 高度为负表示自上而下存储
+    return (width, abs(height)), BMP_MODES[bits]
+
+
+def _probe_tiff(f: BinaryIO) -> Optional[Tuple[Tuple[int, int], str]]:
+    """读取第一个IFD中的尺寸和样本格式标签"""
+    try:
+        reader = _TiffReader(f, 0)
+        entries = reader.read_entries(reader.first_ifd)
+
+        def value(tag, default=None):
+            return reader.read_value(entries[tag]) if tag in entries else default
+
+        def as_tuple(item):
+            return item if isinstance(item, tuple) else (item,)
+
+        width, height = value(TAG_IMAGE_WIDTH), value(TAG_IMAGE_LENGTH)
+        if not isinstance(width, int) or not isinstance(height, int):
+            return None
+        if value(TAG_FILL_ORDER, 1) != 1 or set(as_tuple(value(TAG_SAMPLE_FORMAT, 1))) != {1}:
+            return None
+
+        samples = value(TAG_SAMPLES_PER_PIXEL, 1)
+        bits = as_tuple(value(TAG_BITS_PER_SAMPLE, 1))
+        if len(bits) == 1 and samples > 1:
+            bits = bits * samples
+        extra = as_tuple(value(TAG_EXTRA_SAMPLES, ()))
+        mode = TIFF_MODES.get((value(TAG_PHOTOMETRIC), bits, extra))
+        return ((width, height), mode) if mode else None
+    except (ExifFormatError, struct.error):
+        return None
+
+
+# 文件头标识 -> (格式, 探测函数)
+_PROBES = (
+    (b'\xff\xd8\xff', 'JPEG', _probe_jpeg),
+    (b'\x89PNG\r\n\x1a\n', 'PNG', _probe_png),
+    (b'BM', 'BMP', _probe_bmp),
+    (b'II*\x00', 'TIFF', _probe_tiff),
+    (b'MM\x00*', 'TIFF', _probe_tiff),
+)
+
+
+def _probe_with_pil(file_path: str) -> dict:
+    """用PIL打开图片读取信息（只解析文件头，不解码像素）"""
+    with Image.open(file_path) as img:
+        return {
+            'path': file_path,
+            'filename': os.path.basename(file_path),
+            'size': img.size,
+            'mode': img.mode,
+            'format': img.format,
+            'file_size': os.path.getsize(file_path)
+        }
+
+
+def probe_image(file_path: str) -> dict:
+    """读取图片的尺寸、模式和格式，返回与 ImageFileManager.get_image_info 相同的字典
+
+    Raises:
+        OSError: 文件无法读取或不是可识别的图片
+    """
+    with open(file_path, 'rb') as f:
+        header = f.read(8)
+        for signature, image_format, probe in _PROBES:
+            if header.startswith(signature):
+                try:
+                    result = probe(f)
+                except struct.error:
+                    # 文件头被截断
+                    result = None
+                if result is not None:
+                    size, mode = result
+                    return {
+                        'path': file_path,
+                        'filename': os.path.basename(file_path),
+                        'size': size,
+                        'mode': mode,
+                        'format': image_format,
+                        'file_size': os.fstat(f.fileno()).st_size
+                    }
+                break
+    return _probe_with_pil(file_path)
+
+
+def _probe_or_none(file_path: str) -> Optional[dict]:
+    try:
+        return probe_image(file_path)
+    except Exception as e:
+        print(f"获取图片信息失败 {file_path}: {e}")
+        return None
+
+
+def probe_images(file_paths: Iterable[str], max_workers: int = None) -> List[Optional[dict]]:
+    """在线程池中批量读取图片信息，结果与输入顺序一致，读取失败的为None"""
+    file_paths = list(file_paths)
+    if len(file_paths) <= 1:
+        return [_probe_or_none(path) for path in file_paths]
+    with ThreadPoolExecutor(max_workers=max_workers or Config.PROBE_WORKERS,
+                            thread_name_prefix="image-probe") as executor:
+        return list(executor.map(_probe_or_none, file_paths))
@@ -15,6 +15,11 @@ from tkinter import filedialog, messagebox
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from config import Config
+from components.watermark_cache import WatermarkTileCache
+from components.watermark_plan import (
+    ImageWatermarkPlan, calculate_logo_size, calculate_position, make_alpha_lut, make_anchor
+)
+from utils.image_utils import build_pyramid
 
 class ImageWatermark:
     """图片水印类"""
@@ -22,7 +27,9 @@ class ImageWatermark:
     def __init__(self):
         """初始化图片水印"""
         self.watermark_path = None
-        self.watermark_image = None
+        self.watermark_image = None  # 保留的最大金字塔层级（原图不太大时即为原图）
+        self.watermark_size = None  # 水印原图尺寸
+        self.watermark_pyramid = ()  # 水印图片金字塔，最大的层级在前
         self.scale_factor = 0.2  # 水印相对于原图的缩放比例 (0.1-1.0)
         self.transparency = 80  # 透明度 (0-100)
         self.position = "bottom_right"
@@ -30,6 +37,9 @@ class ImageWatermark:
         self.maintain_aspect_ratio = True
         self.max_size_percent = 30  # 水印最大尺寸占原图的百分比
         
+        # 缩放并调整透明度后的水印图片缓存，批量导出时相同尺寸的图片直接复用
+        self.scaled_cache = WatermarkTileCache(Config.SCALED_LOGO_CACHE_SIZE)
+        
     def load_watermark_image(self, file_path: str) -> bool:
         """加载水印图片"""
         try:
@@ -47,8 +57,16 @@ class ImageWatermark:
             if watermark.mode != 'RGBA':
                 watermark = watermark.convert('RGBA')
             
-            self.watermark_image = watermark
+            # 加载时一次性构建金字塔，缩放时从最接近的层级重采样；
+            # 过大的原图不再保留，只保留不超过上限的层级
+            pyramid = build_pyramid(watermark, Config.LOGO_PYRAMID_MAX_SIZE,
+                                    Config.LOGO_PYRAMID_MIN_SIZE)
+            
+            self.watermark_size = watermark.size
+            self.watermark_pyramid = tuple(pyramid)
+            self.watermark_image = pyramid[0]
             self.watermark_path = file_path
+            self._invalidate_scaled_cache()
             
             return True
             
@@ -59,10 +77,12 @@ class ImageWatermark:
     def set_scale_factor(self, scale: float):
         """设置缩放因子 (0.1-1.0)"""
         self.scale_factor = max(0.1, min(1.0, scale))
+        self._invalidate_scaled_cache()
     
     def set_transparency(self, transparency: int):
         """设置透明度 (0-100)"""
         self.transparency = max(0, min(100, transparency))
+        self._invalidate_scaled_cache()
     
     def set_position(self, position: str):
         """设置位置"""
@@ -83,106 +103,61 @@ class ImageWatermark:
     def set_maintain_aspect_ratio(self, maintain: bool):
         """设置是否保持宽高比"""
         self.maintain_aspect_ratio = maintain
+        self._invalidate_scaled_cache()
     
     def set_max_size_percent(self, percent: int):
         """设置水印最大尺寸百分比 (10-50)"""
         self.max_size_percent = max(10, min(50, percent))
+        self._invalidate_scaled_cache()
+    
+    def _invalidate_scaled_cache(self):
+        """缩放相关设置或水印图片变化后清空缩放结果缓存"""
+        if self.scaled_cache is not None:
+            self.scaled_cache.clear()
     
     def _calculate_watermark_size(self, target_size: Tuple[int, int]) -> Tuple[int, int]:
         """计算水印尺寸"""
         if not self.watermark_image:
             return (0, 0)
         
-        target_width, target_height = target_size
-        watermark_width, watermark_height = self.watermark_image.size
-        
-        # 基于缩放因子计算尺寸
-        new_width = int(target_width * self.scale_factor)
-        new_height = int(target_height * self.scale_factor)
-        
-        if self.maintain_aspect_ratio:
-            # 保持宽高比，以较小的缩放比为准
-            ratio = min(new_width / watermark_width, new_height / watermark_height)
-            new_width = int(watermark_width * ratio)
-            new_height = int(watermark_height * ratio)
-        
-        # 限制最大尺寸
-        max_width = int(target_width * self.max_size_percent / 100)
-        max_height = int(target_height * self.max_size_percent / 100)
-        
-        if new_width > max_width or new_height > max_height:
-            ratio = min(max_width / new_width, max_height / new_height)
-            new_width = int(new_width * ratio)
-            new_height = int(new_height * ratio)
-        
-        return (new_width, new_height)
+        return calculate_logo_size(target_size, self.watermark_size, self.scale_factor,
+                                   self.maintain_aspect_ratio, self.max_size_percent)
     
     def _calculate_position(self, image_size: Tuple[int, int], 
                           watermark_size: Tuple[int, int]) -> Tuple[int, int]:
         """计算水印位置"""
-        img_width, img_height = image_size
-        wm_width, wm_height = watermark_size
-        
-        # 如果有自定义位置，使用自定义位置
-        if self.custom_position:
-            return self.custom_position
-        
-        # 边距
-        margin = min(img_width, img_height) // 20  # 动态边距
+        # 动态边距
+        return calculate_position(image_size, watermark_size, self.position,
+                                  self.custom_position)
+    
+    def compile(self) -> Optional[ImageWatermarkPlan]:
+        """将当前设置编译为不可变的渲染计划，未加载水印图片时返回None
         
-        position_map = {
-            "top_left": (margin, margin),
-            "top_center": ((img_width - wm_width) // 2, margin),
-            "top_right": (img_width - wm_width - margin, margin),
-            "center_left": (margin, (img_height - wm_height) // 2),
-            "center": ((img_width - wm_width) // 2, (img_height - wm_height) // 2),
-            "center_right": (img_width - wm_width - margin, (img_height - wm_height) // 2),
-            "bottom_left": (margin, img_height - wm_height - margin),
-            "bottom_center": ((img_width - wm_width) // 2, img_height - wm_height - margin),
-            "bottom_right": (img_width - wm_width - margin, img_height - wm_height - margin)
-        }
+        计划可在线程间共享或序列化后交给其他进程渲染，设置变化后需要重新编译。
+        """
+        if not self.watermark_image:
+            return None
         
-        return position_map.get(self.position, position_map["bottom_right"])
+        alpha = int(255 * self.transparency / 100)
+        return ImageWatermarkPlan(
+            pyramid=self.watermark_pyramid,
+            logo_size=self.watermark_size,
+            alpha=alpha,
+            alpha_lut=make_alpha_lut(alpha),
+            scale_factor=self.scale_factor,
+            maintain_aspect_ratio=self.maintain_aspect_ratio,
+            max_size_percent=self.max_size_percent,
+            anchor=make_anchor(self.position, self.custom_position),
+            scaled_cache=self.scaled_cache
+        )
     
     def apply_to_image(self, image: Image.Image) -> Optional[Image.Image]:
         """将图片水印应用到图片上"""
         try:
-            if not self.watermark_image:
+            plan = self.compile()
+            if not plan:
                 return None
-            
-            # 确保目标图片是RGBA模式
-            if image.mode != 'RGBA':
-                result_image = image.convert('RGBA')
-            else:
-                result_image = image.copy()
-            
-            # 计算水印尺寸
-            watermark_size = self._calculate_watermark_size(image.size)
-            if watermark_size[0] <= 0 or watermark_size[1] <= 0:
-                return result_image
-            
-            # 缩放水印图片
-            try:
-                # 兼容不同PIL版本
-                scaled_watermark = self.watermark_image.resize(watermark_size, Image.Resampling.LANCZOS)
-            except AttributeError:
-                scaled_watermark = self.watermark_image.resize(watermark_size, Image.LANCZOS)
-            
-            # 调整透明度
-            if self.transparency < 100:
-                alpha = int(255 * self.transparency / 100)
-                # 创建透明度遮罩
-                alpha_mask = scaled_watermark.split()[-1]  # 获取alpha通道
-                alpha_mask = alpha_mask.point(lambda x: int(x * alpha / 255))
-                scaled_watermark.putalpha(alpha_mask)
-            
-            # 计算位置
-            position = self._calculate_position(image.size, watermark_size)
-            
-            # 粘贴水印
-            result_image.paste(scaled_watermark, position, scaled_watermark)
-            
-            return result_image
+            return plan.render(image)
             
         except Exception as e:
             print(f"Apply image watermark failed: {e}")
@@ -212,6 +187,7 @@ class ImageWatermark:
             self.custom_position = data.get('custom_position', None)
             self.maintain_aspect_ratio = data.get('maintain_aspect_ratio', True)
             self.max_size_percent = data.get('max_size_percent', 30)
+            self._invalidate_scaled_cache()
             
         except Exception as e:
             print(f"Load image watermark from dict failed: {e}")
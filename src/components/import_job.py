@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+后台导入任务模块
+工作线程遍历待导入的文件并读取图片信息，界面线程通过Tk事件循环分批取回，
+导入大文件夹时窗口保持响应，且可随时取消
+"""
+
+import os
+import sys
+import queue
+import threading
+from typing import Callable, Iterable, List, Optional, Tuple
+
+# 添加路径
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import Config
+
+# 遍历结束的标记
+_DONE = object()
+
+
+class ImportJob:
+    """可取消的后台导入任务
+
+    paths 可以是生成器，在工作线程中逐个消费；每个路径读取图片信息后放入队列。
+    界面线程每隔 poll_interval 毫秒取回最多 batch_size 个结果交给 on_batch，
+    全部完成或取消后调用 on_done(导入数量, 是否已取消)。
+    """
+
+    def __init__(self, root, paths: Iterable[str], read_info: Callable[[str], Optional[dict]],
+                 on_batch: Callable[[List[Tuple[str, dict]]], int],
+                 on_done: Callable[[int, bool], None] = None,
+                 batch_size: int = None, poll_interval: int = None):
+        """初始化导入任务
+
+        Args:
+            root: 提供 after 方法的Tk控件
+            paths: 待导入的文件路径（可以是生成器）
+            read_info: 读取图片信息的函数，返回None表示跳过该文件
+            on_batch: 在界面线程中处理一批 (路径, 图片信息)，返回实际添加的数量
+            on_done: 在界面线程中处理导入结束
+            batch_size: 每次最多取回的结果数
+            poll_interval: 取回结果的间隔（毫秒）
+        """
+        self.root = root
+        self.paths = paths
+        self.read_info = read_info
+        self.on_batch = on_batch
+        self.on_done = on_done
+        self.batch_size = batch_size or Config.IMPORT_BATCH_SIZE
+        self.poll_interval = poll_interval or Config.IMPORT_POLL_INTERVAL
+        self.imported_count = 0
+        self.finished = False
+        self._queue: "queue.Queue" = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def start(self):
+        """启动工作线程，并在界面线程中开始轮询结果"""
+        self._thread = threading.Thread(target=self._run, name="image-import", daemon=True)
+        self._thread.start()
+        self.root.after(self.poll_interval, self.poll)
+
+    def cancel(self):
+        """取消导入，已取回的图片保留在列表中"""
+        self._cancel_event.set()
+
+    def _run(self):
+        """工作线程：遍历文件并读取图片信息"""
+        try:
+            for path in self.paths:
+                if self._cancel_event.is_set():
+                    break
+                try:
+                    info = self.read_info(path)
+                except Exception as e:
+                    print(f"读取图片信息失败 {path}: {e}")
+                    continue
+                if info:
+                    self._queue.put((path, info))
+        except Exception as e:
+            print(f"遍历导入文件失败: {e}")
+        finally:
+            self._queue.put(_DONE)
+
+    def poll(self) -> bool:
+        """在界面线程中取回一批结果，返回导入是否仍在进行"""
+        if self.finished:
+            return False
+
+        batch = []
+        done = False
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                done = True
+                break
+            batch.append(item)
+
+        if batch and not self.cancelled:
+            self.imported_count += self.on_batch(batch)
+
+        if done or self.cancelled:
+            self.finished = True
+            if self.on_done:
+                self.on_done(self.imported_count, self.cancelled)
+            return False
+
+        self.root.after(self.poll_interval, self.poll)
+        return True
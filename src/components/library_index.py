@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""
+图片库索引模块
+将导入过的图片的尺寸、格式、拍摄日期和缩略图位置保存在SQLite数据库中，
+重新导入或恢复上次的图片列表时，未变化的文件只需读取文件状态
+"""
+
+import os
+import sys
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+from PIL import Image
+
+# 添加路径
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import Config
+from components.image_probe import probe_image
+
+# 索引表结构版本，结构变化时递增，旧数据会被丢弃
+SCHEMA_VERSION = 1
+
+# 累计多少次写入后提交一次，批量导入时避免每个文件提交一次
+COMMIT_INTERVAL = 200
+
+
+class LibraryIndex:
+    """按 (绝对路径, 文件大小, 修改时间ns) 索引图片信息（线程安全）
+
+    每个路径只保留一条记录，文件大小或修改时间变化时重新读取并覆盖，
+    旧的缩略图文件一并删除。另外保存上次会话的图片列表顺序。
+    数据库无法打开时退化为只在本进程内有效的内存数据库。
+    """
+
+    def __init__(self, db_path: str = None, thumbnail_dir: str = None):
+        """初始化索引
+
+        Args:
+            db_path: 数据库文件路径，默认为配置目录下的 Config.LIBRARY_INDEX_FILE
+            thumbnail_dir: 缩略图缓存目录，默认为 Config.THUMBNAIL_CACHE_DIR
+        """
+        self.db_path = db_path or Config.LIBRARY_INDEX_FILE
+        self.thumbnail_dir = thumbnail_dir or Config.THUMBNAIL_CACHE_DIR
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending_writes = 0
+        self._lock = threading.Lock()
+
+    def _reset_lock(self):
+        """重建锁并丢弃连接（在fork出的子进程中调用，SQLite连接不能跨进程共享）"""
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pending_writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """打开数据库连接（调用方需持有锁）"""
+        if self._conn is not None:
+            return self._conn
+
+        try:
+            directory = os.path.dirname(os.path.abspath(self.db_path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        except (sqlite3.Error, OSError) as e:
+            print(f"Open library index failed, using memory index: {e}")
+            conn = sqlite3.connect(":memory:", check_same_thread=False)
+
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            conn.execute("DROP TABLE IF EXISTS images")
+            conn.execute("DROP TABLE IF EXISTS session")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS images ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " width INTEGER NOT NULL,"
+            " height INTEGER NOT NULL,"
+            " mode TEXT,"
+            " format TEXT,"
+            " exif_date TEXT,"
+            " thumbnail TEXT)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS session ("
+            " position INTEGER PRIMARY KEY,"
+            " path TEXT NOT NULL)"
+        )
+        conn.commit()
+        self._conn = conn
+        return conn
+
+    def _write(self, sql: str, params: tuple):
+        """执行写入，累计到 COMMIT_INTERVAL 次后提交（调用方需持有锁）"""
+        conn = self._connect()
+        conn.execute(sql, params)
+        self._pending_writes += 1
+        if self._pending_writes >= COMMIT_INTERVAL:
+            conn.commit()
+            self._pending_writes = 0
+
+    def _lookup(self, path: str, stat: os.stat_result) -> Optional[tuple]:
+        """读取与文件当前大小和修改时间一致的记录，没有时返回None"""
+        with self._lock:
+            try:
+                row = self._connect().execute(
+                    "SELECT size, mtime_ns, width, height, mode, format, exif_date, thumbnail"
+                    " FROM images WHERE path = ?",
+                    (path,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"Read library index failed: {e}")
+                return None
+
+        if row is None or row[0] != stat.st_size or row[1] != stat.st_mtime_ns:
+            return None
+        return row
+
+    def is_unchanged(self, file_path: str, stat: os.stat_result = None) -> bool:
+        """判断文件自上次索引以来是否未变化"""
+        try:
+            if stat is None:
+                stat = os.stat(file_path)
+        except OSError:
+            return False
+        return self._lookup(os.path.abspath(file_path), stat) is not None
+
+    def get_image_info(self, file_path: str) -> Optional[dict]:
+        """获取图片信息，文件未变化时直接使用索引，否则读取文件头并更新索引
+
+        Returns:
+            与 ImageFileManager.get_image_info 相同的字典，另含 'exif_date'；无法读取时返回None
+        """
+        path = os.path.abspath(file_path)
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            print(f"获取图片信息失败: {e}")
+            return None
+
+        row = self._lookup(path, stat)
+        if row is not None:
+            self.hits += 1
+            size, _, width, height, mode, image_format, exif_date, _ = row
+            return {
+                'path': file_path,
+                'filename': os.path.basename(file_path),
+                'size': (width, height),
+                'mode': mode,
+                'format': image_format,
+                'file_size': size,
+                'exif_date': exif_date
+            }
+
+        self.misses += 1
+        try:
+            info = probe_image(file_path)
+        except Exception as e:
+            print(f"获取图片信息失败: {e}")
+            return None
+
+        with self._lock:
+            try:
+                self._remove_thumbnail(path)
+                self._write(
+                    "INSERT OR REPLACE INTO images"
+                    " (path, size, mtime_ns, width, height, mode, format, exif_date, thumbnail)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, NULL, NULL)",
+                    (path, stat.st_size, stat.st_mtime_ns, info['size'][0], info['size'][1],
+                     info['mode'], info['format'])
+                )
+            except sqlite3.Error as e:
+                print(f"Write library index failed: {e}")
+        info['exif_date'] = None
+        return info
+
+    def _remove_thumbnail(self, path: str):
+        """删除该路径旧记录引用的缩略图文件（调用方需持有锁）"""
+        row = self._connect().execute("SELECT thumbnail FROM images WHERE path = ?", (path,)).fetchone()
+        if row and row[0]:
+            try:
+                os.remove(row[0])
+            except OSError:
+                pass
+
+    def set_exif_date(self, file_path: str, exif_date: Optional[str]):
+        """记录图片的拍摄日期"""
+        with self._lock:
+            try:
+                self._write("UPDATE images SET exif_date = ? WHERE path = ?",
+                            (exif_date, os.path.abspath(file_path)))
+            except sqlite3.Error as e:
+                print(f"Write library index failed: {e}")
+
+    def load_thumbnail(self, file_path: str) -> Optional[Image.Image]:
+        """读取缓存的缩略图，文件已变化或缩略图不存在时返回None"""
+        path = os.path.abspath(file_path)
+        try:
+            row = self._lookup(path, os.stat(path))
+        except OSError:
+            return None
+        if row is None or not row[7]:
+            return None
+        try:
+            with Image.open(row[7]) as thumbnail:
+                thumbnail.load()
+                return thumbnail.copy()
+        except OSError:
+            return None
+
+    def store_thumbnail(self, file_path: str, thumbnail: Image.Image):
+        """保存缩略图到缓存目录，并在索引中记录其位置"""
+        path = os.path.abspath(file_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        key = f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}".encode('utf-8', 'surrogatepass')
+        thumbnail_path = os.path.join(self.thumbnail_dir, hashlib.sha1(key).hexdigest() + '.png')
+        try:
+            os.makedirs(self.thumbnail_dir, exist_ok=True)
+            thumbnail.save(thumbnail_path, 'PNG')
+        except OSError as e:
+            print(f"Save thumbnail cache failed: {e}")
+            return
+
+        with self._lock:
+            try:
+                self._write("UPDATE images SET thumbnail = ? WHERE path = ? AND size = ? AND mtime_ns = ?",
+                            (thumbnail_path, path, stat.st_size, stat.st_mtime_ns))
+            except sqlite3.Error as e:
+                print(f"Write library index failed: {e}")
+
+    def save_session(self, paths: List[str]):
+        """保存当前图片列表（按列表顺序），覆盖上次保存的列表"""
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute("DELETE FROM session")
+                conn.executemany("INSERT INTO session (position, path) VALUES (?, ?)",
+                                 enumerate(paths))
+                conn.commit()
+                self._pending_writes = 0
+            except sqlite3.Error as e:
+                print(f"Save session failed: {e}")
+
+    def load_session(self) -> List[str]:
+        """读取上次保存的图片列表，并清理已不存在的文件的记录和缩略图"""
+        with self._lock:
+            try:
+                rows = self._connect().execute("SELECT path FROM session ORDER BY position").fetchall()
+            except sqlite3.Error as e:
+                print(f"Load session failed: {e}")
+                return []
+        self.prune_missing()
+        return [row[0] for row in rows]
+
+    def prune_missing(self) -> int:
+        """删除已不存在的文件的记录及其缩略图，以及不再被任何记录引用的缩略图文件
+
+        Returns:
+            删除的记录数
+        """
+        with self._lock:
+            try:
+                rows = self._connect().execute("SELECT path, thumbnail FROM images").fetchall()
+            except sqlite3.Error as e:
+                print(f"Read library index failed: {e}")
+                return 0
+
+        missing = [path for path, _ in rows if not os.path.exists(path)]
+        referenced = {thumbnail for path, thumbnail in rows if thumbnail}
+        with self._lock:
+            try:
+                conn = self._connect()
+                for path in missing:
+                    self._remove_thumbnail(path)
+                conn.executemany("DELETE FROM images WHERE path = ?", [(path,) for path in missing])
+                conn.commit()
+                self._pending_writes = 0
+            except sqlite3.Error as e:
+                print(f"Write library index failed: {e}")
+                return 0
+
+        # 删除不再被引用的缩略图（如索引重建前留下的）
+        try:
+            names = os.listdir(self.thumbnail_dir)
+        except OSError:
+            names = []
+        for name in names:
+            thumbnail_path = os.path.join(self.thumbnail_dir, name)
+            if name.endswith('.png') and thumbnail_path not in referenced:
+                try:
+                    os.remove(thumbnail_path)
+                except OSError:
+                    pass
+        return len(missing)
+
+    def flush(self):
+        """提交尚未提交的写入"""
+        with self._lock:
+            if self._conn is not None and self._pending_writes:
+                try:
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    print(f"Write library index failed: {e}")
+                self._pending_writes = 0
+
+    def close(self):
+        """提交写入并关闭数据库连接"""
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取索引命中统计信息"""
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+# 进程内共享的图片库索引
+library_index = LibraryIndex()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=library_index._reset_lock)
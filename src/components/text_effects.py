@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+文本效果绘制模块
+文本水印和EXIF水印共用的描边绘制引擎
+"""
+
+from typing import Tuple, Optional
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+# 超过该宽度的描边改用膨胀遮罩绘制，避免FreeType描边在大宽度下的圆角变形
+MAX_STROKE_WIDTH = 8
+
+
+def supports_stroke(font: ImageFont.ImageFont) -> bool:
+    """判断字体是否支持FreeType原生描边"""
+    return isinstance(font, ImageFont.FreeTypeFont)
+
+
+def create_outline_mask(text: str, font: ImageFont.ImageFont, width: int,
+                        softness: int = 0) -> Tuple[Image.Image, Tuple[int, int]]:
+    """通过膨胀文本遮罩生成描边遮罩
+
+    Args:
+        text: 文本
+        font: 字体
+        width: 描边宽度（像素）
+        softness: 描边边缘的模糊半径，0表示硬边
+
+    Returns:
+        (L模式描边遮罩, 遮罩左上角相对于文本绘制原点的偏移)
+    """
+    bbox = ImageDraw.Draw(Image.new('L', (1, 1))).textbbox((0, 0), text, font=font)
+    pad = width + softness * 2
+    mask = Image.new('L', (bbox[2] - bbox[0] + pad * 2, bbox[3] - bbox[1] + pad * 2), 0)
+    ImageDraw.Draw(mask).text((pad - bbox[0], pad - bbox[1]), text, font=font, fill=255)
+
+    # 多次3x3最大值滤波等价于半径为width的方形膨胀，开销随宽度线性增长
+    for _ in range(width):
+        mask = mask.filter(ImageFilter.MaxFilter(3))
+
+    if softness > 0:
+        mask = mask.filter(ImageFilter.GaussianBlur(softness))
+
+    return mask, (bbox[0] - pad, bbox[1] - pad)
+
+
+def draw_outlined_text(draw: ImageDraw.ImageDraw, position: Tuple[int, int], text: str,
+                       font: ImageFont.ImageFont, fill_color: Tuple[int, int, int, int],
+                       outline_color: Tuple[int, int, int, int], outline_width: int,
+                       softness: int = 0):
+    """绘制带描边的文本，描边在下、文本在上
+
+    优先使用FreeType原生描边，只需一次绘制；字体不支持描边、描边过宽
+    或需要柔和边缘时，改用膨胀遮罩绘制描边。
+    """
+    if outline_width <= 0:
+        draw.text(position, text, font=font, fill=fill_color)
+        return
+
+    if softness <= 0 and outline_width <= MAX_STROKE_WIDTH and supports_stroke(font):
+        draw.text(position, text, font=font, fill=fill_color,
+                  stroke_width=outline_width, stroke_fill=outline_color)
+        return
+
+    mask, (offset_x, offset_y) = create_outline_mask(text, font, outline_width, softness)
+    x, y = position
+    draw.bitmap((x + offset_x, y + offset_y), mask, fill=outline_color)
+    draw.text(position, text, font=font, fill=fill_color)
+
+
+def draw_text_with_effects(draw: ImageDraw.ImageDraw, position: Tuple[int, int], text: str,
+                           font: ImageFont.ImageFont, fill_color: Tuple[int, int, int, int],
+                           shadow_color: Optional[Tuple[int, int, int, int]] = None,
+                           shadow_offset: int = 0,
+                           outline_color: Optional[Tuple[int, int, int, int]] = None,
+                           outline_width: int = 0):
+    """绘制带阴影和描边的文本，shadow_color/outline_color 为None时不绘制对应效果"""
+    x, y = position
+
+    # 绘制阴影
+    if shadow_color is not None:
+        draw.text((x + shadow_offset, y + shadow_offset), text, font=font, fill=shadow_color)
+
+    # 绘制描边和主文本
+    if outline_color is not None and outline_width > 0:
+        draw_outlined_text(draw, (x, y), text, font, fill_color, outline_color, outline_width)
+    else:
+        draw.text((x, y), text, font=font, fill=fill_color)
@@ -15,10 +15,22 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from config import Config
+from components.font_coverage import get_font_for_text
+from components.font_registry import get_font
+from components.text_effects import draw_text_with_effects
+from components.watermark_cache import shared_tile_cache, shared_rotation_cache
+from components.watermark_plan import (
+    TextWatermarkPlan, calculate_position, get_effect_padding, make_anchor, render_text_tile, rotate_tile
+)
 
 class TextWatermark:
     """文本水印类"""
     
+    # 阴影偏移量（像素）
+    SHADOW_OFFSET = 2
+    # 九宫格位置的边距（像素）
+    MARGIN = 20
+    
     def __init__(self):
         """初始化文本水印"""
         self.text = "Watermark"
@@ -37,8 +49,14 @@ class TextWatermark:
         # 自定义位置
         self.custom_position = None
         
-        # 字体缓存
-        self._font_cache = {}
+        # 平铺模式设置
+        self.tile_spacing = 80  # 相邻水印之间的间距（像素）
+        self.tile_stagger = 0.5  # 相邻行的水平错位（占一个水印周期的比例，0-1）
+        
+        # 已渲染水印块缓存（默认进程内共享）
+        self.tile_cache = shared_tile_cache
+        # 旋转后水印块缓存，按角度缓存；设为None时每次重新旋转
+        self.rotation_cache = shared_rotation_cache
     
     def set_text(self, text: str):
         """设置水印文本"""
@@ -51,8 +69,6 @@ class TextWatermark:
     def set_font_family(self, family: str):
         """设置字体族"""
         self.font_family = family
-        # 清除字体缓存
-        self._font_cache.clear()
     
     def set_color(self, color: str):
         """设置颜色"""
@@ -67,7 +83,8 @@ class TextWatermark:
         valid_positions = [
             "top_left", "top_center", "top_right",
             "center_left", "center", "center_right",
-            "bottom_left", "bottom_center", "bottom_right"
+            "bottom_left", "bottom_center", "bottom_right",
+            "tiled"
         ]
         if position in valid_positions:
             self.position = position
@@ -78,6 +95,17 @@ class TextWatermark:
         """设置自定义位置"""
         self.custom_position = position
     
+    def set_tiling(self, spacing: int = None, stagger: float = None):
+        """设置平铺模式的水印间距和行错位比例"""
+        if spacing is not None:
+            self.tile_spacing = max(0, int(spacing))
+        if stagger is not None:
+            self.tile_stagger = max(0.0, min(1.0, float(stagger)))
+    
+    def is_tiled(self) -> bool:
+        """是否使用平铺模式（拖拽得到的自定义位置优先）"""
+        return self.position == "tiled" and not self.custom_position
+    
     def set_angle(self, angle: float):
         """设置旋转角度"""
         self.angle = angle % 360
@@ -101,55 +129,14 @@ class TextWatermark:
         """获取字体对象，优先选择支持中文的字体"""
         if size is None:
             size = self.font_size
-        
-        cache_key = f"{self.font_family}_{size}"
-        if cache_key in self._font_cache:
-            return self._font_cache[cache_key]
-        
-        font = None
-        
-        # 首先尝试用户指定的字体
-        try:
-            font = ImageFont.truetype(self.font_family, size)
-        except (OSError, IOError):
-            # 如果用户指定字体失败，尝试支持中文的系统字体
-            chinese_fonts = [
-                # macOS 中文字体
-                "/System/Library/Fonts/STHeiti Medium.ttc",
-                "/System/Library/Fonts/Hiragino Sans GB.ttc", 
-                "/System/Library/Fonts/Supplemental/Songti.ttc",
-                "STHeiti Medium.ttc",
-                "Hiragino Sans GB.ttc",
-                # 通用字体（也支持中文）
-                "Arial.ttf",
-                "Helvetica.ttc",
-                # Windows 中文字体（如果在Windows上运行）
-                "C:/Windows/Fonts/simsun.ttc",
-                "C:/Windows/Fonts/simhei.ttf",
-                "C:/Windows/Fonts/msyh.ttc",
-                # Linux 中文字体
-                "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
-                "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc"
-            ]
-            
-            for font_path in chinese_fonts:
-                try:
-                    font = ImageFont.truetype(font_path, size)
-                    print(f"Using fallback Chinese font: {font_path}")
-                    break
-                except (OSError, IOError):
-                    continue
-            
-            # 如果所有中文字体都失败，使用默认字体
-            if font is None:
-                try:
-                    font = ImageFont.load_default()
-                    print("Warning: Using default font, Chinese characters may not display correctly")
-                except:
-                    font = ImageFont.load_default()
-        
-        self._font_cache[cache_key] = font
-        return font
+        # 字体文件的查找、加载和缓存由进程内共享的字体注册表完成
+        return get_font(self.font_family, size)
+    
+    def _get_text_font(self, text: str, size: int = None) -> ImageFont.ImageFont:
+        """获取能显示指定文本的字体，配置的字体缺少字形时自动改用覆盖该文本的已安装字体"""
+        if size is None:
+            size = self.font_size
+        return get_font_for_text(self.font_family, text, size)
     
     def _hex_to_rgba(self, hex_color: str, alpha: int = 255) -> Tuple[int, int, int, int]:
         """将十六进制颜色转换为RGBA"""
@@ -167,206 +154,169 @@ class TextWatermark:
     
     def _calculate_position(self, image_size: Tuple[int, int], text_size: Tuple[int, int]) -> Tuple[int, int]:
         """计算文本位置"""
-        # 如果有自定义位置，优先使用
-        if self.custom_position:
-            return self.custom_position
-        
-        img_width, img_height = image_size
-        text_width, text_height = text_size
-        
-        # 边距
-        margin = 20
-        
-        position_map = {
-            "top_left": (margin, margin),
-            "top_center": ((img_width - text_width) // 2, margin),
-            "top_right": (img_width - text_width - margin, margin),
-            "center_left": (margin, (img_height - text_height) // 2),
-            "center": ((img_width - text_width) // 2, (img_height - text_height) // 2),
-            "center_right": (img_width - text_width - margin, (img_height - text_height) // 2),
-            "bottom_left": (margin, img_height - text_height - margin),
-            "bottom_center": ((img_width - text_width) // 2, img_height - text_height - margin),
-            "bottom_right": (img_width - text_width - margin, img_height - text_height - margin)
-        }
-        
-        return position_map.get(self.position, position_map["bottom_right"])
+        return calculate_position(image_size, text_size, self.position,
+                                  self.custom_position, margin=self.MARGIN)
+    
+    def _get_effect_padding(self) -> Tuple[int, int, int, int]:
+        """计算阴影和描边在文本边界框外需要的额外空间 (左, 上, 右, 下)"""
+        return get_effect_padding(self.SHADOW_OFFSET if self.shadow else 0,
+                                  self.outline_width if self.outline else 0)
     
-    def _rotate_around_center(self, watermark: Image.Image, text_width: int, text_height: int, 
-                             text_position: Tuple[int, int]) -> Image.Image:
-        """基于水印文本中心进行旋转，确保完整显示"""
+    def _render_text_tile(self, text: str, font: ImageFont.ImageFont,
+                          fill_color: Tuple[int, int, int, int]) -> Tuple[Image.Image, Tuple[int, int]]:
+        """将文本渲染到与其边界框等大的水印块上
+        
+        Returns:
+            (水印块, 水印块左上角相对于文本绘制原点的偏移)
+        """
+        shadow_color = self._hex_to_rgba(self.shadow_color, fill_color[3]) if self.shadow else None
+        outline_color = self._hex_to_rgba(self.outline_color, fill_color[3]) if self.outline else None
+        return render_text_tile(text, font, fill_color, shadow_color, self.SHADOW_OFFSET,
+                                outline_color, self.outline_width)
+    
+    def _rotate_around_center(self, tile: Image.Image,
+                              tile_position: Tuple[int, int]) -> Tuple[Image.Image, Tuple[int, int]]:
+        """基于水印块中心进行旋转，确保完整显示
+        
+        只旋转水印块本身，旋转后的水印块中心与原水印块中心对齐。
+        
+        Returns:
+            (旋转后的水印块, 旋转后水印块左上角在图片中的坐标)
+        """
         try:
-            if self.angle == 0:
-                return watermark
-                
-            # 计算文本中心点
-            text_x, text_y = text_position
-            text_center_x = text_x + text_width // 2
-            text_center_y = text_y + text_height // 2
-            
-            # 计算旋转后需要的最大尺寸
-            import math
-            angle_rad = math.radians(abs(self.angle))
-            cos_a = abs(math.cos(angle_rad))
-            sin_a = abs(math.sin(angle_rad))
-            
-            # 计算文本旋转后的边界框（包括效果）
-            effect_padding = 10  # 阴影和描边的额外空间
-            effective_width = text_width + effect_padding * 2
-            effective_height = text_height + effect_padding * 2
-            
-            rotated_width = int(effective_width * cos_a + effective_height * sin_a)
-            rotated_height = int(effective_width * sin_a + effective_height * cos_a)
-            
-            # 创建足够大的临时画布来绘制文本
-            temp_size = max(rotated_width, rotated_height) + 100  # 额外的安全边距
-            temp_img = Image.new('RGBA', (temp_size, temp_size), (0, 0, 0, 0))
-            temp_draw = ImageDraw.Draw(temp_img)
-            
-            # 获取字体和颜色
-            font = self._get_font()
-            fill_color = self._hex_to_rgba(self.color)
-            
-            # 在临时画布中心绘制文本
-            temp_center_x = temp_size // 2
-            temp_center_y = temp_size // 2
-            
-            # 计算文本在临时画布上的位置（居中）
-            temp_text_x = temp_center_x - text_width // 2
-            temp_text_y = temp_center_y - text_height // 2
-            
-            # 绘制带效果的文本
-            self._draw_text_with_effects(temp_draw, (temp_text_x, temp_text_y), self.text, font, fill_color)
-            
-            # 旋转临时图像，使用expand=True确保不裁剪
-            rotated_temp = temp_img.rotate(self.angle, center=(temp_center_x, temp_center_y), 
-                                         expand=True, fillcolor=(0, 0, 0, 0))
-            
-            # 创建最终结果画布（与原始水印相同大小）
-            result_canvas = Image.new('RGBA', watermark.size, (0, 0, 0, 0))
-            
-            # 计算旋转后图像在最终画布上的位置
-            rotated_center_x = rotated_temp.width // 2
-            rotated_center_y = rotated_temp.height // 2
-            
-            # 计算粘贴位置，使旋转后的中心对准原始文本中心
-            paste_x = text_center_x - rotated_center_x
-            paste_y = text_center_y - rotated_center_y
-            
-            # 粘贴旋转后的文本到结果画布
-            # 使用alpha_composite来正确处理透明度
-            if (paste_x + rotated_temp.width > 0 and paste_y + rotated_temp.height > 0 and 
-                paste_x < result_canvas.width and paste_y < result_canvas.height):
-                
-                # 计算实际可见区域
-                src_left = max(0, -paste_x)
-                src_top = max(0, -paste_y)
-                src_right = min(rotated_temp.width, result_canvas.width - paste_x)
-                src_bottom = min(rotated_temp.height, result_canvas.height - paste_y)
-                
-                dst_left = max(0, paste_x)
-                dst_top = max(0, paste_y)
-                
-                if src_right > src_left and src_bottom > src_top:
-                    # 裁剪旋转后的图像到可见部分
-                    visible_rotated = rotated_temp.crop((src_left, src_top, src_right, src_bottom))
-                    
-                    # 创建一个临时画布来进行合成
-                    temp_result = Image.new('RGBA', result_canvas.size, (0, 0, 0, 0))
-                    temp_result.paste(visible_rotated, (dst_left, dst_top), visible_rotated)
-                    
-                    # 合成到最终结果
-                    result_canvas = Image.alpha_composite(result_canvas, temp_result)
-            
-            return result_canvas
+            return rotate_tile(tile, tile_position, self.angle)
             
         except Exception as e:
             print(f"旋转水印失败: {e}")
             import traceback
             traceback.print_exc()
-            # 如果旋转失败，返回原始图像
-            return watermark
+            # 如果旋转失败，返回原始水印块
+            return tile, tile_position
     
     def _draw_text_with_effects(self, draw: ImageDraw.Draw, position: Tuple[int, int], 
                                text: str, font: ImageFont.ImageFont, 
                                fill_color: Tuple[int, int, int, int]):
         """绘制带效果的文本"""
-        x, y = position
+        shadow_color = self._hex_to_rgba(self.shadow_color, fill_color[3]) if self.shadow else None
+        outline_color = self._hex_to_rgba(self.outline_color, fill_color[3]) if self.outline else None
+        draw_text_with_effects(draw, position, text, font, fill_color,
+                               shadow_color, self.SHADOW_OFFSET,
+                               outline_color, self.outline_width)
+    
+    def _get_render_key(self) -> Tuple:
+        """生成影响未旋转水印块渲染结果的全部设置组成的缓存键"""
+        return (
+            'text', self.text, self.font_family, self.font_size,
+            self.color, self.transparency,
+            self.shadow, self.shadow_color,
+            self.outline, self.outline_color, self.outline_width
+        )
+    
+    def _render_base_tile(self) -> Tuple[Image.Image, Tuple[int, int], Tuple[int, int]]:
+        """渲染未旋转的水印块
+        
+        Returns:
+            (水印块, 水印块左上角相对于文本位置的偏移, 文本尺寸)
+        """
+        # 获取能显示水印文本的字体
+        font = self._get_text_font(self.text)
+        
+        # 获取颜色
+        fill_color = self._hex_to_rgba(self.color)
+        
+        # 渲染文本水印块
+        tile, offset = self._render_text_tile(self.text, font, fill_color)
+        
+        # 计算文本尺寸（水印块去掉效果边距即为文本边界框）
+        pad_left, pad_top, pad_right, pad_bottom = self._get_effect_padding()
+        text_width = tile.width - pad_left - pad_right
+        text_height = tile.height - pad_top - pad_bottom
         
-        # 绘制阴影
-        if self.shadow:
-            shadow_color = self._hex_to_rgba(self.shadow_color, fill_color[3])
-            shadow_offset = 2
-            draw.text((x + shadow_offset, y + shadow_offset), text, font=font, fill=shadow_color)
+        return tile, offset, (text_width, text_height)
+    
+    def _get_rendered_tile(self) -> Tuple[Image.Image, Tuple[int, int], Tuple[int, int]]:
+        """获取与图片尺寸无关的水印块（优先使用缓存）
+        
+        未旋转的水印块按渲染设置缓存，旋转后的水印块再按角度单独缓存，
+        调整旋转角度时只需旋转水印块而无需重新绘制文本。
+        """
+        render_key = self._get_render_key()
+        base = self.tile_cache.get_or_create(render_key, self._render_base_tile)
+        if self.angle == 0:
+            return base
         
-        # 绘制描边
-        if self.outline and self.outline_width > 0:
-            outline_color = self._hex_to_rgba(self.outline_color, fill_color[3])
-            for dx in range(-self.outline_width, self.outline_width + 1):
-                for dy in range(-self.outline_width, self.outline_width + 1):
-                    if dx != 0 or dy != 0:
-                        draw.text((x + dx, y + dy), text, font=font, fill=outline_color)
+        tile, offset, text_size = base
         
-        # 绘制主文本
-        draw.text((x, y), text, font=font, fill=fill_color)
+        def rotate_base():
+            # 旋转处理 - 基于水印中心进行旋转
+            rotated, rotated_offset = self._rotate_around_center(tile, offset)
+            return rotated, rotated_offset, text_size
+        
+        if self.rotation_cache is None:
+            return rotate_base()
+        return self.rotation_cache.get_or_create(render_key + (self.angle,), rotate_base)
+    
+    def compile(self) -> Optional[TextWatermarkPlan]:
+        """将当前设置编译为不可变的渲染计划
+        
+        计划持有预渲染（含旋转）的水印块和位置计算函数，可在线程间共享或
+        序列化后交给其他进程渲染。设置变化后需要重新编译。失败时返回None。
+        """
+        try:
+            tile, offset, text_size = self._get_rendered_tile()
+            return TextWatermarkPlan(
+                tile=tile,
+                tile_offset=offset,
+                text_size=text_size,
+                anchor=make_anchor(self.position, self.custom_position, margin=self.MARGIN),
+                tiled=self.is_tiled(),
+                tile_spacing=self.tile_spacing,
+                tile_stagger=self.tile_stagger
+            )
+            
+        except Exception as e:
+            print(f"Compile text watermark failed: {e}")
+            return None
+    
+    def create_watermark_tile(self, size: Tuple[int, int]) -> Optional[Tuple[Image.Image, Tuple[int, int]]]:
+        """创建与文本边界框等大的水印块
+        
+        水印块包含阴影、描边以及旋转所需的额外空间。相同设置下渲染的
+        水印块会被缓存，批量导出和预览刷新时直接复用。
+        
+        Args:
+            size: 目标图片尺寸，用于计算水印位置
+        
+        Returns:
+            (水印块, 水印块左上角在目标图片中的坐标)，失败时返回None
+        """
+        plan = self.compile()
+        if not plan:
+            return None
+        return plan.tile, plan.get_tile_position(size)
     
     def create_watermark_image(self, size: Tuple[int, int]) -> Optional[Image.Image]:
         """创建水印图片"""
         try:
-            # 创建透明背景
-            watermark = Image.new('RGBA', size, (0, 0, 0, 0))
-            draw = ImageDraw.Draw(watermark)
-            
-            # 获取字体
-            font = self._get_font()
-            
-            # 计算文本尺寸
-            bbox = draw.textbbox((0, 0), self.text, font=font)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-            
-            # 计算位置
-            position = self._calculate_position(size, (text_width, text_height))
-            
-            # 获取颜色
-            fill_color = self._hex_to_rgba(self.color)
-            
-            # 绘制文本
-            self._draw_text_with_effects(draw, position, self.text, font, fill_color)
-            
-            # 旋转处理 - 基于水印中心进行旋转
-            if self.angle != 0:
-                watermark = self._rotate_around_center(watermark, text_width, text_height, position)
+            plan = self.compile()
+            if not plan:
+                return None
             
-            return watermark
+            # 创建透明背景并放置水印块
+            watermark = Image.new('RGBA', size, (0, 0, 0, 0))
+            return plan.blend_into(watermark)
             
         except Exception as e:
             print(f"Create watermark image failed: {e}")
             return None
     
     def apply_to_image(self, image: Image.Image) -> Optional[Image.Image]:
-        """将水印应用到图片上"""
+        """将水印应用到图片上（返回新图片，不修改传入的图片）"""
         try:
-            # 创建水印图片
-            watermark = self.create_watermark_image(image.size)
-            if not watermark:
+            plan = self.compile()
+            if not plan:
                 return None
-            
-            # 确保图片是RGBA模式
-            if image.mode != 'RGBA':
-                image = image.convert('RGBA')
-            
-            # 调整水印大小以匹配图片
-            if watermark.size != image.size:
-                # 兼容不同PIL版本
-                try:
-                    watermark = watermark.resize(image.size, Image.Resampling.LANCZOS)
-                except AttributeError:
-                    watermark = watermark.resize(image.size, Image.LANCZOS)
-            
-            # 合成水印
-            result = Image.alpha_composite(image, watermark)
-            
-            return result
+            return plan.render(image)
             
         except Exception as e:
             print(f"Apply watermark failed: {e}")
@@ -386,7 +336,9 @@ class TextWatermark:
             'outline': self.outline,
             'shadow_color': self.shadow_color,
             'outline_color': self.outline_color,
-            'outline_width': self.outline_width
+            'outline_width': self.outline_width,
+            'tile_spacing': self.tile_spacing,
+            'tile_stagger': self.tile_stagger
         }
     
     def load_from_dict(self, data: Dict[str, Any]):
@@ -403,6 +355,8 @@ class TextWatermark:
         self.shadow_color = data.get('shadow_color', self.shadow_color)
         self.outline_color = data.get('outline_color', self.outline_color)
         self.outline_width = data.get('outline_width', self.outline_width)
+        self.tile_spacing = data.get('tile_spacing', self.tile_spacing)
+        self.tile_stagger = data.get('tile_stagger', self.tile_stagger)
     
     def preview_watermark(self, image: Image.Image, preview_size: Tuple[int, int] = None) -> Optional[Image.Image]:
         """预览水印效果"""
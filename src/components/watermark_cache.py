@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+水印渲染缓存模块
+缓存已渲染的水印块，在批量导出和预览刷新之间复用
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# 添加路径
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import Config
+
+class WatermarkTileCache:
+    """有容量上限的水印块LRU缓存（线程安全）"""
+    
+    def __init__(self, max_size: int = None):
+        """初始化缓存
+        
+        Args:
+            max_size: 最多缓存的条目数
+        """
+        self.max_size = max(1, max_size if max_size is not None else Config.TILE_CACHE_SIZE)
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """获取缓存条目，未命中时返回None"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+    
+    def put(self, key: Hashable, value: Any):
+        """写入缓存条目，超出容量时淘汰最久未使用的条目"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Optional[Any]:
+        """获取缓存条目，未命中时调用factory生成并缓存"""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            if value is not None:
+                self.put(key, value)
+        return value
+    
+    def clear(self):
+        """清空缓存并重置计数"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def get_stats(self) -> Dict[str, int]:
+        """获取缓存统计信息"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_size': self.max_size
+            }
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        # 缓存内容只在本进程内有效，序列化时只保留容量设置
+        return {'max_size': self.max_size}
+    
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__init__(state['max_size'])
+
+
+# 进程内共享的水印块缓存，批量导出和预览共用
+shared_tile_cache = WatermarkTileCache()
+
+# 进程内共享的旋转水印块缓存，与未旋转水印块分开存放，
+# 拖动旋转滑块产生的大量角度不会挤掉未旋转的水印块
+shared_rotation_cache = WatermarkTileCache(Config.ROTATED_TILE_CACHE_SIZE)
@@ -0,0 +1,419 @@
+# -*- coding: utf-8 -*-
+"""
+水印渲染计划模块
+将水印设置编译为不可变、可序列化的渲染计划，供批量导出、预览和命令行共用
+"""
+
+import os
+import sys
+from functools import partial
+from typing import Tuple, Optional, List, Callable
+from PIL import Image, ImageDraw
+
+# 添加路径
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from components.font_registry import font_registry
+from components.glyph_atlas import get_glyph_atlas, paste_label
+from components.text_effects import draw_text_with_effects, MAX_STROKE_WIDTH
+from utils.image_utils import blend_tile, select_pyramid_level
+
+# 锚点函数: (图片尺寸, 水印尺寸) -> 水印左上角坐标
+AnchorFunc = Callable[[Tuple[int, int], Tuple[int, int]], Tuple[int, int]]
+
+
+def calculate_position(image_size: Tuple[int, int], item_size: Tuple[int, int],
+                       position: str, custom_position: Tuple[int, int] = None,
+                       margin: int = None) -> Tuple[int, int]:
+    """计算水印在图片中的位置
+
+    Args:
+        image_size: 目标图片尺寸
+        item_size: 水印尺寸
+        position: 九宫格位置名称，未知名称按 bottom_right 处理
+        custom_position: 自定义位置，设置后优先使用
+        margin: 边距，为None时按图片短边的1/20动态计算
+    """
+    # 如果有自定义位置，优先使用
+    if custom_position:
+        return custom_position
+
+    img_width, img_height = image_size
+    item_width, item_height = item_size
+
+    if margin is None:
+        margin = min(img_width, img_height) // 20
+
+    position_map = {
+        "top_left": (margin, margin),
+        "top_center": ((img_width - item_width) // 2, margin),
+        "top_right": (img_width - item_width - margin, margin),
+        "center_left": (margin, (img_height - item_height) // 2),
+        "center": ((img_width - item_width) // 2, (img_height - item_height) // 2),
+        "center_right": (img_width - item_width - margin, (img_height - item_height) // 2),
+        "bottom_left": (margin, img_height - item_height - margin),
+        "bottom_center": ((img_width - item_width) // 2, img_height - item_height - margin),
+        "bottom_right": (img_width - item_width - margin, img_height - item_height - margin)
+    }
+
+    return position_map.get(position, position_map["bottom_right"])
+
+
+def make_anchor(position: str, custom_position: Tuple[int, int] = None,
+                margin: int = None) -> AnchorFunc:
+    """生成可序列化的锚点函数"""
+    return partial(calculate_position, position=position,
+                   custom_position=custom_position, margin=margin)
+
+
+def calculate_logo_size(target_size: Tuple[int, int], logo_size: Tuple[int, int],
+                        scale_factor: float, maintain_aspect_ratio: bool,
+                        max_size_percent: int) -> Tuple[int, int]:
+    """计算图片水印缩放后的尺寸"""
+    target_width, target_height = target_size
+    watermark_width, watermark_height = logo_size
+
+    # 基于缩放因子计算尺寸
+    new_width = int(target_width * scale_factor)
+    new_height = int(target_height * scale_factor)
+
+    if maintain_aspect_ratio:
+        # 保持宽高比，以较小的缩放比为准
+        ratio = min(new_width / watermark_width, new_height / watermark_height)
+        new_width = int(watermark_width * ratio)
+        new_height = int(watermark_height * ratio)
+
+    # 限制最大尺寸
+    max_width = int(target_width * max_size_percent / 100)
+    max_height = int(target_height * max_size_percent / 100)
+
+    if new_width > max_width or new_height > max_height:
+        ratio = min(max_width / new_width, max_height / new_height)
+        new_width = int(new_width * ratio)
+        new_height = int(new_height * ratio)
+
+    return (new_width, new_height)
+
+
+def make_alpha_lut(alpha: int) -> List[int]:
+    """生成按透明度缩放alpha通道的查找表"""
+    return [x * alpha // 255 for x in range(256)]
+
+
+def create_tiled_rows(size: Tuple[int, int], tile: Image.Image, spacing: int,
+                      stagger: float) -> List[Tuple[Image.Image, int]]:
+    """生成平铺模式下覆盖整张图片的水印行条带
+
+    水印块只渲染一次，先通过倍增复制拼出一条比图片宽一个周期的条带，
+    每一行再按错位量从条带上裁剪，相同错位量的行共用同一条带。
+
+    Returns:
+        [(行条带, 行条带在图片中的纵坐标)]
+    """
+    width, height = size
+    if tile.width == 0 or tile.height == 0:
+        return []
+
+    step_x = tile.width + spacing
+    step_y = tile.height + spacing
+
+    # 拼出水平周期条带，粘贴次数为对数级
+    strip = Image.new('RGBA', (width + step_x, tile.height), (0, 0, 0, 0))
+    strip.paste(tile, (0, 0))
+    filled = step_x
+    while filled < strip.width:
+        strip.paste(strip.crop((0, 0, filled, tile.height)), (filled, 0))
+        filled *= 2
+
+    # 以图片中心放置一个水印块作为平铺原点
+    origin_x = (width - tile.width) // 2
+    origin_y = (height - tile.height) // 2
+    row = -(origin_y // step_y) - 1
+    y = origin_y + row * step_y
+
+    rows = []
+    row_strips = {}
+    while y < height:
+        offset_x = origin_x + int(round(row * stagger * step_x))
+        start = (-offset_x) % step_x
+        if start not in row_strips:
+            row_strips[start] = strip.crop((start, 0, start + width, tile.height))
+        rows.append((row_strips[start], y))
+        row += 1
+        y += step_y
+    return rows
+
+
+def get_effect_padding(shadow_offset: int = 0, outline_width: int = 0) -> Tuple[int, int, int, int]:
+    """计算阴影和描边在文本边界框外需要的额外空间 (左, 上, 右, 下)，不使用的效果传0"""
+    outline_pad = max(0, outline_width)
+    far_pad = max(outline_pad, shadow_offset)
+    return (outline_pad, outline_pad, far_pad, far_pad)
+
+
+def render_text_tile(text: str, font, fill_color: Tuple[int, int, int, int],
+                     shadow_color: Optional[Tuple[int, int, int, int]] = None, shadow_offset: int = 0,
+                     outline_color: Optional[Tuple[int, int, int, int]] = None,
+                     outline_width: int = 0) -> Tuple[Image.Image, Tuple[int, int]]:
+    """将带效果的文本渲染到与其边界框等大的水印块上
+
+    Returns:
+        (水印块, 水印块左上角相对于文本绘制原点的偏移)
+    """
+    measure_draw = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
+    bbox = measure_draw.textbbox((0, 0), text, font=font)
+    pad_left, pad_top, pad_right, pad_bottom = get_effect_padding(
+        shadow_offset if shadow_color is not None else 0,
+        outline_width if outline_color is not None else 0
+    )
+
+    tile_width = max(0, bbox[2] - bbox[0]) + pad_left + pad_right
+    tile_height = max(0, bbox[3] - bbox[1]) + pad_top + pad_bottom
+    tile = Image.new('RGBA', (tile_width, tile_height), (0, 0, 0, 0))
+
+    # 文本绘制原点在水印块中的位置
+    origin = (pad_left - bbox[0], pad_top - bbox[1])
+    draw_text_with_effects(ImageDraw.Draw(tile), origin, text, font, fill_color,
+                           shadow_color, shadow_offset, outline_color, outline_width)
+
+    return tile, (-origin[0], -origin[1])
+
+
+def rotate_tile(tile: Image.Image, tile_position: Tuple[int, int],
+                angle: float) -> Tuple[Image.Image, Tuple[int, int]]:
+    """绕水印块中心旋转水印块，旋转后的水印块中心与原水印块中心对齐
+
+    Returns:
+        (旋转后的水印块, 旋转后水印块左上角的坐标)
+    """
+    if angle == 0:
+        return tile, tile_position
+
+    # 使用expand=True确保不裁剪
+    rotated = tile.rotate(angle, expand=True, fillcolor=(0, 0, 0, 0))
+    center_x = tile_position[0] + tile.width // 2
+    center_y = tile_position[1] + tile.height // 2
+    return rotated, (center_x - rotated.width // 2, center_y - rotated.height // 2)
+
+
+def _to_rgba_copy(image: Image.Image) -> Image.Image:
+    """返回RGBA模式的副本，避免修改传入的图片"""
+    if image.mode != 'RGBA':
+        return image.convert('RGBA')
+    return image.copy()
+
+
+class WatermarkPlan:
+    """水印渲染计划基类
+
+    编译时确定全部渲染参数，之后不可修改：同一计划可在多个线程间共享，
+    也可序列化后交给其他进程渲染，不依赖任何界面对象。
+    """
+
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        return (partial(type(self), **fields), ())
+
+    def __repr__(self):
+        return f"<{type(self).__name__}>"
+
+    def render(self, image: Image.Image, image_path: str = None,
+               metadata: dict = None) -> Image.Image:
+        """将水印渲染到图片副本上并返回（传入的图片不会被修改）
+
+        Args:
+            image: 目标图片
+            image_path: 图片文件路径，需要读取文件信息的水印使用
+            metadata: 已预读的EXIF元数据，需要EXIF的水印优先使用
+        """
+        raise NotImplementedError
+
+
+class TextWatermarkPlan(WatermarkPlan):
+    """文本水印渲染计划，持有预渲染（含旋转）的水印块"""
+
+    __slots__ = ('tile', 'tile_offset', 'text_size', 'anchor',
+                 'tiled', 'tile_spacing', 'tile_stagger')
+
+    def get_tile_position(self, size: Tuple[int, int]) -> Tuple[int, int]:
+        """计算水印块左上角在指定尺寸图片中的坐标"""
+        x, y = self.anchor(size, self.text_size)
+        return (x + self.tile_offset[0], y + self.tile_offset[1])
+
+    def blend_into(self, canvas: Image.Image) -> Image.Image:
+        """将水印混合到RGBA画布上（原地修改）"""
+        if self.tiled:
+            rows = create_tiled_rows(canvas.size, self.tile,
+                                     self.tile_spacing, self.tile_stagger)
+            for row_strip, y in rows:
+                blend_tile(canvas, row_strip, (0, y))
+            return canvas
+
+        # 只合成水印块覆盖的区域
+        return blend_tile(canvas, self.tile, self.get_tile_position(canvas.size))
+
+    def render(self, image: Image.Image, image_path: str = None,
+               metadata: dict = None) -> Image.Image:
+        return self.blend_into(_to_rgba_copy(image))
+
+
+class ImageWatermarkPlan(WatermarkPlan):
+    """图片水印渲染计划，持有水印图片金字塔、缩放参数和缩放结果缓存
+
+    缩放时从不小于目标尺寸的最小层级重采样；logo_size 为水印原图尺寸，
+    用于计算缩放尺寸。scaled_cache 为None时每次渲染都重新缩放；
+    序列化时缓存内容不会随计划传递。
+    """
+
+    __slots__ = ('pyramid', 'logo_size', 'alpha', 'alpha_lut', 'scale_factor', 'maintain_aspect_ratio',
+                 'max_size_percent', 'anchor', 'scaled_cache')
+
+    def get_logo_size(self, size: Tuple[int, int]) -> Tuple[int, int]:
+        """计算水印图片在指定尺寸图片上的缩放尺寸"""
+        return calculate_logo_size(size, self.logo_size, self.scale_factor,
+                                   self.maintain_aspect_ratio, self.max_size_percent)
+
+    def scale_logo(self, logo_size: Tuple[int, int]) -> Image.Image:
+        """缩放水印图片并应用透明度"""
+        source = select_pyramid_level(self.pyramid, logo_size)
+        try:
+            # 兼容不同PIL版本
+            scaled = source.resize(logo_size, Image.Resampling.LANCZOS)
+        except AttributeError:
+            scaled = source.resize(logo_size, Image.LANCZOS)
+
+        # 通过查找表调整透明度
+        if self.alpha < 255:
+            scaled.putalpha(scaled.getchannel('A').point(self.alpha_lut))
+        return scaled
+
+    def get_scaled_logo(self, logo_size: Tuple[int, int]) -> Image.Image:
+        """获取缩放并调整透明度后的水印图片（优先使用缓存）
+
+        缩放尺寸已由目标尺寸、缩放比例、宽高比和最大尺寸设置共同决定，
+        缓存键只需包含缩放尺寸、透明度和水印图片本身。
+        """
+        if self.scaled_cache is None:
+            return self.scale_logo(logo_size)
+        key = (id(self.pyramid), logo_size, self.alpha)
+        return self.scaled_cache.get_or_create(key, lambda: self.scale_logo(logo_size))
+
+    def render(self, image: Image.Image, image_path: str = None,
+               metadata: dict = None) -> Image.Image:
+        result_image = _to_rgba_copy(image)
+
+        logo_size = self.get_logo_size(image.size)
+        if logo_size[0] <= 0 or logo_size[1] <= 0:
+            return result_image
+
+        scaled = self.get_scaled_logo(logo_size)
+        position = self.anchor(image.size, logo_size)
+        result_image.paste(scaled, position, scaled)
+        return result_image
+
+
+class ExifWatermarkPlan(WatermarkPlan):
+    """EXIF文本水印渲染计划
+
+    水印文本随图片变化，由 text_source(图片路径, image=图片, exif_data=EXIF数据,
+    metadata=预读元数据) 在渲染时生成；
+    字体文件、颜色和效果参数在编译时确定。有旋转角度时只旋转水印块，
+    图片本身的方向和尺寸不变；不旋转时标签由字形图集中缓存的字形拼接。
+    """
+
+    __slots__ = ('text_source', 'font_path', 'font_index', 'font_size',
+                 'fill_color', 'shadow_color', 'shadow_offset',
+                 'outline_color', 'outline_width', 'anchor', 'angle')
+
+    def get_font(self):
+        """从共享字体注册表加载编译时确定的字体"""
+        font = font_registry.load(self.font_path, self.font_size, self.font_index)
+        if font is None:
+            font = font_registry.load(None, self.font_size)
+        return font
+
+    def get_labels(self, watermark_text: str, font):
+        """从字形图集获取 (文本标签, 描边标签)，不描边时描边标签为None；
+        无法与直接绘制保持一致（如描边改用膨胀遮罩绘制）时返回None"""
+        atlas = get_glyph_atlas(font)
+        if atlas is None:
+            return None
+
+        stroke_label = None
+        if self.outline_color is not None and self.outline_width > 0:
+            if self.outline_width > MAX_STROKE_WIDTH:
+                return None
+            stroke_label = atlas.get_label(watermark_text, self.outline_width)
+            if stroke_label is None:
+                return None
+
+        label = atlas.get_label(watermark_text)
+        if label is None:
+            return None
+        return label, stroke_label
+
+    def render(self, image: Image.Image, image_path: str = None,
+               metadata: dict = None, exif_data: bytes = None) -> Image.Image:
+        """渲染EXIF水印，优先使用预读的元数据和内存中的EXIF数据，必要时才按路径读取"""
+        watermark_text = self.text_source(image_path, image=image, exif_data=exif_data,
+                                          metadata=metadata)
+        if not watermark_text:
+            return image  # 如果没有日期信息，返回原图
+
+        font = self.get_font()
+        if self.angle != 0:
+            return self.render_rotated(image, watermark_text, font)
+
+        result_image = _to_rgba_copy(image)
+        labels = self.get_labels(watermark_text, font)
+        if labels is not None:
+            # 与 draw_text_with_effects 相同的图层顺序：阴影、描边、文本
+            label, stroke_label = labels
+            bbox = label[0]
+            position = self.anchor(image.size, (bbox[2] - bbox[0], bbox[3] - bbox[1]))
+            if self.shadow_color is not None:
+                paste_label(result_image, label, (position[0] + self.shadow_offset,
+                                                  position[1] + self.shadow_offset), self.shadow_color)
+            if stroke_label is not None:
+                paste_label(result_image, stroke_label, position, self.outline_color)
+            if stroke_label is None or self.fill_color != self.outline_color:
+                paste_label(result_image, label, position, self.fill_color)
+            return result_image
+
+        draw = ImageDraw.Draw(result_image)
+
+        # 计算文本尺寸和位置
+        bbox = draw.textbbox((0, 0), watermark_text, font=font)
+        text_size = (bbox[2] - bbox[0], bbox[3] - bbox[1])
+        position = self.anchor(image.size, text_size)
+
+        draw_text_with_effects(draw, position, watermark_text, font, self.fill_color,
+                               self.shadow_color, self.shadow_offset,
+                               self.outline_color, self.outline_width)
+
+        return result_image
+
+    def render_rotated(self, image: Image.Image, watermark_text: str, font) -> Image.Image:
+        """将文本渲染为水印块并绕其中心旋转后合成，开销与图片尺寸无关"""
+        tile, offset = render_text_tile(watermark_text, font, self.fill_color,
+                                        self.shadow_color, self.shadow_offset,
+                                        self.outline_color, self.outline_width)
+
+        # 文本位置与不旋转时相同
+        bbox = ImageDraw.Draw(tile).textbbox((0, 0), watermark_text, font=font)
+        x, y = self.anchor(image.size, (bbox[2] - bbox[0], bbox[3] - bbox[1]))
+        rotated, position = rotate_tile(tile, (x + offset[0], y + offset[1]), self.angle)
+
+        return blend_tile(_to_rgba_copy(image), rotated, position)
@@ -29,7 +29,12 @@ class Config:
     
     # 文件路径常量
     TEMPLATES_DIR = 'templates'
+    CACHE_DIR = 'cache'
+    FONT_COVERAGE_CACHE = os.path.join(CACHE_DIR, 'font_coverage.json')
     CONFIG_FILE = 'config.json'
+    EXIF_CACHE_FILE = os.path.join(os.path.dirname(CONFIG_FILE), 'exif_cache.db')
+    LIBRARY_INDEX_FILE = os.path.join(os.path.dirname(CONFIG_FILE), 'library.db')
+    THUMBNAIL_CACHE_DIR = os.path.join(CACHE_DIR, 'thumbnails')
     LOG_FILE = 'watermark_tool.log'
     
     # 窗口设置
@@ -45,6 +50,17 @@ class Config:
     # 性能设置
     MAX_MEMORY_USAGE = 500 * 1024 * 1024  # 500MB
     BATCH_SIZE = 10
+    METADATA_WORKERS = 4  # 导入后后台预读EXIF元数据的线程数
+    IMPORT_BATCH_SIZE = 200  # 导入时每次添加到列表的图片数上限
+    IMPORT_POLL_INTERVAL = 50  # 导入时界面线程取回结果的间隔（毫秒）
+    PROBE_WORKERS = 8  # 批量读取图片尺寸和格式的线程数
+    WATCH_SETTLE_TIME = 2.0  # 监视文件夹时文件大小和修改时间保持不变多久（秒）才视为写入完成
+    WATCH_POLL_INTERVAL = 1.0  # 监视文件夹时检查文件的间隔（秒）
+    TILE_CACHE_SIZE = 64  # 已渲染水印块缓存条目上限
+    ROTATED_TILE_CACHE_SIZE = 32  # 旋转后水印块缓存条目上限
+    SCALED_LOGO_CACHE_SIZE = 16  # 缩放后图片水印缓存条目上限
+    LOGO_PYRAMID_MAX_SIZE = 4096  # 图片水印金字塔保留层级的最长边上限（像素）
+    LOGO_PYRAMID_MIN_SIZE = 64  # 图片水印金字塔最小层级的最短边（像素）
     
     @classmethod
     def load_config(cls) -> Dict[str, Any]:
@@ -76,6 +92,7 @@ class Config:
             'watermark': cls.DEFAULT_WATERMARK.copy(),
             'output_folder': '',
             'last_import_folder': '',
+            'restore_last_session': True,
             'window_geometry': cls.WINDOW_SIZE,
             'recent_templates': [],
             'export_settings': {
@@ -107,6 +124,7 @@ class Config:
                     'fallback_to_file_time': True,
                     'prefix_text': '',
                     'suffix_text': '',
+                    'text_template': '',
                     'shadow': True,
                     'outline': False
                 }
@@ -12,6 +12,7 @@ from tkinter import messagebox
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from config import Config
+from components.exif_text_watermark import exif_cache
 from main_window import MainWindow
 from ui.real_drag_drop import create_dnd_root
 
@@ -80,6 +81,7 @@ class WatermarkApp:
         menubar.add_cascade(label="文件", menu=file_menu)
         file_menu.add_command(label="导入图片", command=self.import_images)
         file_menu.add_command(label="导入文件夹", command=self.import_folder)
+        file_menu.add_command(label="监视文件夹", command=self.watch_folder)
         file_menu.add_separator()
         file_menu.add_command(label="导出图片", command=self.export_images)
         file_menu.add_separator()
@@ -140,6 +142,13 @@ class WatermarkApp:
         else:
             messagebox.showinfo("提示", "请先启动主窗口")
     
+    def watch_folder(self):
+        """开始或停止监视文件夹"""
+        if hasattr(self, 'main_window') and self.main_window:
+            self.main_window.toggle_folder_watch()
+        else:
+            messagebox.showinfo("提示", "请先启动主窗口")
+    
     def export_images(self):
         """导出图片"""
         self.update_status("导出图片功能开发中...")
@@ -221,6 +230,14 @@ class WatermarkApp:
             # 保存当前水印设置
             if hasattr(self, 'main_window') and self.main_window:
                 self.main_window.save_current_settings_to_config()
+                # 未完成的导入和EXIF预读不再需要
+                self.main_window.cancel_import()
+                self.main_window.stop_folder_watch()
+                self.main_window.image_list_manager.cancel_metadata_prefetch()
+                # 保存图片列表，下次启动时恢复
+                self.main_window.save_session()
+                self.main_window.image_list_manager.library_index.close()
+                exif_cache.close()
             
             # 保存当前配置
             if self.config:
@@ -7,12 +7,16 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import os
+import queue
+import threading
 from typing import Optional, Callable, Dict, Any
 from PIL import Image, ImageTk
 
 from config import Config
 from components.file_manager import ImageFileManager, ExportManager
 from components.image_list import ImageListManager
+from components.import_job import ImportJob
+from components.folder_watch import HotFolderWatch
 from components.text_watermark import TextWatermark, TextWatermarkDialog
 from components.image_watermark import ImageWatermark, ImageWatermarkDialog
 from components.template_manager import TemplateManager, WatermarkTemplate, TemplateDialog
@@ -49,6 +53,9 @@ class MainWindow:
         
         # 当前状态
         self.current_image_path = None
+        self.import_job = None  # 正在进行的后台导入任务
+        self.folder_watch = None  # 正在进行的文件夹监视
+        self._watch_results = queue.Queue()  # 监视线程导出的结果，由界面线程取回
         
         # 创建界面
         self.create_interface()
@@ -73,6 +80,9 @@ class MainWindow:
         
         # 自动加载上次设置
         self.parent.after(200, self.auto_load_last_settings)
+        
+        # 恢复上次的图片列表
+        self.parent.after(300, self.restore_last_session)
     
     def create_interface(self):
         """创建主界面"""
@@ -115,6 +125,9 @@ class MainWindow:
         import_folder_btn = tk.Button(toolbar, text="导入文件夹", command=self.import_folder, width=8)
         import_folder_btn.pack(side=tk.LEFT, padx=(0, 5))
         
+        self.watch_btn = tk.Button(toolbar, text="监视文件夹", command=self.toggle_folder_watch, width=8)
+        self.watch_btn.pack(side=tk.LEFT, padx=(0, 5))
+        
         clear_btn = tk.Button(toolbar, text="清空", command=self.clear_image_list, width=8)
         clear_btn.pack(side=tk.LEFT)
         
@@ -261,7 +274,7 @@ class MainWindow:
         position_combo = ttk.Combobox(text_position_frame, textvariable=self.position_var, width=15)
         position_combo['values'] = ('top_left', 'top_center', 'top_right',
                                   'center_left', 'center', 'center_right',
-                                  'bottom_left', 'bottom_center', 'bottom_right', 'custom')
+                                  'bottom_left', 'bottom_center', 'bottom_right', 'tiled', 'custom')
         position_combo.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
         position_combo.bind('<<ComboboxSelected>>', self.on_position_changed)
         
@@ -278,6 +291,22 @@ class MainWindow:
                                 variable=self.rotation_var, command=self.on_rotation_changed)
         rotation_scale.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 5))
         
+        # 平铺设置（位置选择 tiled 时生效）
+        tiling_frame = tk.Frame(self.text_frame)
+        tiling_frame.pack(fill=tk.X, pady=(5, 0))
+        
+        tk.Label(tiling_frame, text="平铺间距:").pack(side=tk.LEFT)
+        self.tile_spacing_var = tk.IntVar(value=self.current_watermark.tile_spacing)
+        tile_spacing_scale = tk.Scale(tiling_frame, from_=0, to=400, orient=tk.HORIZONTAL,
+                                    variable=self.tile_spacing_var, command=self.on_tiling_changed)
+        tile_spacing_scale.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 5))
+        
+        tk.Label(tiling_frame, text="行错位(%):").pack(side=tk.LEFT)
+        self.tile_stagger_var = tk.IntVar(value=int(self.current_watermark.tile_stagger * 100))
+        tile_stagger_scale = tk.Scale(tiling_frame, from_=0, to=100, orient=tk.HORIZONTAL,
+                                    variable=self.tile_stagger_var, command=self.on_tiling_changed)
+        tile_stagger_scale.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
+        
         # 效果设置
         effect_frame = tk.LabelFrame(scrollable_frame, text="效果设置", padx=5, pady=5)
         effect_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -380,6 +409,16 @@ class MainWindow:
         suffix_entry.pack(side=tk.LEFT, padx=(5, 0))
         suffix_entry.bind('<KeyRelease>', self.on_exif_suffix_changed)
         
+        # 文本模板（非空时代替日期格式和前后缀）
+        template_frame = tk.Frame(self.exif_frame)
+        template_frame.pack(fill=tk.X, pady=(0, 5))
+        
+        tk.Label(template_frame, text="模板:").pack(side=tk.LEFT)
+        self.exif_template_var = tk.StringVar(value=self.current_exif_watermark.text_template)
+        template_entry = tk.Entry(template_frame, textvariable=self.exif_template_var)
+        template_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
+        template_entry.bind('<KeyRelease>', self.on_exif_template_changed)
+        
         # EXIF字体大小
         exif_font_frame = tk.Frame(self.exif_frame)
         exif_font_frame.pack(fill=tk.X, pady=(0, 5))
@@ -609,6 +648,9 @@ class MainWindow:
         self.progress_var = tk.DoubleVar()
         self.progress_bar = ttk.Progressbar(self.status_bar, variable=self.progress_var, 
                                           mode='determinate', length=200)
+        
+        # 取消导入按钮（导入进行中时显示）
+        self.cancel_import_btn = tk.Button(self.status_bar, text="取消导入", command=self.cancel_import)
     
     def setup_callbacks(self):
         """设置回调函数"""
@@ -713,31 +755,27 @@ class MainWindow:
             if not file_paths:
                 return
             
-            # 验证并添加文件
-            valid_count = 0
             invalid_files = []
             
-            for file_path in file_paths:
-                if self.file_manager.validate_image_file(file_path):
-                    success = self.image_list_manager.add_image(file_path)
-                    if success:
-                        valid_count += 1
-                else:
-                    invalid_files.append(os.path.basename(file_path))
-            
-            # 显示结果
-            if invalid_files:
-                messagebox.showwarning(
-                    "警告", 
-                    f"以下文件格式不支持，已跳过:\n{', '.join(invalid_files)}"
-                )
-            
-            if valid_count > 0:
-                self.update_status(f"通过拖拽成功导入 {valid_count} 张图片")
-                # 更新图片列表显示
-                self.update_image_list_display()
-                # 更新预览
-                self.update_preview()
+            def valid_paths():
+                # 在导入线程中逐个验证文件
+                for file_path in file_paths:
+                    if self.file_manager.quick_validate_image_file(file_path):
+                        yield file_path
+                    else:
+                        invalid_files.append(os.path.basename(file_path))
+            
+            def on_done(count, cancelled):
+                # 显示结果
+                if invalid_files:
+                    messagebox.showwarning(
+                        "警告", 
+                        f"以下文件格式不支持，已跳过:\n{', '.join(invalid_files)}"
+                    )
+                if count > 0 and not cancelled:
+                    self.update_status(f"通过拖拽成功导入 {count} 张图片")
+            
+            self.start_import(valid_paths(), on_done)
             
         except Exception as e:
             messagebox.showerror("错误", f"处理拖拽文件失败: {e}")
@@ -772,18 +810,87 @@ class MainWindow:
             messagebox.showerror("错误", f"导入图片失败: {e}")
     
     def import_folder(self):
-        """导入文件夹"""
+        """导入文件夹，在后台遍历并分批添加到列表"""
         try:
-            files = self.file_manager.import_folder(self.parent)
-            if files:
-                for file_path in files:
-                    self.image_list_manager.add_image(file_path)
-                self.update_status(f"已导入 {len(files)} 张图片")
+            from tkinter import filedialog
+            folder_path = filedialog.askdirectory(
+                parent=self.parent,
+                title="选择图片文件夹"
+            )
+            if not folder_path:
+                return
+            
+            def on_done(count, cancelled):
+                if count == 0 and not cancelled:
+                    messagebox.showinfo("提示", "所选文件夹中没有找到支持的图片文件")
+            
+            index = self.image_list_manager.library_index
+            self.start_import(self.file_manager.scan_folder(folder_path, index), on_done)
         except Exception as e:
             messagebox.showerror("错误", f"导入文件夹失败: {e}")
     
+    def start_import(self, paths, on_done=None):
+        """启动后台导入任务，图片分批加入列表，状态栏显示已导入数量
+        
+        Args:
+            paths: 待导入的图片路径（可以是生成器，在后台线程中消费）
+            on_done: 导入结束后的回调 (导入数量, 是否已取消)
+        """
+        if self.import_job is not None and not self.import_job.finished:
+            messagebox.showinfo("提示", "正在导入图片，请等待完成或取消后再导入")
+            return
+        
+        def on_batch(batch):
+            count = self.image_list_manager.add_images(batch)
+            self.status_label.config(text=f"正在导入... 已导入 {self.import_job.imported_count + count} 张图片")
+            return count
+        
+        def finish(count, cancelled):
+            self.image_list_manager.library_index.flush()
+            self.cancel_import_btn.pack_forget()
+            if cancelled:
+                self.update_status(f"已取消导入，已导入 {count} 张图片")
+            else:
+                self.update_status(f"已导入 {count} 张图片")
+            if on_done:
+                on_done(count, cancelled)
+        
+        self.import_job = ImportJob(self.parent, paths, self.image_list_manager.library_index.get_image_info,
+                                    on_batch, finish)
+        self.cancel_import_btn.pack(side=tk.RIGHT, padx=5)
+        self.update_status("正在导入...")
+        self.import_job.start()
+    
+    def cancel_import(self):
+        """取消正在进行的导入"""
+        if self.import_job is not None:
+            self.import_job.cancel()
+    
+    def restore_last_session(self):
+        """恢复上次关闭时的图片列表，未变化的文件直接使用索引中的信息"""
+        try:
+            if not self.config.get('restore_last_session', True):
+                return
+            paths = self.image_list_manager.library_index.load_session()
+            if not paths:
+                return
+            
+            def on_done(count, cancelled):
+                if not cancelled:
+                    self.update_status(f"已恢复上次的 {count} 张图片")
+            
+            self.start_import(iter(paths), on_done)
+        except Exception as e:
+            print(f"恢复上次的图片列表失败: {e}")
+    
+    def save_session(self):
+        """保存当前图片列表，下次启动时恢复"""
+        paths = [image_data['path'] for image_data in self.image_list_manager.get_image_list()]
+        self.image_list_manager.library_index.save_session(paths)
+    
     def clear_image_list(self):
         """清空图片列表"""
+        self.cancel_import()
         self.image_list_manager.clear_list()
         self.current_image_path = None
         self.update_preview()
@@ -811,42 +918,7 @@ class MainWindow:
                 messagebox.showwarning("警告", "没有图片可以导出")
                 return
             
-            # 设置导出参数
-            self.export_manager.output_folder = self.output_folder_var.get()
-            
-            # 根据命名选项设置前缀和后缀
-            naming_option = self.naming_option.get()
-            if naming_option == "original":
-                prefix = ""
-                suffix = ""
-            elif naming_option == "prefix":
-                prefix = self.prefix_var.get()
-                suffix = ""
-            elif naming_option == "suffix":
-                prefix = ""
-                suffix = self.suffix_var.get()
-            else:  # both
-                prefix = self.prefix_var.get()
-                suffix = self.suffix_var.get()
-            
-            # 获取图片尺寸调整参数
-            resize_settings = {
-                'resize_option': self.resize_option.get(),
-                'width': int(self.width_var.get()) if self.width_var.get().isdigit() else None,
-                'height': int(self.height_var.get()) if self.height_var.get().isdigit() else None,
-                'percent': float(self.percent_var.get()) / 100 if self.percent_var.get().replace('.', '', 1).isdigit() else None
-            }
-            
-            self.export_manager.update_export_settings({
-                'format': self.output_format.get(),
-                'quality': self.quality_var.get(),
-                'filename_prefix': prefix,
-                'filename_suffix': suffix,
-                'resize_settings': resize_settings
-            })
-            
-            print(f"Export settings: output_folder={self.export_manager.output_folder}")
-            print(f"Export settings: format={self.export_manager.export_settings}")
+            self.configure_export_settings()
             
             # 开始导出
             self.export_all_images()
@@ -857,6 +929,128 @@ class MainWindow:
             traceback.print_exc()
             messagebox.showerror("错误", f"导出失败: {e}")
     
+    def configure_export_settings(self):
+        """将界面上的输出文件夹、命名、格式、质量和尺寸设置应用到导出管理器"""
+        # 设置导出参数
+        self.export_manager.output_folder = self.output_folder_var.get()
+        
+        # 根据命名选项设置前缀和后缀
+        naming_option = self.naming_option.get()
+        if naming_option == "original":
+            prefix = ""
+            suffix = ""
+        elif naming_option == "prefix":
+            prefix = self.prefix_var.get()
+            suffix = ""
+        elif naming_option == "suffix":
+            prefix = ""
+            suffix = self.suffix_var.get()
+        else:  # both
+            prefix = self.prefix_var.get()
+            suffix = self.suffix_var.get()
+        
+        # 获取图片尺寸调整参数
+        resize_settings = {
+            'resize_option': self.resize_option.get(),
+            'width': int(self.width_var.get()) if self.width_var.get().isdigit() else None,
+            'height': int(self.height_var.get()) if self.height_var.get().isdigit() else None,
+            'percent': float(self.percent_var.get()) / 100 if self.percent_var.get().replace('.', '', 1).isdigit() else None
+        }
+        
+        self.export_manager.update_export_settings({
+            'format': self.output_format.get(),
+            'quality': self.quality_var.get(),
+            'filename_prefix': prefix,
+            'filename_suffix': suffix,
+            'resize_settings': resize_settings
+        })
+        
+        print(f"Export settings: output_folder={self.export_manager.output_folder}")
+        print(f"Export settings: format={self.export_manager.export_settings}")
+    
+    def toggle_folder_watch(self):
+        """开始或停止监视文件夹"""
+        if self.folder_watch is not None:
+            self.stop_folder_watch()
+        else:
+            self.start_folder_watch()
+    
+    def start_folder_watch(self):
+        """监视所选文件夹，新增或变化的图片写入完成后按当前水印和导出设置自动导出"""
+        try:
+            if not self.output_folder_var.get():
+                messagebox.showwarning("警告", "请先选择输出文件夹")
+                return
+            
+            from tkinter import filedialog
+            folder = filedialog.askdirectory(parent=self.parent, title="选择要监视的文件夹")
+            if not folder:
+                return
+            
+            # 监视线程使用独立的导出管理器，界面上的导出设置变化不影响正在进行的监视
+            self.configure_export_settings()
+            export_manager = ExportManager()
+            export_manager.output_folder = self.export_manager.output_folder
+            export_manager.update_export_settings(self.export_manager.get_export_settings())
+            
+            # 水印设置在监视期间保持不变，只编译一次渲染计划
+            self.folder_watch = HotFolderWatch(folder, self.compile_current_watermark(), export_manager,
+                                               self._watch_results.put)
+        except ValueError as e:
+            messagebox.showwarning("警告", str(e))
+            return
+        except Exception as e:
+            messagebox.showerror("错误", f"监视文件夹失败: {e}")
+            return
+        
+        threading.Thread(target=self._run_folder_watch, args=(self.folder_watch,),
+                         name="folder-watch", daemon=True).start()
+        self.watch_btn.config(text="停止监视")
+        self.update_status(f"正在监视: {folder}")
+        self.parent.after(500, self._poll_folder_watch)
+    
+    def stop_folder_watch(self):
+        """停止监视文件夹（正在导出的图片完成后停止）"""
+        if self.folder_watch is not None:
+            self.folder_watch.stop()
+            self.folder_watch = None
+            self.watch_btn.config(text="监视文件夹")
+            self.update_status("已停止监视文件夹")
+    
+    def _run_folder_watch(self, watch: HotFolderWatch):
+        """监视线程：监视出错（如输出文件夹无法写入）时通知界面线程"""
+        try:
+            watch.run()
+        except Exception as e:
+            print(f"Folder watch failed: {e}")
+            self._watch_results.put({'event': 'error', 'watch': watch, 'error': str(e)})
+    
+    def _poll_folder_watch(self):
+        """在界面线程中取回监视线程的导出结果并更新状态栏"""
+        watch = self.folder_watch
+        while True:
+            try:
+                result = self._watch_results.get_nowait()
+            except queue.Empty:
+                break
+            if result.get('event') == 'error':
+                if result['watch'] is watch:
+                    # 监视已停止，恢复按钮状态
+                    self.folder_watch = None
+                    self.watch_btn.config(text="监视文件夹")
+                    self.update_status(f"监视文件夹失败: {result['error']}")
+                    messagebox.showerror("错误", f"监视文件夹失败: {result['error']}")
+                    return
+            elif result['status'] == 'failed':
+                print(f"Watch export failed {result['source']}: {result.get('error')}")
+        
+        if watch is None:
+            return
+        counts = watch.counts
+        self.update_status(f"正在监视: {watch.watch_folder}  已导出 {counts['done']} 张，"
+                           f"失败 {counts['failed']} 张")
+        self.parent.after(500, self._poll_folder_watch)
+    
     def export_all_images(self):
         """导出所有图片"""
         try:
@@ -867,10 +1061,23 @@ class MainWindow:
             total_count = len(image_list)
             success_count = 0
             
+            # 水印设置在导出期间保持不变，只编译一次渲染计划
+            plan = self.compile_current_watermark()
+            if plan is None:
+                # 如图片水印未选择水印图片，不导出没有水印的副本
+                self.show_progress(False)
+                messagebox.showwarning("警告", "当前水印不可用，请先完成水印设置（图片水印需选择水印图片）")
+                return
+            
             for i, image_data in enumerate(image_list):
                 try:
                     print(f"Processing image {i+1}/{total_count}: {image_data['filename']}")
                     
+                    # 导入文件夹时只检查了文件头，导出前完整校验图片
+                    if not self.file_manager.validate_image_file(image_data['path']):
+                        print(f"Invalid image skipped: {image_data['path']}")
+                        continue
+                    
                     # 加载图片
                     image = self.image_list_manager.load_image(image_data['path'])
                     if not image:
@@ -879,16 +1086,13 @@ class MainWindow:
                     
                     print(f"Loaded image: {image.size}, mode: {image.mode}")
                     
-                    # 应用当前选择的水印类型
-                    if self.watermark_type == "exif":
-                        # EXIF水印需要图片路径
-                        watermarked_image = self.current_exif_watermark.apply_to_image_with_path(image, image_data['path'])
-                    else:
-                        watermarked_image = self.apply_current_watermark(image)
+                    # 使用渲染计划应用当前选择的水印类型
+                    watermarked_image = self.render_watermark_plan(plan, image, image_data['path'],
+                                                                   image_data.get('exif'))
                     
                     if not watermarked_image:
-                        print("Failed to apply watermark")
-                        watermarked_image = image  # 如果应用失败，使用原图
+                        print(f"Failed to apply watermark, skipped: {image_data['path']}")
+                        continue
                     
                     print(f"Applied watermark: {watermarked_image.size}, mode: {watermarked_image.mode}")
                     
@@ -922,6 +1126,8 @@ class MainWindow:
         """图片列表变化回调"""
         if event == 'image_added':
             self.update_image_list_display()
+        elif event == 'images_added':
+            self.append_image_list_rows(data)
         elif event == 'image_removed':
             self.update_image_list_display()
         elif event == 'list_cleared':
@@ -943,6 +1149,15 @@ class MainWindow:
                                         text=str(i+1),
                                         values=(image_data['filename'], size_text, image_data['format']))
     
+    def append_image_list_rows(self, images):
+        """将批量添加的图片追加到列表显示末尾，不重建已有的行"""
+        start = len(self.image_list_widget.get_children())
+        for i, image_data in enumerate(images, start + 1):
+            size_text = f"{image_data['size'][0]}x{image_data['size'][1]}"
+            self.image_list_widget.insert('', 'end',
+                                        text=str(i),
+                                        values=(image_data['filename'], size_text, image_data['format']))
+    
     def on_image_selected(self, event):
         """图片选择事件"""
         selection = self.image_list_widget.selection()
@@ -1024,7 +1239,8 @@ class MainWindow:
                     canvas_pos = self.calculate_canvas_position(image.size, self.current_exif_watermark)
                     current_image_data = self.image_list_manager.get_current_image()
                     if current_image_data and current_image_data.get('path'):
-                        exif_text = self.current_exif_watermark.generate_watermark_text(current_image_data['path'])
+                        exif_text = self.current_exif_watermark.generate_watermark_text(
+                            current_image_data['path'], image, metadata=current_image_data.get('exif'))
                     else:
                         exif_text = "2024-01-15"
                     self.watermark_drag_handler.show_watermark(canvas_pos, exif_text, "exif")
@@ -1079,26 +1295,50 @@ class MainWindow:
             print(f"Update preview failed: {e}")
             self._preview_update_pending = False
     
-    def apply_current_watermark(self, image: Image.Image) -> Optional[Image.Image]:
-        """应用当前选择的水印类型"""
+    def compile_current_watermark(self):
+        """将当前选择的水印编译为渲染计划，无可用水印时返回None"""
         try:
             if self.watermark_type == "text":
-                return self.current_watermark.apply_to_image(image)
+                return self.current_watermark.compile()
             elif self.watermark_type == "image":
-                return self.current_image_watermark.apply_to_image(image)
+                return self.current_image_watermark.compile()
             elif self.watermark_type == "exif":
-                # EXIF水印需要图片路径
-                current_image = self.image_list_manager.get_current_image()
-                if current_image and current_image.get('path'):
-                    return self.current_exif_watermark.apply_to_image_with_path(image, current_image['path'])
-                else:
-                    return image
+                return self.current_exif_watermark.compile()
             else:
-                return image
+                return None
+        except Exception as e:
+            print(f"Compile watermark failed: {e}")
+            return None
+    
+    def render_watermark_plan(self, plan, image: Image.Image, image_path: str = None,
+                              metadata: Dict = None) -> Optional[Image.Image]:
+        """使用渲染计划为图片添加水印，没有可用的渲染计划时返回None，渲染失败时返回原图
+        
+        metadata 为导入时后台预读的EXIF元数据，EXIF水印直接使用而无需再读取文件。
+        """
+        if plan is None:
+            return None
+        try:
+            return plan.render(image, image_path, metadata)
         except Exception as e:
             print(f"Apply watermark failed: {e}")
             return image
     
+    def apply_current_watermark(self, image: Image.Image) -> Optional[Image.Image]:
+        """应用当前选择的水印类型"""
+        image_path = None
+        metadata = None
+        if self.watermark_type == "exif":
+            # EXIF水印需要图片路径
+            current_image = self.image_list_manager.get_current_image()
+            if not current_image or not current_image.get('path'):
+                return image
+            image_path = current_image['path']
+            metadata = current_image.get('exif')
+        
+        return self.render_watermark_plan(self.compile_current_watermark(), image,
+                                          image_path, metadata)
+    
     # 水印设置相关方法
     def on_watermark_type_changed(self):
         """水印类型变化"""
@@ -1160,7 +1400,8 @@ class MainWindow:
             elif self.watermark_type == "exif":
                 canvas_pos = self.calculate_canvas_position(image.size, self.current_exif_watermark)
                 if current_image and current_image.get('path'):
-                    exif_text = self.current_exif_watermark.generate_watermark_text(current_image['path'])
+                    exif_text = self.current_exif_watermark.generate_watermark_text(
+                        current_image['path'], image, metadata=current_image.get('exif'))
                 else:
                     exif_text = "2024-01-15"
                 self.watermark_drag_handler.show_watermark(canvas_pos, exif_text, "exif")
@@ -1216,6 +1457,12 @@ class MainWindow:
             self.current_watermark.set_rotation(angle)
             self.update_preview()
     
+    def on_tiling_changed(self, value=None):
+        """平铺设置变化"""
+        self.current_watermark.set_tiling(self.tile_spacing_var.get(), self.tile_stagger_var.get() / 100)
+        if self.current_watermark.is_tiled():
+            self.update_preview()
+    
     def on_quality_changed(self, value):
         """JPEG质量变化"""
         quality = int(value)
@@ -1312,6 +1559,14 @@ class MainWindow:
         if self.watermark_type == "exif":
             self._schedule_drag_refresh()
     
+    def on_exif_template_changed(self, event=None):
+        """EXIF文本模板变化，输入未完成的无效模板暂不应用"""
+        if not self.current_exif_watermark.set_text_template(self.exif_template_var.get()):
+            return
+        self.update_preview()
+        if self.watermark_type == "exif":
+            self._schedule_drag_refresh()
+    
     def on_naming_option_changed(self):
         """文件命名选项变化"""
         option = self.naming_option.get()
@@ -1596,6 +1851,11 @@ class MainWindow:
                 self.position_var.set(self.current_watermark.position)
                 print(f"  Position updated: {self.current_watermark.position}")
             
+            # 更新平铺设置
+            if hasattr(self, 'tile_spacing_var'):
+                self.tile_spacing_var.set(self.current_watermark.tile_spacing)
+                self.tile_stagger_var.set(int(self.current_watermark.tile_stagger * 100))
+            
             # 更新阴影和描边设置
             if hasattr(self, 'shadow_var'):
                 self.shadow_var.set(self.current_watermark.shadow)
@@ -1641,6 +1901,9 @@ class MainWindow:
             if hasattr(self, 'exif_suffix_var'):
                 self.exif_suffix_var.set(self.current_exif_watermark.suffix_text)
             
+            if hasattr(self, 'exif_template_var'):
+                self.exif_template_var.set(self.current_exif_watermark.text_template)
+            
             if hasattr(self, 'exif_font_size_var'):
                 self.exif_font_size_var.set(self.current_exif_watermark.font_size)
             
@@ -11,6 +11,10 @@ from datetime import datetime
 import shutil
 import threading
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from components.image_probe import probe_images
+
 class WatermarkApp(tk.Tk):
     def __init__(self):
         super(WatermarkApp, self).__init__()
@@ -294,31 +298,29 @@ class WatermarkApp(tk.Tk):
             
     def add_images_to_list(self, file_paths):
         """将图片添加到列表中"""
+        # 检查是否已经在列表中
+        known = set(self.imported_images)
+        new_paths = []
         for path in file_paths:
-            # 检查是否已经在列表中
-            if path in self.imported_images:
+            if path not in known:
+                known.add(path)
+                new_paths.append(path)
+        
+        # 在线程池中批量读取文件头中的图片信息
+        for path, info in zip(new_paths, probe_images(new_paths)):
+            if info is None:
+                messagebox.showerror("错误", "无法加载图片 {}".format(path))
                 continue
-                
-            try:
-                # 获取图片信息
-                with Image.open(path) as img:
-                    format_name = img.format
-                    width, height = img.size
-                    file_size = os.path.getsize(path) / 1024  # KB
-                    
-                # 添加到列表
-                filename = os.path.basename(path)
-                self.image_list.insert("", tk.END, values=(
-                    filename,
-                    format_name,
-                    "{:.1f} KB".format(file_size)
-                ))
-                
-                # 保存路径
-                self.imported_images.append(path)
-                
-            except Exception as e:
-                messagebox.showerror("错误", "无法加载图片 {}: {}".format(path, str(e)))
+            
+            # 添加到列表
+            self.image_list.insert("", tk.END, values=(
+                info['filename'],
+                info['format'],
+                "{:.1f} KB".format(info['file_size'] / 1024)
+            ))
+            
+            # 保存路径
+            self.imported_images.append(path)
                 
         # 更新状态栏
         self.status_bar.config(text="已导入 {} 张图片".format(len(self.imported_images)))
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+图像合成工具模块
+提供只在水印区域内进行混合的合成函数、缩放用的图像金字塔和EXIF方向校正
+"""
+
+from typing import List, Tuple
+from PIL import Image
+
+
+def blend_tile(image: Image.Image, tile: Image.Image, position: Tuple[int, int]) -> Image.Image:
+    """将RGBA水印块混合到图片的对应区域（原地修改）
+
+    只处理水印块覆盖的区域，超出图片边界的部分会被裁剪，
+    开销只与水印块大小相关，与整张图片的尺寸无关。
+
+    Args:
+        image: RGBA模式的目标图片
+        tile: RGBA模式的水印块
+        position: 水印块左上角在目标图片中的坐标
+
+    Returns:
+        混合后的目标图片（与传入的是同一个对象）
+    """
+    x, y = int(position[0]), int(position[1])
+
+    # 计算水印块与图片的可见交集
+    left = max(0, x)
+    top = max(0, y)
+    right = min(image.width, x + tile.width)
+    bottom = min(image.height, y + tile.height)
+    if right <= left or bottom <= top:
+        return image
+
+    # 只合成可见部分
+    image.alpha_composite(tile, dest=(left, top),
+                          source=(left - x, top - y, right - x, bottom - y))
+    return image
+
+
+def build_pyramid(image: Image.Image, max_side: int = None, min_side: int = 64) -> List[Image.Image]:
+    """用 Image.reduce 逐级减半构建图像金字塔（最大的层级在前）
+
+    RGBA图片在预乘alpha下缩小，避免透明像素的颜色渗入边缘。
+    最长边超过 max_side 的层级（包括原图）构建后即被丢弃，以限制内存占用；
+    最短边不足 min_side 的两倍时停止继续缩小。
+    """
+    premultiplied = image.mode == 'RGBA'
+    level = image.convert('RGBa') if premultiplied else image
+    levels = [image]
+    while min(level.size) >= 2 * min_side:
+        level = level.reduce(2)
+        levels.append(level.convert('RGBA') if premultiplied else level)
+
+    if max_side is not None:
+        kept = [level for level in levels if max(level.size) <= max_side]
+        levels = kept or levels[-1:]
+    return levels
+
+
+def select_pyramid_level(pyramid: List[Image.Image], size: Tuple[int, int]) -> Image.Image:
+    """选择不小于目标尺寸的最小层级，所有层级都不够大时返回最大的层级"""
+    width, height = size
+    for level in reversed(pyramid):
+        if level.width >= width and level.height >= height:
+            return level
+    return pyramid[0]
+
+
+# EXIF方向 -> 校正所需的变换（与 ImageOps.exif_transpose 一致）
+try:
+    _ORIENTATION_TRANSPOSE = {
+        2: Image.Transpose.FLIP_LEFT_RIGHT,
+        3: Image.Transpose.ROTATE_180,
+        4: Image.Transpose.FLIP_TOP_BOTTOM,
+        5: Image.Transpose.TRANSPOSE,
+        6: Image.Transpose.ROTATE_270,
+        7: Image.Transpose.TRANSVERSE,
+        8: Image.Transpose.ROTATE_90,
+    }
+except AttributeError:
+    # 较老版本的PIL没有 Image.Transpose
+    _ORIENTATION_TRANSPOSE = {
+        2: Image.FLIP_LEFT_RIGHT,
+        3: Image.ROTATE_180,
+        4: Image.FLIP_TOP_BOTTOM,
+        5: Image.TRANSPOSE,
+        6: Image.ROTATE_270,
+        7: Image.TRANSVERSE,
+        8: Image.ROTATE_90,
+    }
+
+
+def apply_orientation(image: Image.Image, orientation: int) -> Image.Image:
+    """按EXIF方向标签将图片转为正向，方向为1或无效时原样返回"""
+    method = _ORIENTATION_TRANSPOSE.get(orientation)
+    if method is None:
+        return image
+    return image.transpose(method)
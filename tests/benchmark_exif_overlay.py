@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+EXIF日期标签合成性能基准
+对比整幅叠加层（原实现）与只在标签区域内合成的 add_watermark 的耗时，并校验输出一致
+
+用法:
+  python tests/benchmark_exif_overlay.py [重复次数] [图片宽度]
+"""
+
+import sys
+import os
+import time
+from PIL import Image, ImageChops, ImageDraw
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+from components.exif_watermark import COLOR_MAP, POS_MAP, SIZE_MAP, add_watermark, get_label_font
+
+
+def add_watermark_full_frame(img, text, font_size, color, pos):
+    """原实现：整幅RGBA叠加层、整幅合成后再转回RGB"""
+    draw = ImageDraw.Draw(img)
+    font = get_label_font(font_size)
+    bbox = draw.textbbox((0, 0), text, font=font)
+    text_w = bbox[2] - bbox[0]
+    text_h = bbox[3] - bbox[1]
+    w, h = img.size
+    margin = 12
+    if pos == 'top-left':
+        x, y = margin, margin
+    elif pos == 'center':
+        x, y = (w - text_w) // 2, (h - text_h) // 2
+    else:
+        x, y = w - text_w - margin, h - text_h - margin
+    rect_pad = 6
+    overlay = Image.new('RGBA', img.size, (0, 0, 0, 0))
+    odraw = ImageDraw.Draw(overlay)
+    odraw.rectangle([x - rect_pad, y - rect_pad, x + text_w + rect_pad, y + text_h + rect_pad],
+                    fill=(0, 0, 0, 120))
+    img = img.convert('RGBA')
+    img = Image.alpha_composite(img, overlay)
+    draw = ImageDraw.Draw(img)
+    draw.text((x, y), text, font=font, fill=color + (255,))
+    return img.convert('RGB')
+
+
+def outputs_match(image, text='2024-03-01'):
+    """校验所有位置、字号和颜色组合下两种实现的输出逐字节一致"""
+    for pos in POS_MAP:
+        for font_size in SIZE_MAP.values():
+            for color in COLOR_MAP.values():
+                expected = add_watermark_full_frame(image.copy(), text, font_size, color, pos)
+                actual = add_watermark(image.copy(), text, font_size, color, pos)
+                if ImageChops.difference(expected, actual).getbbox() is not None:
+                    return False
+    return True
+
+
+def time_it(func, image, repeat):
+    """计算单次合成的平均耗时（毫秒），复制图片的时间不计入"""
+    copies = [image.copy() for _ in range(repeat)]
+    func(image.copy(), '2024-03-01', SIZE_MAP['medium'], COLOR_MAP['white'], 'bottom-right')
+    start = time.perf_counter()
+    for copy in copies:
+        func(copy, '2024-03-01', SIZE_MAP['medium'], COLOR_MAP['white'], 'bottom-right')
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 6000
+
+    image = Image.effect_noise((width, width * 2 // 3), 60).convert('RGB')
+    print(f"EXIF日期标签合成基准: {image.width}x{image.height}, 重复 {repeat} 次")
+    print(f"输出一致: {outputs_match(image)}")
+
+    before_ms = time_it(add_watermark_full_frame, image, repeat)
+    after_ms = time_it(add_watermark, image, repeat)
+    print(f"{'整幅叠加':>8} {before_ms:>10.3f} ms")
+    print(f"{'区域合成':>8} {after_ms:>10.3f} ms   (快 {before_ms / after_ms:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
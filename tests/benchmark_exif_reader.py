@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+EXIF日期读取性能基准
+对比内置头部读取器与 piexif、exifread 两个后端读取拍摄日期的耗时
+
+用法:
+  python tests/benchmark_exif_reader.py [重复次数] [图片宽度]
+"""
+
+import sys
+import os
+import time
+import tempfile
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+from components.exif_reader import read_exif_date
+from components import exif_text_watermark as backends
+
+
+def make_sample(path: str, width: int):
+    """生成带EXIF和较大MakerNote的噪点JPEG（噪点使文件接近真实照片大小）"""
+    import piexif
+    exif = {
+        '0th': {piexif.ImageIFD.Make: b'Bench', piexif.ImageIFD.Model: b'Bench 1',
+                piexif.ImageIFD.DateTime: b'2024:03:01 08:00:00'},
+        'Exif': {piexif.ExifIFD.DateTimeOriginal: b'2024:03:01 08:00:00',
+                 piexif.ExifIFD.MakerNote: bytes(60000)},
+    }
+    image = Image.effect_noise((width, width * 3 // 4), 80).convert('RGB')
+    image.save(path, 'JPEG', quality=95, exif=piexif.dump(exif))
+
+
+def time_it(func, path, repeat):
+    """计算单次读取的平均耗时（毫秒），先预热一次"""
+    func(path)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(path)
+    return (time.perf_counter() - start) * 1000 / repeat, result
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 4000
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'sample.jpg')
+        make_sample(path, width)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+
+        print(f"EXIF日期读取基准: {width}px JPEG ({size_mb:.1f} MB), 重复 {repeat} 次")
+        print(f"{'后端':>10} {'耗时(ms)':>10} {'结果':>12}")
+        candidates = [("header", read_exif_date)]
+        if backends.PIEXIF_AVAILABLE:
+            candidates.append(("piexif", backends._extract_date_piexif))
+        if backends.EXIFREAD_AVAILABLE:
+            candidates.append(("exifread", backends._extract_date_exifread))
+
+        baseline_ms = None
+        for name, func in candidates:
+            elapsed_ms, result = time_it(func, path, repeat)
+            if baseline_ms is None:
+                baseline_ms = elapsed_ms
+                print(f"{name:>10} {elapsed_ms:>10.3f} {result:>12}")
+            else:
+                print(f"{name:>10} {elapsed_ms:>10.3f} {result:>12}   "
+                      f"(头部读取器快 {elapsed_ms / baseline_ms:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
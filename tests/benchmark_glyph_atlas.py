@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+EXIF日期水印字形图集性能基准
+对比每张图片整串光栅化（原实现）与由字形图集拼接标签的耗时，并校验输出一致
+
+用法:
+  python tests/benchmark_glyph_atlas.py [图片数量] [图片宽度]
+"""
+
+import sys
+import os
+import time
+from PIL import Image, ImageChops, ImageDraw
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+from components.exif_text_watermark import ExifTextWatermark
+from components.text_effects import draw_text_with_effects
+
+# 一年中的日期，模拟批量处理时不断变化的标签
+DATES = [f"2023-{month:02d}-{day:02d}" for month in range(1, 13) for day in range(1, 29)]
+
+
+def render_direct(plan, image, watermark_text):
+    """原实现：每张图片都对整串文本做光栅化"""
+    font = plan.get_font()
+    result_image = image.convert('RGBA')
+    draw = ImageDraw.Draw(result_image)
+    bbox = draw.textbbox((0, 0), watermark_text, font=font)
+    position = plan.anchor(image.size, (bbox[2] - bbox[0], bbox[3] - bbox[1]))
+    draw_text_with_effects(draw, position, watermark_text, font, plan.fill_color,
+                           plan.shadow_color, plan.shadow_offset,
+                           plan.outline_color, plan.outline_width)
+    return result_image
+
+
+def make_watermark(font_size=24, shadow=True, position="bottom_right", prefix="", outline_width=0):
+    watermark = ExifTextWatermark()
+    watermark.font_size = font_size
+    watermark.shadow = shadow
+    watermark.outline = outline_width > 0
+    watermark.outline_width = outline_width
+    watermark.outline_color = "#202020"
+    watermark.position = position
+    watermark.prefix_text = prefix
+    return watermark
+
+
+def outputs_match(image, dates=DATES[:20], prefix=""):
+    """校验不同字号、阴影、描边和位置组合下两种实现的输出逐字节一致"""
+    for font_size in (9, 24, 61):
+        for shadow, outline_width in ((False, 0), (True, 0), (False, 2), (True, 3)):
+            for position in ("top_left", "center", "bottom_right"):
+                watermark = make_watermark(font_size, shadow, position, prefix, outline_width)
+                plan = watermark.compile()
+                for date in dates:
+                    text = watermark.generate_watermark_text(metadata={'date': date})
+                    expected = render_direct(plan, image, text)
+                    actual = plan.render(image, metadata={'date': date})
+                    if ImageChops.difference(expected, actual).getbbox() is not None:
+                        return False
+    return True
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+
+    # 用小图片突出标签光栅化本身的开销
+    image = Image.effect_noise((width, width * 2 // 3), 60).convert('RGBA')
+    print(f"字形图集基准: {count} 个标签, 图片 {image.width}x{image.height}")
+    print(f"输出一致: {outputs_match(image)}")
+
+    plan = make_watermark(prefix="拍摄于 ").compile()
+    dates = [DATES[i % len(DATES)] for i in range(count)]
+    texts = [plan.text_source(None, metadata={'date': date}) for date in dates]
+
+    start = time.perf_counter()
+    for text in texts:
+        render_direct(plan, image, text)
+    before_ms = (time.perf_counter() - start) * 1000 / count
+
+    start = time.perf_counter()
+    for date in dates:
+        plan.render(image, metadata={'date': date})
+    after_ms = (time.perf_counter() - start) * 1000 / count
+
+    print(f"{'整串光栅化':>8} {before_ms:>10.3f} ms/张")
+    print(f"{'字形图集':>8} {after_ms:>10.3f} ms/张   (快 {before_ms / after_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
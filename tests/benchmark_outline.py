@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+描边绘制性能基准
+对比逐像素偏移重复绘制的旧描边方式与新描边引擎（描边宽度 1-10）
+
+用法:
+  python tests/benchmark_outline.py [重复次数]
+"""
+
+import sys
+import os
+import time
+from PIL import Image, ImageDraw, ImageFont
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+from components.text_effects import draw_outlined_text, MAX_STROKE_WIDTH
+
+TEXT = "© 2024 Watermark"
+FILL = (255, 255, 255, 200)
+OUTLINE = (0, 0, 0, 200)
+
+
+def legacy_outline(draw, position, text, font, width):
+    """旧实现：(2w+1)^2 - 1 次偏移绘制"""
+    x, y = position
+    for dx in range(-width, width + 1):
+        for dy in range(-width, width + 1):
+            if dx != 0 or dy != 0:
+                draw.text((x + dx, y + dy), text, font=font, fill=OUTLINE)
+    draw.text((x, y), text, font=font, fill=FILL)
+
+
+def engine_outline(draw, position, text, font, width):
+    """新实现：FreeType描边 / 膨胀遮罩"""
+    draw_outlined_text(draw, position, text, font, FILL, OUTLINE, width)
+
+
+def time_it(func, font, width, repeat):
+    """计算单次绘制的平均耗时（毫秒）"""
+    canvas = Image.new('RGBA', (900, 200), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(canvas)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(draw, (40, 40), TEXT, font, width)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    try:
+        font = ImageFont.load_default(size=64)
+    except TypeError:
+        font = ImageFont.load_default()
+    
+    print(f"描边绘制基准: 文本 {TEXT!r}, 重复 {repeat} 次")
+    print(f"{'宽度':>4} {'方式':>8} {'旧实现(ms)':>12} {'新引擎(ms)':>12} {'加速比':>8}")
+    for width in range(1, 11):
+        legacy_ms = time_it(legacy_outline, font, width, repeat)
+        engine_ms = time_it(engine_outline, font, width, repeat)
+        mode = "stroke" if width <= MAX_STROKE_WIDTH else "dilate"
+        print(f"{width:>4} {mode:>8} {legacy_ms:>12.2f} {engine_ms:>12.2f} {legacy_ms / engine_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -101,12 +101,13 @@ def test_font_cache_issue():
     """测试字体缓存问题"""
     print("\nTesting font cache...")
     
+    from components.font_registry import font_registry
     from components.text_watermark import TextWatermark
     
     watermark = TextWatermark()
     
     # 清空字体缓存
-    watermark._font_cache.clear()
+    font_registry.clear()
     print("Font cache cleared")
     
     # 设置中文字体
@@ -116,7 +117,6 @@ def test_font_cache_issue():
     # 获取字体
     font1 = watermark._get_font(24)
     print(f"Font 1: {font1}")
-    print(f"Cache contents: {list(watermark._font_cache.keys())}")
     
     # 再次获取相同字体
     font2 = watermark._get_font(24)
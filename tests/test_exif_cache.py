@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+EXIF元数据持久缓存测试
+"""
+
+import sys
+import os
+import tempfile
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+import piexif
+from components.exif_cache import ExifMetadataCache, TransientMetadata
+from components.exif_text_watermark import load_exif_metadata
+
+
+class CountingLoader:
+    """统计调用次数的元数据提取函数"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, image_path):
+        self.calls += 1
+        return load_exif_metadata(image_path)
+
+
+def _save_photo(path, date=b'2021:07:04 10:00:00', model=b'TestCam'):
+    exif = {'0th': {piexif.ImageIFD.Model: model}, 'Exif': {piexif.ExifIFD.DateTimeOriginal: date}}
+    Image.new('RGB', (32, 24)).save(path, 'JPEG', exif=piexif.dump(exif))
+
+
+def test_unchanged_files_are_not_parsed_again():
+    """文件未变化时直接使用缓存，包括新建的缓存实例（持久化）"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, 'exif_cache.db')
+        photo = os.path.join(temp_dir, 'photo.jpg')
+        _save_photo(photo)
+
+        loader = CountingLoader()
+        cache = ExifMetadataCache(loader, db_path)
+        first = cache.get_metadata(photo)
+        assert first['date'] == '2021-07-04'
+        assert first['model'] == 'TestCam'
+        assert cache.get_metadata(photo) == first
+        assert loader.calls == 1
+        cache.close()
+
+        reopened = ExifMetadataCache(loader, db_path)
+        assert reopened.get_metadata(photo) == first
+        assert loader.calls == 1
+        assert reopened.get_stats() == {'hits': 1, 'misses': 0}
+        reopened.close()
+
+
+def test_modified_file_is_parsed_again():
+    """文件大小或修改时间变化后重新提取"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        photo = os.path.join(temp_dir, 'photo.jpg')
+        _save_photo(photo)
+
+        loader = CountingLoader()
+        cache = ExifMetadataCache(loader, os.path.join(temp_dir, 'exif_cache.db'))
+        assert cache.get_metadata(photo)['date'] == '2021-07-04'
+
+        _save_photo(photo, date=b'2022:02:02 02:02:02', model=b'OtherCam')
+        stat = os.stat(photo)
+        os.utime(photo, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        metadata = cache.get_metadata(photo)
+        assert metadata['date'] == '2022-02-02'
+        assert metadata['model'] == 'OtherCam'
+        assert loader.calls == 2
+        cache.close()
+
+
+def test_missing_file_is_not_cached():
+    """不存在的文件不写入缓存"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        loader = CountingLoader()
+        cache = ExifMetadataCache(loader, os.path.join(temp_dir, 'exif_cache.db'))
+        missing = os.path.join(temp_dir, 'missing.jpg')
+        assert cache.get_metadata(missing)['date'] is None
+        assert cache.get_metadata(missing)['date'] is None
+        assert loader.calls == 2
+        cache.close()
+
+
+def test_io_failure_is_not_cached():
+    """文件暂时无法读取时的结果不写入缓存，恢复后重新提取"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # 无法读取的路径（目录）得到不缓存的结果
+        assert isinstance(load_exif_metadata(temp_dir), TransientMetadata)
+
+        photo = os.path.join(temp_dir, 'photo.jpg')
+        _save_photo(photo)
+        results = [TransientMetadata(date=None)]
+
+        def flaky_loader(image_path):
+            return results.pop() if results else load_exif_metadata(image_path)
+
+        cache = ExifMetadataCache(flaky_loader, os.path.join(temp_dir, 'exif_cache.db'))
+        assert cache.get_metadata(photo)['date'] is None
+        assert cache.get_metadata(photo)['date'] == '2021-07-04'
+        assert cache.get_stats() == {'hits': 0, 'misses': 2}
+        cache.close()
+
+
+def test_writes_are_committed_in_batches():
+    """写入累计后批量提交，flush 后其他连接可以读到"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, 'exif_cache.db')
+        photo = os.path.join(temp_dir, 'photo.jpg')
+        _save_photo(photo)
+
+        writer = ExifMetadataCache(CountingLoader(), db_path)
+        writer.get_metadata(photo)
+        reader_loader = CountingLoader()
+        reader = ExifMetadataCache(reader_loader, db_path)
+        stat = os.stat(photo)
+        assert reader.get(os.path.abspath(photo), stat.st_size, stat.st_mtime_ns) is None
+
+        writer.flush()
+        assert reader.get_metadata(photo)['date'] == '2021-07-04'
+        assert reader_loader.calls == 0
+        writer.close()
+        reader.close()
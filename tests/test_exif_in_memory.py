@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+内存EXIF数据测试：优先使用已解码图片自带的EXIF，不重复打开文件
+"""
+
+import sys
+import os
+import io
+import tempfile
+from PIL import Image, ImageChops
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+import piexif
+from components import exif_text_watermark
+from components.exif_cache import ExifMetadataCache
+from components.exif_text_watermark import ExifTextWatermark, extract_date_from_image, load_exif_metadata
+
+
+def _exif_bytes(date=b'2021:07:04 10:00:00') -> bytes:
+    return piexif.dump({'0th': {}, 'Exif': {piexif.ExifIFD.DateTimeOriginal: date}})
+
+
+def _open_jpeg_with_exif() -> Image.Image:
+    buffer = io.BytesIO()
+    Image.new('RGB', (320, 240), (60, 60, 60)).save(buffer, 'JPEG', exif=_exif_bytes())
+    buffer.seek(0)
+    image = Image.open(buffer)
+    image.load()
+    return image
+
+
+def test_date_from_decoded_image_and_raw_app1():
+    """从图片自带的原始APP1数据、getexif() 或传入的APP1数据读取日期"""
+    assert extract_date_from_image(_open_jpeg_with_exif()) == '2021-07-04'
+    assert extract_date_from_image(exif_data=_exif_bytes(b'2019:01:02 03:04:05')) == '2019-01-02'
+
+    image = Image.new('RGB', (10, 10))
+    image.getexif()[0x0132] = '2018:08:08 08:08:08'
+    assert extract_date_from_image(image) == '2018-08-08'
+
+    assert extract_date_from_image(Image.new('RGB', (10, 10))) is None
+
+
+def test_apply_without_reopening_file():
+    """图片自带EXIF时不按路径读取文件"""
+    image = _open_jpeg_with_exif()
+    watermark = ExifTextWatermark()
+
+    opened = []
+    original = exif_text_watermark.extract_date_from_exif
+    exif_text_watermark.extract_date_from_exif = lambda path: opened.append(path)
+    try:
+        with_path = watermark.apply_to_image(image, '/nonexistent/photo.jpg')
+        without_path = watermark.apply_to_image(image)
+    finally:
+        exif_text_watermark.extract_date_from_exif = original
+
+    assert opened == []
+    assert ImageChops.difference(with_path, without_path).getbbox() is None
+    assert watermark.generate_watermark_text(image=image) == '2021-07-04'
+
+
+def test_falls_back_to_path_when_image_has_no_exif():
+    """图片没有EXIF时回退到按路径读取；没有路径也没有EXIF时返回原图"""
+    watermark = ExifTextWatermark()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        original_cache = exif_text_watermark.exif_cache
+        exif_text_watermark.exif_cache = ExifMetadataCache(
+            load_exif_metadata, os.path.join(temp_dir, 'exif_cache.db'))
+        try:
+            path = os.path.join(temp_dir, 'photo.jpg')
+            Image.new('RGB', (64, 48)).save(path, 'JPEG', exif=_exif_bytes(b'2020:05:05 05:05:05'))
+            plain = Image.new('RGB', (64, 48))
+            assert watermark.generate_watermark_text(path, plain) == '2020-05-05'
+        finally:
+            exif_text_watermark.exif_cache.close()
+            exif_text_watermark.exif_cache = original_cache
+
+    plain = Image.new('RGB', (64, 48))
+    assert watermark.apply_to_image(plain) is plain
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+EXIF日期标签区域合成测试：输出与整幅叠加的原实现逐字节一致
+"""
+
+import sys
+import os
+from PIL import Image
+
+# 添加src目录和测试目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+sys.path.insert(0, current_dir)
+
+from benchmark_exif_overlay import outputs_match
+
+
+def test_region_overlay_matches_full_frame():
+    """各位置、字号和颜色下输出一致"""
+    assert outputs_match(Image.effect_noise((640, 480), 60).convert('RGB'))
+
+
+def test_label_clipped_by_small_image():
+    """标签超出图片边界时同样一致"""
+    assert outputs_match(Image.effect_noise((90, 40), 60).convert('RGB'), text='2024-03-01 12:00')
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+EXIF头部读取测试
+"""
+
+import sys
+import os
+import io
+import tempfile
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+import piexif
+from components.exif_reader import (
+    ExifFormatError, read_exif_date, read_exif_metadata, read_exif_tags,
+    TAG_DATETIME, TAG_DATETIME_ORIGINAL, TAG_MODEL, TAG_ORIENTATION
+)
+from components.exif_text_watermark import _extract_date_piexif
+
+
+class CountingReader(io.BytesIO):
+    """统计读取字节数的文件对象"""
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def _jpeg_bytes(exif: dict = None, size=(64, 48)) -> bytes:
+    buffer = io.BytesIO()
+    image = Image.effect_noise(size, 64).convert('RGB')
+    if exif is None:
+        image.save(buffer, 'JPEG')
+    else:
+        image.save(buffer, 'JPEG', exif=piexif.dump(exif))
+    return buffer.getvalue()
+
+
+def _exif(original=None, datetime_value=None):
+    exif = {'0th': {piexif.ImageIFD.Model: b'TestCam', piexif.ImageIFD.Orientation: 6},
+            'Exif': {}}
+    if datetime_value:
+        exif['0th'][piexif.ImageIFD.DateTime] = datetime_value
+    if original:
+        exif['Exif'][piexif.ExifIFD.DateTimeOriginal] = original
+    return exif
+
+
+def test_reads_tags_from_ifd0_and_exif_ifd():
+    """读取IFD0和Exif子IFD中的标签"""
+    data = _jpeg_bytes(_exif(b'2021:07:04 10:00:00', b'2022:01:01 00:00:00'))
+    values = read_exif_tags(data, [TAG_MODEL, TAG_ORIENTATION, TAG_DATETIME, TAG_DATETIME_ORIGINAL])
+    assert values == {
+        TAG_MODEL: 'TestCam',
+        TAG_ORIENTATION: 6,
+        TAG_DATETIME: '2022:01:01 00:00:00',
+        TAG_DATETIME_ORIGINAL: '2021:07:04 10:00:00',
+    }
+
+
+def test_date_priority_matches_piexif_backend():
+    """日期优先级和格式与piexif实现一致"""
+    cases = [
+        _exif(b'2021:07:04 10:00:00', b'2022:01:01 00:00:00'),
+        _exif(None, b'2022:01:01 00:00:00'),
+        _exif(b'not a date', b'2020:02:29 12:00:00'),
+        _exif(),
+    ]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for i, exif in enumerate(cases):
+            path = os.path.join(temp_dir, f'{i}.jpg')
+            with open(path, 'wb') as f:
+                f.write(_jpeg_bytes(exif))
+            assert read_exif_date(path) == _extract_date_piexif(path)
+
+    assert read_exif_date(_jpeg_bytes(cases[0])) == '2021-07-04'
+    assert read_exif_date(_jpeg_bytes(cases[2])) == '2020-02-29'
+
+
+def test_little_endian_tiff():
+    """支持小端字节序的TIFF文件"""
+    exif = Image.Exif()
+    exif[TAG_DATETIME] = '2019:12:31 23:59:59'
+    buffer = io.BytesIO()
+    Image.new('RGB', (16, 16)).save(buffer, 'TIFF', exif=exif)
+    assert buffer.getvalue()[:2] == b'II'
+    assert read_exif_date(buffer.getvalue()) == '2019-12-31'
+
+
+def test_stops_before_image_data():
+    """只读取文件头部，不读取图像数据"""
+    data = _jpeg_bytes(_exif(b'2021:07:04 10:00:00'), size=(1600, 1200))
+    stream = CountingReader(data)
+    assert read_exif_date(stream) == '2021-07-04'
+    assert stream.bytes_read < 1024 < len(data)
+
+    # 没有EXIF时在图像数据开始处停止
+    data = _jpeg_bytes(None, size=(1600, 1200))
+    stream = CountingReader(data)
+    assert read_exif_date(stream) is None
+    assert stream.bytes_read < 1024
+
+
+def test_app1_segment_bytes():
+    """可直接读取内存中的APP1段数据"""
+    app1 = b'Exif\0\0' + piexif.dump(_exif(b'2018:05:06 07:08:09'))[6:]
+    assert read_exif_date(app1) == '2018-05-06'
+
+
+def test_unsupported_or_corrupt_data_raises():
+    """不支持的格式和损坏的EXIF抛出 ExifFormatError"""
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8)).save(buffer, 'PNG')
+    for data in (buffer.getvalue(), _jpeg_bytes(_exif(b'2021:07:04 10:00:00'))[:40]):
+        try:
+            read_exif_date(data)
+            assert False, "expected ExifFormatError"
+        except ExifFormatError:
+            pass
+
+
+def test_read_common_metadata():
+    """读取常用标签，有理数保存为 [分子, 分母]"""
+    exif = _exif(b'2021:07:04 10:00:00')
+    exif['Exif'][piexif.ExifIFD.ISOSpeedRatings] = 400
+    exif['Exif'][piexif.ExifIFD.FocalLength] = (35, 1)
+    exif['Exif'][piexif.ExifIFD.ExposureTime] = (1, 125)
+    metadata = read_exif_metadata(_jpeg_bytes(exif))
+    assert metadata == {
+        'date': '2021-07-04',
+        'datetime': '2021:07:04 10:00:00',
+        'model': 'TestCam',
+        'orientation': 6,
+        'iso': 400,
+        'focal_length': [35, 1],
+        'exposure_time': [1, 125],
+    }
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+EXIF水印旋转测试：只旋转水印块，不旋转整张图片
+"""
+
+import sys
+import os
+from PIL import Image, ImageChops
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+from components.exif_text_watermark import ExifTextWatermark
+from components.watermark_plan import render_text_tile, rotate_tile
+
+METADATA = {'date': '2021-07-04'}
+
+
+def test_rotated_watermark_keeps_photo():
+    """旋转后图片尺寸不变，水印块以外的像素不变"""
+    image = Image.effect_noise((800, 600), 50).convert('RGB')
+    watermark = ExifTextWatermark()
+    watermark.font_size = 48
+    watermark.position = "center"
+    watermark.angle = 30
+
+    result = watermark.apply_to_image(image, metadata=METADATA)
+    assert result.size == image.size
+
+    changed = ImageChops.difference(result.convert('RGB'), image).getbbox()
+    assert changed is not None
+    # 只有图片中心附近的水印区域发生变化
+    assert changed[0] > 100 and changed[2] < 700
+    assert changed[1] > 100 and changed[3] < 500
+
+
+def test_rotated_tile_matches_unrotated_center():
+    """旋转后的水印块中心与不旋转时的文本位置一致"""
+    image = Image.new('RGB', (640, 480), (40, 40, 40))
+    watermark = ExifTextWatermark()
+    watermark.shadow = False
+    watermark.position = "center"
+
+    flat = watermark.apply_to_image(image, metadata=METADATA)
+    watermark.angle = 90
+    rotated = watermark.apply_to_image(image, metadata=METADATA)
+
+    def center(result):
+        left, top, right, bottom = ImageChops.difference(result.convert('RGB'), image).getbbox()
+        return ((left + right) / 2, (top + bottom) / 2)
+
+    flat_center, rotated_center = center(flat), center(rotated)
+    assert abs(flat_center[0] - rotated_center[0]) <= 2
+    assert abs(flat_center[1] - rotated_center[1]) <= 2
+
+
+def test_rotate_tile_helper():
+    """水印块绕中心旋转，角度为0时原样返回"""
+    plan = ExifTextWatermark().compile()
+    tile, offset = render_text_tile("2021-07-04", plan.get_font(), (255, 255, 255, 255))
+    assert rotate_tile(tile, (10, 20), 0) == (tile, (10, 20))
+
+    rotated, position = rotate_tile(tile, (10, 20), 90)
+    assert rotated.size == (tile.height, tile.width)
+    assert position[0] + rotated.width // 2 == 10 + tile.width // 2
+    assert position[1] + rotated.height // 2 == 20 + tile.height // 2
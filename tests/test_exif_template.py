@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+EXIF文本模板测试
+"""
+
+import sys
+import os
+import io
+import pickle
+import tempfile
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+import piexif
+from components import exif_text_watermark
+from components.exif_reader import TAG_ISO, TAG_MODEL, DATE_TAGS
+from components.exif_template import compile_template
+from components.exif_text_watermark import ExifTextWatermark
+
+TEMPLATE = "{date:%Y.%m.%d} · {model} · ISO{iso} · {focal}mm"
+
+
+def _exif_bytes() -> bytes:
+    return piexif.dump({
+        '0th': {piexif.ImageIFD.Model: b'TestCam'},
+        'Exif': {
+            piexif.ExifIFD.DateTimeOriginal: b'2021:07:04 10:20:30',
+            piexif.ExifIFD.ISOSpeedRatings: 400,
+            piexif.ExifIFD.FocalLength: (35, 1),
+            piexif.ExifIFD.FNumber: (28, 10),
+            piexif.ExifIFD.ExposureTime: (1, 125),
+        },
+    })
+
+
+def _open_photo() -> Image.Image:
+    buffer = io.BytesIO()
+    Image.new('RGB', (320, 240), (60, 60, 60)).save(buffer, 'JPEG', exif=_exif_bytes())
+    buffer.seek(0)
+    image = Image.open(buffer)
+    image.load()
+    return image
+
+
+def test_compile_once_and_collect_tags():
+    """模板只解析一次，并记录引用到的标签"""
+    template = compile_template(TEMPLATE)
+    assert compile_template(TEMPLATE) is template
+    assert template.uses_date
+    assert TAG_MODEL in template.tags and TAG_ISO in template.tags
+    assert set(DATE_TAGS) <= template.tags
+    assert not compile_template("{model}").uses_date
+
+    for invalid in ("{shutter}", "{model!r}", "{date"):
+        try:
+            compile_template(invalid)
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+
+
+def test_render_fields():
+    """各字段的格式化，缺少的字段渲染为空"""
+    metadata = {
+        'date': '2021-07-04', 'datetime': '2021:07:04 10:20:30', 'model': 'TestCam', 'iso': 400,
+        'focal_length': [35, 1], 'f_number': [28, 10], 'exposure_time': [1, 125],
+    }
+    assert compile_template(TEMPLATE).render(metadata) == "2021.07.04 · TestCam · ISO400 · 35mm"
+    assert compile_template("f/{aperture} {exposure}s {date:%H:%M}").render(metadata) == "f/2.8 1/125s 10:20"
+    assert compile_template("{date} {focal:.1f} {{{lens}}}").render(metadata) == "2021-07-04 35.0 {}"
+
+
+def test_single_read_per_image():
+    """每张图片只读取一次EXIF，且只读取模板引用到的标签"""
+    watermark = ExifTextWatermark()
+    assert watermark.set_text_template(TEMPLATE)
+    assert not watermark.set_text_template("{unknown}")
+    assert watermark.text_template == TEMPLATE
+
+    reads = []
+    original = exif_text_watermark.read_exif_tags
+
+    def counting_read(source, tags):
+        reads.append(set(tags))
+        return original(source, tags)
+
+    exif_text_watermark.read_exif_tags = counting_read
+    try:
+        text = watermark.generate_watermark_text(image=_open_photo())
+    finally:
+        exif_text_watermark.read_exif_tags = original
+
+    assert text == "2021.07.04 · TestCam · ISO400 · 35mm"
+    assert reads == [set(compile_template(TEMPLATE).tags)]
+
+
+def test_template_plan_with_path_and_pickle():
+    """按路径读取（使用缓存），编译后的计划可以序列化；没有日期时使用文件时间"""
+    watermark = ExifTextWatermark()
+    watermark.set_text_template("{date:%Y} {model}")
+    plan = pickle.loads(pickle.dumps(watermark.compile()))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'photo.jpg')
+        _open_photo().save(path, 'JPEG', exif=_exif_bytes())
+        assert plan.text_source(path) == "2021 TestCam"
+
+        plain = os.path.join(temp_dir, 'plain.jpg')
+        Image.new('RGB', (32, 24)).save(plain, 'JPEG')
+        os.utime(plain, (1262347200, 1262347200))  # 2010-01-01 12:00 UTC
+        assert plan.text_source(plain) == "2010"
+
+        watermark.fallback_to_file_time = False
+        assert watermark.generate_watermark_text(plain) == ""
+
+    info = watermark.get_watermark_info()
+    restored = ExifTextWatermark()
+    restored.load_from_dict(info)
+    assert restored.text_template == "{date:%Y} {model}"
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+EXIF内嵌缩略图测试
+"""
+
+import sys
+import os
+import io
+import tempfile
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+import piexif
+from components.exif_reader import read_exif_thumbnail
+from components.file_manager import ImageFileManager
+
+BLUE = (0, 0, 255)
+RED = (255, 0, 0)
+
+
+def _jpeg(size, color=RED) -> bytes:
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def _save_photo(path, size=(1600, 1200), thumbnail=None, orientation=None):
+    """保存蓝色照片，内嵌缩略图为红色，以区分缩略图的来源"""
+    exif = {'0th': {}, 'Exif': {piexif.ExifIFD.DateTimeOriginal: b'2021:07:04 10:00:00'}}
+    if orientation:
+        exif['0th'][piexif.ImageIFD.Orientation] = orientation
+    if thumbnail is not None:
+        exif['1st'] = {piexif.ImageIFD.Compression: 6}
+        exif['thumbnail'] = thumbnail
+    Image.new('RGB', size, BLUE).save(path, 'JPEG', exif=piexif.dump(exif))
+
+
+def _is_color(image, color) -> bool:
+    pixel = image.convert('RGB').getpixel((image.width // 2, image.height // 2))
+    return all(abs(a - b) < 40 for a, b in zip(pixel, color))
+
+
+def test_read_embedded_thumbnail():
+    """读取IFD1中的缩略图数据和方向"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'photo.jpg')
+        _save_photo(path, thumbnail=_jpeg((160, 120)), orientation=6)
+        data, orientation = read_exif_thumbnail(path)
+        assert Image.open(io.BytesIO(data)).size == (160, 120)
+        assert orientation == 6
+
+        _save_photo(path)
+        assert read_exif_thumbnail(path) == (None, 1)
+
+
+def test_thumbnail_uses_embedded_preview():
+    """有足够大的内嵌缩略图时直接使用，并按方向转正"""
+    file_manager = ImageFileManager()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'photo.jpg')
+        _save_photo(path, thumbnail=_jpeg((160, 120)))
+        thumbnail = file_manager.create_thumbnail(path)
+        assert thumbnail.size == (150, 113)
+        assert _is_color(thumbnail, RED)
+
+        _save_photo(path, thumbnail=_jpeg((160, 120)), orientation=6)
+        thumbnail = file_manager.create_thumbnail(path)
+        assert thumbnail.size == (113, 150)
+        assert _is_color(thumbnail, RED)
+
+
+def test_letterboxed_preview_is_cropped():
+    """比例不同的内嵌缩略图裁掉黑边后使用"""
+    letterboxed = Image.new('RGB', (160, 120), (0, 0, 0))
+    letterboxed.paste(Image.new('RGB', (160, 108), RED), (0, 6))
+    buffer = io.BytesIO()
+    letterboxed.save(buffer, 'JPEG', quality=95)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'photo.jpg')
+        _save_photo(path, size=(1500, 1000), thumbnail=buffer.getvalue())
+        thumbnail = ImageFileManager().create_thumbnail(path)
+
+    assert thumbnail.size == (150, 100)
+    # 黑边已被裁掉，首尾两行不是黑色
+    for y in (0, thumbnail.height - 1):
+        assert thumbnail.getpixel((thumbnail.width // 2, y))[0] > 160
+
+
+def test_small_or_missing_preview_decodes_full_image():
+    """内嵌缩略图不足目标尺寸或不存在时解码原图"""
+    file_manager = ImageFileManager()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'photo.jpg')
+        _save_photo(path, thumbnail=_jpeg((80, 60)))
+        thumbnail = file_manager.create_thumbnail(path)
+        assert thumbnail.size == (150, 113)
+        assert _is_color(thumbnail, BLUE)
+
+        _save_photo(path, orientation=8)
+        thumbnail = file_manager.create_thumbnail(path)
+        assert thumbnail.size == (113, 150)
+        assert _is_color(thumbnail, BLUE)
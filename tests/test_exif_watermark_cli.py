@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+EXIF水印命令行脚本测试：并行、递归、增量模式和JSON行进度
+"""
+
+import sys
+import os
+import io
+import json
+import tempfile
+import contextlib
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+import piexif
+from components import exif_watermark
+from components.exif_cache import ExifMetadataCache
+
+
+def _save_photo(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    exif = {'0th': {}, 'Exif': {piexif.ExifIFD.DateTimeOriginal: b'2021:07:04 10:00:00'}}
+    Image.new('RGB', (200, 150), (80, 80, 80)).save(path, 'JPEG', exif=piexif.dump(exif))
+
+
+def _run(*argv):
+    """运行命令行脚本，返回解析后的JSON行"""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        exif_watermark.main(list(argv))
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def _statuses(records):
+    return sorted((os.path.basename(r['source']), r['status']) for r in records if r['event'] == 'file')
+
+
+def test_recursive_parallel_run():
+    """递归处理子目录并保持目录结构，进度以JSON行输出"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _save_photo(os.path.join(temp_dir, 'a.jpg'))
+        _save_photo(os.path.join(temp_dir, 'trip', 'b.jpg'))
+        _save_photo(os.path.join(temp_dir, 'trip', 'day2', 'c.jpg'))
+
+        flat = _run(temp_dir)
+        assert _statuses(flat) == [('a.jpg', 'done')]
+
+        records = _run(temp_dir, '--recursive', '--jobs', '2')
+        assert _statuses(records) == [('a.jpg', 'done'), ('b.jpg', 'done'), ('c.jpg', 'done')]
+        assert records[-1]['event'] == 'summary'
+        assert records[-1]['done'] == 3 and records[-1]['total'] == 3
+        out_dir = os.path.join(temp_dir, '_watermark')
+        assert os.path.isfile(os.path.join(out_dir, 'trip', 'day2', 'c.jpg'))
+
+        # 输出目录不会被当作输入
+        records = _run(temp_dir, '--recursive')
+        assert records[-1]['total'] == 3
+
+
+def test_incremental_skips_up_to_date_outputs():
+    """增量模式跳过输出较新且设置相同的文件"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name in ('a.jpg', 'b.jpg'):
+            _save_photo(os.path.join(temp_dir, name))
+        _run(temp_dir)
+
+        records = _run(temp_dir, '--incremental')
+        assert _statuses(records) == [('a.jpg', 'skipped'), ('b.jpg', 'skipped')]
+        assert all(r['reason'] == 'up-to-date' for r in records if r['event'] == 'file')
+
+        # 设置变化时全部重新生成
+        records = _run(temp_dir, '--incremental', '--color', 'red')
+        assert _statuses(records) == [('a.jpg', 'done'), ('b.jpg', 'done')]
+
+        # 源文件比输出新时重新生成
+        source = os.path.join(temp_dir, 'b.jpg')
+        output = os.path.join(temp_dir, '_watermark', 'b.jpg')
+        os.utime(source, (os.path.getmtime(output) + 10,) * 2)
+        records = _run(temp_dir, '--incremental', '--color', 'red')
+        assert _statuses(records) == [('a.jpg', 'skipped'), ('b.jpg', 'done')]
+
+
+def test_errors_are_json_records():
+    """路径不存在或没有图片时输出JSON错误记录，不创建输出目录"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for path in (os.path.join(temp_dir, 'missing'), temp_dir):
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                try:
+                    exif_watermark.main([path])
+                except SystemExit as e:
+                    assert e.code == 1
+                else:
+                    assert False, "应以错误退出"
+            record = json.loads(output.getvalue())
+            assert record['event'] == 'error' and record['error']
+        assert os.listdir(temp_dir) == []
+
+
+def test_task_error_becomes_failed_record():
+    """子进程中任务抛出异常时记为失败，其余任务照常完成"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        good = os.path.join(temp_dir, 'a.jpg')
+        _save_photo(good)
+        out_dir = os.path.join(temp_dir, 'out')
+        tasks = [(good, out_dir, 24, (255, 255, 255), 'center', 'none', None),
+                 (os.path.join(temp_dir, 'b.jpg'), out_dir, 24, (255, 255, 255), 'center', 'none', None, 'extra')]
+        for jobs in (1, 2):
+            results = sorted(exif_watermark.run_tasks(tasks, jobs), key=lambda r: r['source'])
+            assert [r['status'] for r in results] == ['done', 'failed']
+            assert results[1]['output'] == os.path.join(out_dir, 'b.jpg') and results[1]['error']
+
+
+def test_exif_cache_is_opt_in():
+    """未指定 --exif-cache 时不创建缓存数据库；指定时由主进程写入，再次运行命中缓存"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        photos = os.path.join(temp_dir, 'photos')
+        for name in ('a.jpg', 'b.jpg', 'c.jpg'):
+            _save_photo(os.path.join(photos, name))
+        work_dir = os.path.join(temp_dir, 'work')
+        os.makedirs(work_dir)
+        cwd = os.getcwd()
+        os.chdir(work_dir)
+        try:
+            _run(photos, '--jobs', '2')
+            assert os.listdir(work_dir) == []
+
+            db_path = os.path.join(temp_dir, 'exif.db')
+            records = _run(photos, '--jobs', '2', '--exif-cache', db_path)
+            assert _statuses(records) == [('a.jpg', 'done'), ('b.jpg', 'done'), ('c.jpg', 'done')]
+            assert all('exif_entry' not in r for r in records)
+            assert os.listdir(work_dir) == []
+        finally:
+            os.chdir(cwd)
+
+        loaded = []
+        cache = ExifMetadataCache(lambda path: loaded.append(path) or {'date': None}, db_path)
+        for name in ('a.jpg', 'b.jpg', 'c.jpg'):
+            assert cache.get_metadata(os.path.join(photos, name))['date'] == '2021-07-04'
+        assert loaded == []
+        cache.close()
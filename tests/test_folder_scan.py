@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+文件夹扫描测试：按扩展名和文件头过滤，遍历子文件夹
+"""
+
+import sys
+import os
+import tempfile
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+from components.file_manager import ImageFileManager, sniff_image_format
+
+
+def _save(path, image_format):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.new('RGB', (16, 12), (200, 30, 30)).save(path, image_format)
+
+
+def test_sniff_image_format():
+    """只读取文件头判断格式"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name, image_format in (('a.jpg', 'JPEG'), ('b.png', 'PNG'), ('c.bmp', 'BMP'), ('d.tif', 'TIFF')):
+            path = os.path.join(temp_dir, name)
+            _save(path, image_format)
+            assert sniff_image_format(path) == image_format
+
+        text_path = os.path.join(temp_dir, 'fake.jpg')
+        with open(text_path, 'w') as f:
+            f.write("not an image")
+        assert sniff_image_format(text_path) is None
+        assert sniff_image_format(os.path.join(temp_dir, 'missing.jpg')) is None
+
+
+def test_scan_folder_filters_and_recurses():
+    """跳过不支持的扩展名、伪装的图片和过大的文件，按名称顺序遍历子文件夹"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _save(os.path.join(temp_dir, 'b.png'), 'PNG')
+        _save(os.path.join(temp_dir, 'a.jpg'), 'JPEG')
+        _save(os.path.join(temp_dir, 'trip', 'day1', 'c.tiff'), 'TIFF')
+        _save(os.path.join(temp_dir, 'trip', 'd.bmp'), 'BMP')
+        _save(os.path.join(temp_dir, 'other', 'e.gif'), 'GIF')
+        with open(os.path.join(temp_dir, 'other', 'notes.jpg'), 'w') as f:
+            f.write("not an image")
+
+        file_manager = ImageFileManager()
+        found = [os.path.relpath(p, temp_dir) for p in file_manager.scan_folder(temp_dir)]
+        assert found == ['a.jpg', 'b.png', os.path.join('trip', 'd.bmp'),
+                         os.path.join('trip', 'day1', 'c.tiff')]
+
+        file_manager.max_file_size = 10
+        assert list(file_manager.scan_folder(temp_dir)) == []
+
+
+def test_scan_missing_folder():
+    """文件夹不存在时不返回任何文件"""
+    assert list(ImageFileManager().scan_folder('/nonexistent/folder')) == []
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+文件夹监视测试：文件写入完成后才导出，导出日志使重新启动后不再处理已完成的文件
+"""
+
+import sys
+import os
+import json
+import time
+import tempfile
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+from components.file_manager import ExportManager
+from components.folder_watch import JOURNAL_NAME, FolderWatcher, HotFolderWatch, WatchJournal
+from components.text_watermark import TextWatermark
+
+
+def _save(path, color=(10, 120, 200)):
+    Image.new('RGB', (80, 60), color).save(path)
+    return path
+
+
+def _wait_ready(watcher, timeout=5.0):
+    """轮询直到有文件写入完成"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        ready = watcher.poll(0.02)
+        if ready:
+            return ready
+    return []
+
+
+def _make_watch(watch_folder, output_folder, results, use_inotify=False):
+    export_manager = ExportManager()
+    export_manager.output_folder = output_folder
+    export_manager.update_export_settings({'format': 'png', 'filename_prefix': 'wm_'})
+    plan = TextWatermark().compile()
+    return HotFolderWatch(watch_folder, plan, export_manager, results.append,
+                          settle_time=0.1, poll_interval=0.02, use_inotify=use_inotify)
+
+
+def test_partial_file_waits_until_settled():
+    """文件仍在写入时不返回，大小和修改时间保持不变后只返回一次，再次变化后重新返回"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watcher = FolderWatcher(temp_dir, settle_time=0.3, poll_interval=0.02, use_inotify=False)
+        path = os.path.join(temp_dir, 'a.jpg')
+        with open(path, 'wb') as f:
+            f.write(b'\xff\xd8\xff' + b'\0' * 100)
+            f.flush()
+            assert watcher.poll(0) == []
+            f.write(b'\0' * 100)
+        assert watcher.poll(0) == []
+
+        ready = _wait_ready(watcher)
+        assert [item[0] for item in ready] == [path]
+        assert watcher.poll(0.05) == [] and watcher.idle
+
+        with open(path, 'ab') as f:
+            f.write(b'\0' * 100)
+        ready = _wait_ready(watcher)
+        assert ready[0][1][0] == 303
+        watcher.close()
+
+
+def _check_new_subfolder(use_inotify):
+    """新建子文件夹中的图片能被发现；隐藏文件和其他格式被忽略"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watcher = FolderWatcher(temp_dir, settle_time=0.05, poll_interval=0.02, use_inotify=use_inotify)
+        watcher.start()
+        assert watcher.backend_name == ('inotify' if use_inotify else 'polling')
+        assert watcher.poll(0) == []
+
+        card = os.path.join(temp_dir, 'DCIM', '100CANON')
+        os.makedirs(card)
+        path = _save(os.path.join(card, 'IMG_0001.jpg'))
+        _save(os.path.join(card, '.IMG_0002.jpg'))
+        with open(os.path.join(card, 'notes.txt'), 'w') as f:
+            f.write('x')
+
+        ready = _wait_ready(watcher)
+        assert [item[0] for item in ready] == [path]
+        assert watcher.backend_name == ('inotify' if use_inotify else 'polling')
+        watcher.close()
+
+
+def test_inotify_sees_new_subfolder():
+    """Linux上使用inotify，新建的子文件夹会被加入监视"""
+    if not sys.platform.startswith('linux'):
+        return
+    _check_new_subfolder(use_inotify=True)
+
+
+def test_polling_sees_new_subfolder():
+    _check_new_subfolder(use_inotify=False)
+
+
+def test_journal_skips_finished_files_after_restart():
+    """重新启动后已导出且未变化的文件不再处理，变化的文件覆盖上次的输出"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watch_folder = os.path.join(temp_dir, 'incoming')
+        output_folder = os.path.join(watch_folder, 'out')
+        os.makedirs(watch_folder)
+        first = _save(os.path.join(watch_folder, 'a.png'))
+        _save(os.path.join(watch_folder, 'b.png'))
+
+        results = []
+        _make_watch(watch_folder, output_folder, results).run(once=True)
+        assert [result['status'] for result in results] == ['done', 'done']
+        assert sorted(os.listdir(output_folder)) == [JOURNAL_NAME, 'wm_a.png', 'wm_b.png']
+
+        # 输出文件夹位于监视文件夹内，不会被当作新图片
+        results = []
+        watch = _make_watch(watch_folder, output_folder, results)
+        watch.run(once=True)
+        assert [result['status'] for result in results] == ['skipped', 'skipped']
+
+        _save(first, color=(200, 10, 10))
+        stat = os.stat(first)
+        os.utime(first, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        results = []
+        _make_watch(watch_folder, output_folder, results).run(once=True)
+        assert [(os.path.basename(r['source']), r['status']) for r in results] == [
+            ('a.png', 'done'), ('b.png', 'skipped')]
+        assert sorted(os.listdir(output_folder)) == [JOURNAL_NAME, 'wm_a.png', 'wm_b.png']
+        with Image.open(os.path.join(output_folder, 'wm_a.png')) as img:
+            assert img.getpixel((0, 0))[:3] == (200, 10, 10)
+
+
+def test_output_folder_must_differ_from_watch_folder():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        try:
+            _make_watch(temp_dir, temp_dir, [])
+        except ValueError:
+            pass
+        else:
+            assert False, "输出到监视文件夹本身应被拒绝"
+
+
+def test_missing_plan_is_rejected():
+    """没有可用的渲染计划（如图片水印未选择水印图片）时不开始监视，避免导出没有水印的副本"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        export_manager = ExportManager()
+        export_manager.output_folder = os.path.join(temp_dir, 'out')
+        try:
+            HotFolderWatch(temp_dir, None, export_manager)
+        except ValueError:
+            pass
+        else:
+            assert False, "没有渲染计划时应被拒绝"
+
+
+def test_journal_rewrites_stale_and_truncated_lines():
+    """同一文件只保留最后一条记录，中断时写了一半的行被丢弃"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, JOURNAL_NAME)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'source': 'a.jpg', 'size': 1, 'mtime_ns': 1, 'output': 'x'}) + '\n')
+            f.write(json.dumps({'source': 'a.jpg', 'size': 2, 'mtime_ns': 2, 'output': 'x'}) + '\n')
+            f.write('{"source": "b.jpg", "si')
+
+        journal = WatchJournal(path)
+        journal.open()
+        assert journal.is_done('a.jpg', (2, 2)) and not journal.is_done('a.jpg', (1, 1))
+        journal.record('c.jpg', (3, 3), 'y')
+        journal.close()
+
+        with open(path, 'r', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        assert [(record['source'], record['size']) for record in records] == [('a.jpg', 2), ('c.jpg', 3)]
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+字体字符覆盖索引测试
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+from components import font_coverage
+from components.font_coverage import FontCoverageIndex, read_cmap_ranges
+from components.font_registry import FontRegistry, font_registry
+
+DEJAVU_DIR = "/usr/share/fonts/truetype/dejavu"
+
+
+def _find_font(name: str) -> str:
+    """查找系统中已安装的指定字体"""
+    path = font_registry.resolve(name)
+    return path if path and os.path.basename(path) == name else None
+
+
+def test_read_cmap_ranges():
+    """读取cmap表得到排序且不重叠的字符范围"""
+    path = _find_font("DejaVuSans.ttf")
+    if not path:
+        return
+    
+    ranges = read_cmap_ranges(path)
+    assert ranges, "字符范围不应为空"
+    assert all(start <= end for start, end in ranges)
+    assert all(ranges[i][1] + 1 < ranges[i + 1][0] for i in range(len(ranges) - 1))
+    
+    covered = lambda ch: any(start <= ord(ch) <= end for start, end in ranges)
+    assert covered("A") and covered("é") and covered("€")
+    assert not covered("水")
+
+
+def test_best_font_and_persistent_cache():
+    """选择覆盖文本的字体，覆盖索引持久化后不再重复解析"""
+    sans = _find_font("DejaVuSans.ttf")
+    mono = _find_font("DejaVuSansMono.ttf")
+    if not sans or not mono:
+        return
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        font_dir = os.path.join(temp_dir, "fonts")
+        os.makedirs(font_dir)
+        shutil.copy(sans, font_dir)
+        shutil.copy(mono, font_dir)
+        cache_file = os.path.join(temp_dir, "cache", "font_coverage.json")
+        
+        registry = FontRegistry([font_dir])
+        index = FontCoverageIndex(registry, cache_file)
+        sans_copy = registry.resolve("DejaVuSans.ttf")
+        mono_copy = registry.resolve("DejaVuSansMono.ttf")
+        
+        # Ǆ 只有 DejaVuSans 覆盖
+        assert index.covers(sans_copy, "Ǆ 2024")
+        assert not index.covers(mono_copy, "Ǆ 2024")
+        assert index.find_best_font("Ǆ 2024") == sans_copy
+        assert index.find_best_font("水") is None
+        assert os.path.exists(cache_file), "覆盖索引应写入缓存文件"
+        
+        # 新的索引实例从缓存文件加载，不再解析字体文件
+        parse_calls = []
+        original = font_coverage.read_cmap_ranges
+        font_coverage.read_cmap_ranges = lambda *args: parse_calls.append(args) or original(*args)
+        try:
+            reloaded = FontCoverageIndex(FontRegistry([font_dir]), cache_file)
+            assert reloaded.find_best_font("Ǆ 2024") == sans_copy
+        finally:
+            font_coverage.read_cmap_ranges = original
+        assert parse_calls == []
+
+
+def test_default_font_covers_ascii_only():
+    """默认字体只视为覆盖ASCII字符"""
+    index = FontCoverageIndex(FontRegistry([]), os.devnull)
+    assert index.covers(None, "Watermark 2024")
+    assert not index.covers(None, "水印")
+
+
+if __name__ == "__main__":
+    test_read_cmap_ranges()
+    test_best_font_and_persistent_cache()
+    test_default_font_covers_ascii_only()
+    print("[OK] Font coverage tests passed")
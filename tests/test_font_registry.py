@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+字体注册表测试
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import threading
+from PIL import ImageFont
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+from components.font_registry import FontRegistry, font_registry
+from components.text_watermark import TextWatermark
+from components.exif_text_watermark import ExifTextWatermark
+
+
+def _find_test_font() -> str:
+    """查找一个可用的TrueType字体文件"""
+    for path in font_registry.get_font_paths():
+        if path.lower().endswith('.ttf'):
+            return path
+    return None
+
+
+class CountingRegistry(FontRegistry):
+    """记录字体目录扫描次数的注册表"""
+    
+    def __init__(self, font_dirs):
+        super().__init__(font_dirs)
+        self.scan_count = 0
+    
+    def _scan(self):
+        self.scan_count += 1
+        return super()._scan()
+
+
+def test_resolve_by_name_variants():
+    """按文件名、主文件名和规范化名称解析字体"""
+    source = _find_test_font()
+    if not source:
+        return
+    
+    with tempfile.TemporaryDirectory() as font_dir:
+        target = os.path.join(font_dir, "Test Sans-Bold.ttf")
+        shutil.copy(source, target)
+        registry = CountingRegistry([font_dir])
+        
+        assert registry.resolve("Test Sans-Bold.ttf") == target
+        assert registry.resolve("test sans-bold") == target
+        assert registry.resolve("TestSansBold") == target
+        assert registry.resolve(target) == os.path.abspath(target)
+        assert registry.resolve("Missing Font.ttf") is None
+        assert registry.resolve("Missing Font.ttf") is None
+        assert registry.scan_count == 1, "字体目录只应扫描一次"
+
+
+def test_fonts_cached_by_path_size_index():
+    """相同 (路径, 字号, 索引) 返回同一字体对象"""
+    source = _find_test_font()
+    if not source:
+        return
+    
+    registry = FontRegistry([os.path.dirname(source)])
+    family = os.path.basename(source)
+    
+    font_a = registry.get_font(family, 24)
+    font_b = registry.get_font(family, 24)
+    font_c = registry.get_font(family, 32)
+    
+    assert isinstance(font_a, ImageFont.FreeTypeFont)
+    assert font_a is font_b
+    assert font_a is not font_c
+    assert font_c.size == 32
+
+
+def test_unknown_family_falls_back_to_default():
+    """找不到任何字体时使用默认字体"""
+    with tempfile.TemporaryDirectory() as font_dir:
+        registry = CountingRegistry([font_dir])
+        font = registry.get_font("No Such Font", 20)
+        assert font is not None
+        assert registry.get_font("No Such Font", 20) is font
+        assert registry.scan_count == 1
+
+
+def test_concurrent_lookup():
+    """多线程并发获取字体时只加载一次"""
+    source = _find_test_font()
+    if not source:
+        return
+    
+    registry = FontRegistry([os.path.dirname(source)])
+    family = os.path.basename(source)
+    results = []
+    
+    def worker():
+        results.append(registry.get_font(family, 18))
+    
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(results) == 8
+    assert all(font is results[0] for font in results)
+
+
+def test_watermarks_share_registry_fonts():
+    """不同水印实例共享注册表中的字体对象"""
+    text_watermark = TextWatermark()
+    exif_watermark = ExifTextWatermark()
+    text_watermark.set_font_family("DejaVuSans.ttf")
+    exif_watermark.set_font_family("DejaVuSans.ttf")
+    
+    assert text_watermark._get_font(30) is exif_watermark._get_font(30)
+    assert TextWatermark()._get_font(30) is TextWatermark()._get_font(30)
+
+
+
+def test_watermarks_follow_registry_clear():
+    """字体注册表清空后，水印实例重新从注册表获取字体"""
+    for watermark in (TextWatermark(), ExifTextWatermark()):
+        watermark.set_font_family("DejaVuSans.ttf")
+        font = watermark._get_font(31)
+        assert watermark._get_font(31) is font
+        font_registry.clear()
+        assert watermark._get_font(31) is not font
+        assert watermark._get_font(31) is font_registry.get_font("DejaVuSans.ttf", 31)
+
+
+if __name__ == "__main__":
+    test_resolve_by_name_variants()
+    test_fonts_cached_by_path_size_index()
+    test_unknown_family_falls_back_to_default()
+    test_concurrent_lookup()
+    test_watermarks_share_registry_fonts()
+    test_watermarks_follow_registry_clear()
+    print("[OK] Font registry tests passed")
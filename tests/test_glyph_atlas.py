@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+字形图集测试：由缓存字形拼接的EXIF日期标签与直接绘制逐像素一致
+"""
+
+import sys
+import os
+from PIL import Image, ImageFont
+
+# 添加src目录和测试目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+sys.path.insert(0, current_dir)
+
+from benchmark_glyph_atlas import DATES, make_watermark, outputs_match, render_direct
+from components.glyph_atlas import get_glyph_atlas
+from components.text_effects import MAX_STROKE_WIDTH
+
+
+def test_labels_match_direct_rendering():
+    """各字号、阴影、描边和位置下与直接绘制一致，包括前缀和被图片边界裁剪的标签"""
+    assert outputs_match(Image.effect_noise((320, 200), 60).convert('RGB'), dates=DATES[::40])
+    assert outputs_match(Image.effect_noise((60, 30), 60).convert('RGBA'),
+                         dates=['2021-07-04', '1999-12-31'], prefix="拍摄于 ")
+
+
+def test_glyphs_and_labels_are_cached():
+    """同一字体共用一个图集，字形只光栅化一次"""
+    plan = make_watermark().compile()
+    atlas = get_glyph_atlas(plan.get_font())
+    assert atlas is get_glyph_atlas(plan.get_font())
+
+    label = atlas.get_label("2021-07-04")
+    assert label is not None
+    assert atlas.get_label("2021-07-04") is label
+    glyph = atlas.get_glyph("0")
+    atlas.get_label("2010-01-02")
+    assert atlas.get_glyph("0") is glyph
+    assert atlas.get_label("2021\n07") is None
+
+
+def test_outline_uses_atlas():
+    """描边宽度在范围内时描边层也由图集拼接，结果与直接绘制一致"""
+    watermark = make_watermark(font_size=30, outline_width=2)
+    plan = watermark.compile()
+    labels = plan.get_labels("2021-07-04", plan.get_font())
+    assert labels is not None and labels[1] is not None
+
+    image = Image.new('RGB', (200, 80), (90, 90, 90))
+    expected = render_direct(plan, image, "2021-07-04")
+    assert plan.render(image, metadata={'date': '2021-07-04'}).tobytes() == expected.tobytes()
+
+
+def test_wide_outline_falls_back_to_direct_rendering():
+    """描边改用膨胀遮罩绘制时不使用图集，结果仍与直接绘制一致"""
+    watermark = make_watermark(font_size=30, outline_width=MAX_STROKE_WIDTH + 2)
+    plan = watermark.compile()
+    assert plan.get_labels("2021-07-04", plan.get_font()) is None
+
+    image = Image.new('RGB', (200, 80), (90, 90, 90))
+    expected = render_direct(plan, image, "2021-07-04")
+    assert plan.render(image, metadata={'date': '2021-07-04'}).tobytes() == expected.tobytes()
+
+
+def test_unsupported_fonts_have_no_atlas():
+    """非FreeType字体不建立图集"""
+    if hasattr(ImageFont, 'load_default_imagefont'):
+        bitmap_font = ImageFont.load_default_imagefont()
+    else:
+        bitmap_font = ImageFont.load_default()
+    assert get_glyph_atlas(bitmap_font) is None
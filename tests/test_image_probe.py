@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+图片信息探测测试：只读文件头得到的尺寸、模式和格式与PIL一致
+"""
+
+import sys
+import os
+import tempfile
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+import piexif
+from components import image_probe
+from components.file_manager import ImageFileManager
+from components.image_probe import probe_image, probe_images
+
+# 由文件头直接读取的格式和模式
+HEADER_CASES = [
+    ('rgb.jpg', 'JPEG', 'RGB', {}),
+    ('gray.jpg', 'JPEG', 'L', {}),
+    ('cmyk.jpg', 'JPEG', 'CMYK', {}),
+    ('progressive.jpg', 'JPEG', 'RGB', {'progressive': True}),
+    ('exif.jpg', 'JPEG', 'RGB', {'exif': piexif.dump({'0th': {piexif.ImageIFD.Model: b'TestCam'}})}),
+    ('bilevel.png', 'PNG', '1', {}),
+    ('gray.png', 'PNG', 'L', {}),
+    ('palette.png', 'PNG', 'P', {}),
+    ('rgb.png', 'PNG', 'RGB', {}),
+    ('rgba.png', 'PNG', 'RGBA', {}),
+    ('la.png', 'PNG', 'LA', {}),
+    ('rgb.bmp', 'BMP', 'RGB', {}),
+    ('rgb.tif', 'TIFF', 'RGB', {}),
+    ('gray.tif', 'TIFF', 'L', {}),
+    ('rgba.tif', 'TIFF', 'RGBA', {}),
+    ('deflate.tif', 'TIFF', 'RGB', {'compression': 'tiff_adobe_deflate'}),
+]
+
+# 交给PIL识别的格式和模式
+FALLBACK_CASES = [
+    ('gray16.png', 'PNG', 'I;16', {}),
+    ('palette.bmp', 'BMP', 'P', {}),
+    ('gray.bmp', 'BMP', 'L', {}),
+    ('cmyk.tif', 'TIFF', 'CMYK', {}),
+    ('bilevel.tif', 'TIFF', '1', {}),
+]
+
+
+def _save(temp_dir, name, image_format, mode, options):
+    path = os.path.join(temp_dir, name)
+    image = Image.new('RGB', (37, 23), (200, 100, 50)).convert(mode)
+    image.save(path, image_format, **options)
+    return path
+
+
+def test_header_probe_matches_pil():
+    """常见格式只读取文件头，结果与PIL一致"""
+    original = image_probe._probe_with_pil
+
+    def unexpected(path):
+        raise AssertionError(f"fell back to PIL for {path}")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = [_save(temp_dir, *case) for case in HEADER_CASES]
+        expected = [original(path) for path in paths]
+        image_probe._probe_with_pil = unexpected
+        try:
+            for path, info in zip(paths, expected):
+                assert probe_image(path) == info
+        finally:
+            image_probe._probe_with_pil = original
+
+
+def test_exotic_files_fall_back_to_pil():
+    """无法确定与PIL一致的模式时交给PIL，结果相同"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for case in FALLBACK_CASES:
+            path = _save(temp_dir, *case)
+            assert probe_image(path) == image_probe._probe_with_pil(path)
+
+
+def test_batch_probe_and_invalid_files():
+    """批量读取保持输入顺序，无法识别的文件为None"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = [_save(temp_dir, *case) for case in HEADER_CASES[:6]]
+        truncated = os.path.join(temp_dir, 'truncated.jpg')
+        with open(paths[0], 'rb') as f:
+            data = f.read(20)
+        with open(truncated, 'wb') as f:
+            f.write(data)
+        paths.insert(2, truncated)
+        paths.append(os.path.join(temp_dir, 'missing.png'))
+
+        results = probe_images(paths, max_workers=3)
+        assert results[2] is None and results[-1] is None
+        for path, info in zip(paths, results):
+            if info is not None:
+                assert info['path'] == path
+
+        assert ImageFileManager().get_image_info(truncated) is None
+        assert ImageFileManager().get_image_info(paths[0])['size'] == (37, 23)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+图片水印缩放缓存测试
+"""
+
+import sys
+import os
+import pickle
+import tempfile
+from PIL import Image, ImageChops
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+from components.image_watermark import ImageWatermark
+from components.watermark_plan import make_alpha_lut
+
+
+def _make_image_watermark() -> ImageWatermark:
+    """创建加载了半透明渐变水印图片的图片水印"""
+    logo = Image.linear_gradient('L').resize((160, 80)).convert('RGBA')
+    logo.putalpha(Image.linear_gradient('L').resize((160, 80)))
+    watermark = ImageWatermark()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        logo_path = os.path.join(temp_dir, 'logo.png')
+        logo.save(logo_path)
+        assert watermark.load_watermark_image(logo_path)
+    watermark.set_transparency(60)
+    return watermark
+
+
+def test_alpha_lut_matches_per_pixel_formula():
+    """查找表与逐像素公式结果一致"""
+    for alpha in (0, 1, 127, 153, 254, 255):
+        assert make_alpha_lut(alpha) == [int(x * alpha / 255) for x in range(256)]
+
+
+def test_scaled_logo_reused_for_same_size():
+    """相同尺寸的图片复用缩放后的水印，结果与不使用缓存一致"""
+    watermark = _make_image_watermark()
+    image = Image.new('RGB', (1200, 800), (255, 255, 255))
+
+    first = watermark.apply_to_image(image)
+    second = watermark.apply_to_image(image)
+    stats = watermark.scaled_cache.get_stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+
+    watermark.scaled_cache = None
+    uncached = watermark.apply_to_image(image)
+    assert ImageChops.difference(first, uncached).getbbox() is None
+    assert ImageChops.difference(second, uncached).getbbox() is None
+
+
+def test_settings_change_invalidates_cache():
+    """修改缩放或透明度设置会清空缓存并生成新的缩放结果"""
+    watermark = _make_image_watermark()
+    image = Image.new('RGB', (1200, 800), (255, 255, 255))
+    faded = watermark.apply_to_image(image)
+    assert len(watermark.scaled_cache) == 1
+
+    watermark.set_transparency(100)
+    assert len(watermark.scaled_cache) == 0
+    opaque = watermark.apply_to_image(image)
+    assert ImageChops.difference(faded, opaque).getbbox() is not None
+
+    watermark.set_scale_factor(0.5)
+    assert len(watermark.scaled_cache) == 0
+
+
+def test_pickled_plan_carries_empty_cache():
+    """序列化后的计划带有空的缩放缓存，仍可正常渲染"""
+    watermark = _make_image_watermark()
+    image = Image.new('RGB', (600, 400), (0, 0, 0))
+    expected = watermark.apply_to_image(image)
+
+    plan = pickle.loads(pickle.dumps(watermark.compile()))
+    assert len(plan.scaled_cache) == 0
+    assert ImageChops.difference(plan.render(image), expected).getbbox() is None
+    assert len(plan.scaled_cache) == 1
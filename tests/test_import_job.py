@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+后台导入任务测试：分批添加、实时计数和取消
+"""
+
+import sys
+import os
+import time
+import tempfile
+import threading
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+from components import exif_text_watermark
+from components.exif_cache import ExifMetadataCache
+from components.exif_text_watermark import load_exif_metadata
+from components.file_manager import ImageFileManager
+from components.image_list import ImageListManager
+from components.library_index import LibraryIndex
+from components.import_job import ImportJob
+
+
+class ManualLoop:
+    """代替Tk事件循环：记录 after 调度的回调，由测试逐个执行"""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, delay, callback):
+        self.pending.append(callback)
+
+    def run(self, timeout=10):
+        deadline = time.time() + timeout
+        while self.pending and time.time() < deadline:
+            self.pending.pop(0)()
+            time.sleep(0.001)
+
+
+def _fake_info(path):
+    return {'path': path, 'filename': os.path.basename(path), 'size': (4, 3),
+            'mode': 'RGB', 'format': 'JPEG', 'file_size': 1}
+
+
+def test_results_arrive_in_batches():
+    """结果分批交给界面线程，结束时报告总数"""
+    loop = ManualLoop()
+    batches, finished = [], []
+    job = ImportJob(loop, (f'{i}.jpg' for i in range(25)), _fake_info,
+                    lambda batch: batches.append(batch) or len(batch),
+                    lambda count, cancelled: finished.append((count, cancelled)),
+                    batch_size=10)
+    job.start()
+    loop.run()
+
+    assert finished == [(25, False)]
+    assert all(len(batch) <= 10 for batch in batches)
+    assert [path for batch in batches for path, _ in batch] == [f'{i}.jpg' for i in range(25)]
+    assert job.finished and not job.poll()
+
+
+def test_cancel_stops_walking():
+    """取消后不再消费路径，已取回的结果保留"""
+    loop = ManualLoop()
+    release = threading.Event()
+    consumed = []
+
+    def slow_paths():
+        for i in range(1000):
+            consumed.append(i)
+            if i == 5:
+                release.wait(5)
+            yield f'{i}.jpg'
+
+    finished = []
+    job = ImportJob(loop, slow_paths(), _fake_info, len,
+                    lambda count, cancelled: finished.append((count, cancelled)))
+    job.start()
+    while len(consumed) < 6:
+        time.sleep(0.001)
+    loop.pending.pop(0)()
+    job.cancel()
+    release.set()
+    loop.run()
+
+    assert finished == [(5, True)]
+    assert len(consumed) <= 7
+
+
+def test_add_images_notifies_once_and_skips_duplicates():
+    """批量添加只通知一次，已在列表中的图片被跳过"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        original_cache = exif_text_watermark.exif_cache
+        exif_text_watermark.exif_cache = ExifMetadataCache(
+            load_exif_metadata, os.path.join(temp_dir, 'exif_cache.db'))
+        index = LibraryIndex(os.path.join(temp_dir, 'library.db'), os.path.join(temp_dir, 'thumbnails'))
+        try:
+            paths = [os.path.join(temp_dir, f'{i}.jpg') for i in range(4)]
+            for path in paths:
+                Image.new('RGB', (40, 30), (90, 90, 90)).save(path, 'JPEG')
+
+            manager = ImageListManager(index)
+            events = []
+            manager.add_callback(lambda event, data: events.append(event))
+            file_manager = ImageFileManager()
+            assert manager.add_image(paths[0])
+            assert manager.add_images([(p, file_manager.get_image_info(p)) for p in paths]) == 3
+
+            assert [d['path'] for d in manager.get_image_list()] == paths
+            assert events.count('images_added') == 1
+            assert manager.add_images([(paths[1], file_manager.get_image_info(paths[1]))]) == 0
+
+            # 先等待后台任务完成再关闭，避免取消尚未开始的任务
+            for executor in (manager._metadata_executor, manager._thumbnail_executor):
+                executor.shutdown(wait=True)
+            manager.cancel_metadata_prefetch()
+        finally:
+            exif_text_watermark.exif_cache.close()
+            exif_text_watermark.exif_cache = original_cache
+            index.close()
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+图片库索引测试：未变化的文件直接使用索引，文件变化后重新读取
+"""
+
+import sys
+import os
+import tempfile
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+from components import file_manager as file_manager_module
+from components import library_index as library_index_module
+from components.file_manager import ImageFileManager
+from components.library_index import LibraryIndex
+
+
+def _make_index(temp_dir):
+    return LibraryIndex(os.path.join(temp_dir, 'library.db'), os.path.join(temp_dir, 'thumbnails'))
+
+
+def _save(path, size=(40, 30)):
+    Image.new('RGB', size, (10, 120, 200)).save(path)
+    return path
+
+
+def test_unchanged_file_reuses_index():
+    """第二次读取同一文件不再读取文件头，重新打开数据库后依然有效"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = _save(os.path.join(temp_dir, 'a.png'))
+        index = _make_index(temp_dir)
+        info = index.get_image_info(path)
+        assert info['size'] == (40, 30) and info['format'] == 'PNG' and info['exif_date'] is None
+        index.close()
+
+        original = library_index_module.probe_image
+        library_index_module.probe_image = None  # 命中索引时不应调用
+        try:
+            index = _make_index(temp_dir)
+            cached = index.get_image_info(path)
+            assert index.is_unchanged(path)
+            index.close()
+        finally:
+            library_index_module.probe_image = original
+
+        assert cached == info
+        assert index.get_stats() == {'hits': 1, 'misses': 0}
+
+
+def test_changed_file_is_probed_again():
+    """文件大小或修改时间变化后重新读取，旧缩略图被删除"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = _save(os.path.join(temp_dir, 'a.png'))
+        index = _make_index(temp_dir)
+        index.get_image_info(path)
+        index.store_thumbnail(path, Image.new('RGB', (8, 6)))
+        thumbnail_files = os.listdir(index.thumbnail_dir)
+        assert len(thumbnail_files) == 1
+
+        _save(path, size=(64, 48))
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert not index.is_unchanged(path)
+        assert index.load_thumbnail(path) is None
+
+        info = index.get_image_info(path)
+        assert info['size'] == (64, 48)
+        assert index.get_stats()['misses'] == 2
+        assert os.listdir(index.thumbnail_dir) == []
+        index.close()
+
+
+def test_thumbnail_and_exif_date_round_trip():
+    """缩略图和拍摄日期保存后可在下次启动时读回"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = _save(os.path.join(temp_dir, 'a.png'))
+        index = _make_index(temp_dir)
+        index.get_image_info(path)
+        thumbnail = Image.new('RGB', (8, 6), (1, 2, 3))
+        index.store_thumbnail(path, thumbnail)
+        index.set_exif_date(path, '2023-05-01')
+        index.close()
+
+        index = _make_index(temp_dir)
+        loaded = index.load_thumbnail(path)
+        assert loaded.size == (8, 6) and loaded.getpixel((0, 0)) == (1, 2, 3)
+        assert index.get_image_info(path)['exif_date'] == '2023-05-01'
+        index.close()
+
+
+def test_session_round_trip():
+    """会话列表按顺序保存，再次保存时覆盖"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index = _make_index(temp_dir)
+        assert index.load_session() == []
+        index.save_session(['/b.png', '/a.png', '/c.png'])
+        index.close()
+
+        index = _make_index(temp_dir)
+        assert index.load_session() == ['/b.png', '/a.png', '/c.png']
+        index.save_session(['/a.png'])
+        assert index.load_session() == ['/a.png']
+        index.close()
+
+
+def test_scan_folder_skips_sniff_for_indexed_files():
+    """遍历文件夹时已索引且未变化的文件不再读取文件头"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        folder = os.path.join(temp_dir, 'images')
+        os.makedirs(folder)
+        indexed = _save(os.path.join(folder, 'indexed.png'))
+        new = _save(os.path.join(folder, 'new.png'))
+        index = _make_index(temp_dir)
+        index.get_image_info(indexed)
+
+        sniffed = []
+        original = file_manager_module.sniff_image_format
+
+        def sniff(path):
+            sniffed.append(path)
+            return original(path)
+
+        file_manager_module.sniff_image_format = sniff
+        try:
+            found = list(ImageFileManager().scan_folder(folder, index))
+        finally:
+            file_manager_module.sniff_image_format = original
+        index.close()
+
+        assert found == [indexed, new]
+        assert sniffed == [new]
+
+
+def test_load_session_prunes_missing_files():
+    """读取会话时删除已不存在的文件的记录和缩略图，以及无记录引用的缩略图"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        kept = _save(os.path.join(temp_dir, 'kept.png'))
+        removed = _save(os.path.join(temp_dir, 'removed.png'))
+        index = _make_index(temp_dir)
+        for path in (kept, removed):
+            index.get_image_info(path)
+            index.store_thumbnail(path, Image.new('RGB', (8, 6)))
+        orphan = os.path.join(index.thumbnail_dir, 'orphan.png')
+        Image.new('RGB', (8, 6)).save(orphan)
+        index.save_session([kept, removed])
+        assert len(os.listdir(index.thumbnail_dir)) == 3
+
+        os.remove(removed)
+        assert index.load_session() == [kept, removed]
+        assert len(os.listdir(index.thumbnail_dir)) == 1
+        assert index.load_thumbnail(kept) is not None
+        assert index.is_unchanged(kept) and not index.is_unchanged(removed)
+        index.close()
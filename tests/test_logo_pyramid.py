@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+图片水印金字塔测试
+"""
+
+import sys
+import os
+import tempfile
+from PIL import Image, ImageChops, ImageStat
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+from components.image_watermark import ImageWatermark
+from utils.image_utils import build_pyramid, select_pyramid_level
+
+
+def _make_logo(size) -> Image.Image:
+    logo = Image.radial_gradient('L').resize(size).convert('RGBA')
+    logo.putalpha(Image.linear_gradient('L').resize(size))
+    return logo
+
+
+def test_pyramid_halves_each_level():
+    """每一层是上一层的一半，最小层级不小于下限"""
+    logo = _make_logo((1000, 600))
+    pyramid = build_pyramid(logo, min_side=64)
+
+    assert pyramid[0] is logo
+    assert [level.size for level in pyramid] == [(1000, 600), (500, 300), (250, 150), (125, 75)]
+    assert all(level.mode == 'RGBA' for level in pyramid)
+
+
+def test_pyramid_drops_oversized_levels():
+    """超过上限的层级（包括原图）不会保留"""
+    pyramid = build_pyramid(_make_logo((1000, 600)), max_side=300, min_side=64)
+    assert [level.size for level in pyramid] == [(250, 150), (125, 75)]
+
+
+def test_select_nearest_larger_level():
+    """选择不小于目标尺寸的最小层级"""
+    pyramid = build_pyramid(_make_logo((1000, 600)), min_side=64)
+    assert select_pyramid_level(pyramid, (200, 100)).size == (250, 150)
+    assert select_pyramid_level(pyramid, (250, 151)).size == (500, 300)
+    assert select_pyramid_level(pyramid, (2000, 1000)).size == (1000, 600)
+
+
+def test_large_logo_released_and_scaled_from_pyramid():
+    """大尺寸水印只保留金字塔层级，缩放结果与直接从原图缩放基本一致"""
+    logo = _make_logo((6000, 3000))
+    watermark = ImageWatermark()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        logo_path = os.path.join(temp_dir, 'logo.png')
+        logo.save(logo_path)
+        assert watermark.load_watermark_image(logo_path)
+
+    assert watermark.watermark_size == (6000, 3000)
+    assert max(watermark.watermark_image.size) <= 4096
+
+    image = Image.new('RGB', (1600, 1200), (255, 255, 255))
+    result = watermark.apply_to_image(image)
+
+    # 参考结果：直接从原图缩放
+    logo_size = watermark._calculate_watermark_size(image.size)
+    reference = logo.resize(logo_size, Image.Resampling.LANCZOS)
+    reference.putalpha(reference.getchannel('A').point(lambda x: int(x * 204 / 255)))
+    expected = image.convert('RGBA')
+    expected.paste(reference, watermark._calculate_position(image.size, logo_size), reference)
+
+    diff = ImageStat.Stat(ImageChops.difference(result, expected)).mean
+    assert max(diff) < 1.0
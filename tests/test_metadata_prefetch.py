@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+导入时后台预读EXIF元数据测试
+"""
+
+import sys
+import os
+import tempfile
+from PIL import Image, ImageChops
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+import piexif
+from components import exif_text_watermark
+from components.exif_cache import ExifMetadataCache
+from components.exif_text_watermark import ExifTextWatermark, load_exif_metadata
+from components.image_list import ImageListManager
+from components.library_index import LibraryIndex
+
+
+def _save_photo(path, date=b'2021:07:04 10:00:00'):
+    exif = {'0th': {piexif.ImageIFD.Model: b'TestCam'}, 'Exif': {piexif.ExifIFD.DateTimeOriginal: date}}
+    Image.new('RGB', (64, 48), (90, 90, 90)).save(path, 'JPEG', exif=piexif.dump(exif))
+
+
+def test_metadata_prefetched_on_import():
+    """添加图片后在后台填充EXIF元数据并通知回调"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        original_cache = exif_text_watermark.exif_cache
+        exif_text_watermark.exif_cache = ExifMetadataCache(
+            load_exif_metadata, os.path.join(temp_dir, 'exif_cache.db'))
+        index = LibraryIndex(os.path.join(temp_dir, 'library.db'), os.path.join(temp_dir, 'thumbnails'))
+        try:
+            paths = [os.path.join(temp_dir, f'{i}.jpg') for i in range(3)]
+            for path in paths:
+                _save_photo(path)
+
+            manager = ImageListManager(index)
+            loaded = []
+            manager.add_callback(lambda event, data: event == 'metadata_loaded' and loaded.append(data['path']))
+            for path in paths:
+                assert manager.add_image(path)
+
+            # 先等待后台任务完成再关闭，避免取消尚未开始的预读
+            for executor in (manager._metadata_executor, manager._thumbnail_executor):
+                executor.shutdown(wait=True)
+            manager.cancel_metadata_prefetch()
+        finally:
+            exif_text_watermark.exif_cache.close()
+            exif_text_watermark.exif_cache = original_cache
+            index.close()
+
+    assert sorted(loaded) == sorted(paths)
+    for image_data in manager.get_image_list():
+        assert image_data['exif']['date'] == '2021-07-04'
+        assert image_data['exif']['model'] == 'TestCam'
+
+
+def test_render_uses_prefetched_metadata():
+    """提供预读的元数据时不再读取EXIF"""
+    watermark = ExifTextWatermark()
+    image = Image.new('RGB', (320, 240), (60, 60, 60))
+
+    opened = []
+    original = exif_text_watermark.extract_date_from_exif
+    exif_text_watermark.extract_date_from_exif = lambda path: opened.append(path)
+    try:
+        result = watermark.apply_to_image(image, '/nonexistent/photo.jpg', metadata={'date': '2021-07-04'})
+    finally:
+        exif_text_watermark.extract_date_from_exif = original
+
+    assert opened == []
+    assert watermark.generate_watermark_text(metadata={'date': '2021-07-04'}) == '2021-07-04'
+
+    # 与从图片自带EXIF读取日期的结果一致
+    image.getexif()[0x9003] = '2021:07:04 10:00:00'
+    expected = watermark.apply_to_image(image)
+    assert ImageChops.difference(result, expected).getbbox() is None
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+描边绘制引擎测试
+"""
+
+import sys
+import os
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+from components import text_effects
+from components.text_effects import draw_outlined_text, create_outline_mask
+
+FILL = (255, 255, 255, 255)
+OUTLINE = (255, 0, 0, 255)
+
+
+def _load_font(size: int = 40) -> ImageFont.ImageFont:
+    """加载可描边的测试字体"""
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def _render(font, width: int, softness: int = 0) -> Image.Image:
+    """在透明画布上绘制带描边文本"""
+    canvas = Image.new('RGBA', (300, 120), (0, 0, 0, 0))
+    draw_outlined_text(ImageDraw.Draw(canvas), (40, 30), "Ag8", font, FILL, OUTLINE, width, softness)
+    return canvas
+
+
+def _count_color(image: Image.Image, color) -> int:
+    """统计指定颜色的像素数量"""
+    colors = image.getcolors(image.width * image.height)
+    return sum(count for count, value in colors if value == color)
+
+
+def test_outline_grows_with_width():
+    """描边覆盖范围随宽度增大，主文本保持在上层"""
+    font = _load_font()
+    previous = 0
+    for width in (1, 3, 6, text_effects.MAX_STROKE_WIDTH + 2):
+        canvas = _render(font, width)
+        outline_pixels = _count_color(canvas, OUTLINE)
+        assert outline_pixels > previous, f"描边宽度 {width} 未扩大描边区域"
+        assert _count_color(canvas, FILL) > 0, "主文本应绘制在描边之上"
+        previous = outline_pixels
+
+
+def test_zero_width_draws_plain_text():
+    """描边宽度为0时只绘制文本"""
+    canvas = _render(_load_font(), 0)
+    assert _count_color(canvas, OUTLINE) == 0
+    assert _count_color(canvas, FILL) > 0
+
+
+def test_dilation_mask_covers_text():
+    """膨胀遮罩完整覆盖文本并向外扩展描边宽度"""
+    font = _load_font()
+    text_mask = Image.new('L', (300, 120), 0)
+    ImageDraw.Draw(text_mask).text((40, 30), "Ag8", font=font, fill=255)
+    
+    mask, (offset_x, offset_y) = create_outline_mask("Ag8", font, 4)
+    outline_canvas = Image.new('L', (300, 120), 0)
+    outline_canvas.paste(mask, (40 + offset_x, 30 + offset_y))
+    
+    text_box = text_mask.getbbox()
+    outline_box = outline_canvas.getbbox()
+    assert outline_box[0] == text_box[0] - 4 and outline_box[1] == text_box[1] - 4
+    assert outline_box[2] == text_box[2] + 4 and outline_box[3] == text_box[3] + 4
+    # 文本覆盖的像素在遮罩中不应更弱
+    assert ImageChops.subtract(text_mask, outline_canvas).getbbox() is None
+
+
+def test_bitmap_font_falls_back_to_dilation():
+    """不支持原生描边的位图字体使用膨胀遮罩"""
+    if not hasattr(ImageFont, 'load_default_imagefont'):
+        return
+    font = ImageFont.load_default_imagefont()
+    assert not text_effects.supports_stroke(font)
+    
+    canvas = _render(font, 2)
+    assert _count_color(canvas, OUTLINE) > 0
+    assert _count_color(canvas, FILL) > 0
+
+
+def test_soft_outline_has_partial_alpha():
+    """柔和描边边缘产生半透明过渡"""
+    canvas = _render(_load_font(), 3, softness=2)
+    colors = canvas.getcolors(canvas.width * canvas.height)
+    assert any(value[:3] == OUTLINE[:3] and 0 < value[3] < 255 for _, value in colors)
+
+
+if __name__ == "__main__":
+    test_outline_grows_with_width()
+    test_zero_width_draws_plain_text()
+    test_dilation_mask_covers_text()
+    test_bitmap_font_falls_back_to_dilation()
+    test_soft_outline_has_partial_alpha()
+    print("[OK] Text effects tests passed")
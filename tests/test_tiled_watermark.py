@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+平铺水印模式测试
+"""
+
+import sys
+import os
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+from components.text_watermark import TextWatermark
+from components.watermark_cache import WatermarkTileCache
+from utils.image_utils import blend_tile
+
+
+def _make_tiled_watermark(angle=30, spacing=40, stagger=0.5) -> TextWatermark:
+    """创建平铺模式的文本水印"""
+    watermark = TextWatermark()
+    watermark.tile_cache = WatermarkTileCache(max_size=8)
+    watermark.rotation_cache = WatermarkTileCache(max_size=8)
+    watermark.set_text("© Stock Photo")
+    watermark.set_font_size(28)
+    watermark.set_angle(angle)
+    watermark.set_position("tiled")
+    watermark.set_tiling(spacing=spacing, stagger=stagger)
+    return watermark
+
+
+def _naive_tiled(watermark: TextWatermark, image: Image.Image) -> Image.Image:
+    """逐个水印块合成的参考实现"""
+    tile, _ = watermark.create_watermark_tile(image.size)
+    result = image.convert('RGBA')
+    width, height = image.size
+    step_x = tile.width + watermark.tile_spacing
+    step_y = tile.height + watermark.tile_spacing
+    origin_x = (width - tile.width) // 2
+    origin_y = (height - tile.height) // 2
+    
+    for row in range(-height // step_y - 2, height // step_y + 2):
+        y = origin_y + row * step_y
+        offset_x = origin_x + int(round(row * watermark.tile_stagger * step_x))
+        for col in range(-width // step_x - 2, width // step_x + 2):
+            blend_tile(result, tile, (offset_x + col * step_x, y))
+    return result
+
+
+def test_tiled_matches_naive_placement():
+    """平铺结果与逐个放置水印块的结果一致"""
+    image = Image.new('RGB', (640, 480), (90, 120, 150))
+    for angle, spacing, stagger in ((30, 40, 0.5), (0, 10, 0.0), (-45, 0, 0.25)):
+        watermark = _make_tiled_watermark(angle, spacing, stagger)
+        result = watermark.apply_to_image(image)
+        expected = _naive_tiled(watermark, image)
+        assert result.tobytes() == expected.tobytes(), f"平铺结果不一致: {angle}, {spacing}, {stagger}"
+
+
+def test_tiled_covers_whole_image():
+    """平铺水印覆盖图片的各个区域，文本只渲染一次"""
+    image = Image.new('RGB', (800, 600), (0, 0, 0))
+    watermark = _make_tiled_watermark()
+    result = watermark.apply_to_image(image)
+    
+    for box in ((0, 0, 400, 300), (400, 0, 800, 300), (0, 300, 400, 600), (400, 300, 800, 600)):
+        assert result.crop(box).convert('L').getbbox() is not None, f"区域 {box} 没有水印"
+    assert watermark.tile_cache.get_stats()['misses'] == 1
+
+
+def test_custom_position_overrides_tiling():
+    """拖拽得到的自定义位置优先于平铺模式"""
+    watermark = _make_tiled_watermark(angle=0)
+    assert watermark.is_tiled()
+    watermark.set_custom_position((10, 10))
+    assert not watermark.is_tiled()
+    
+    watermark.set_position("tiled")
+    assert watermark.is_tiled()
+
+
+def test_tiling_settings_persist():
+    """平铺设置可保存到模板并恢复"""
+    watermark = _make_tiled_watermark(spacing=120, stagger=0.3)
+    restored = TextWatermark()
+    restored.load_from_dict(watermark.get_watermark_info())
+    
+    assert restored.position == "tiled"
+    assert restored.tile_spacing == 120
+    assert restored.tile_stagger == 0.3
+    
+    restored.set_tiling(spacing=-5, stagger=2)
+    assert restored.tile_spacing == 0 and restored.tile_stagger == 1.0
+
+
+if __name__ == "__main__":
+    test_tiled_matches_naive_placement()
+    test_tiled_covers_whole_image()
+    test_custom_position_overrides_tiling()
+    test_tiling_settings_persist()
+    print("[OK] Tiled watermark tests passed")
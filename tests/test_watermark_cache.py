@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+水印渲染缓存测试
+"""
+
+import sys
+import os
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+from components.text_watermark import TextWatermark
+from components.watermark_cache import WatermarkTileCache
+
+
+def test_cache_counters_and_bound():
+    """命中/未命中计数和容量上限"""
+    cache = WatermarkTileCache(max_size=2)
+    
+    assert cache.get('a') is None
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    
+    # 'b' 最久未使用，应被淘汰
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    
+    stats = cache.get_stats()
+    assert stats == {'hits': 3, 'misses': 2, 'size': 2, 'max_size': 2}
+    
+    cache.clear()
+    assert len(cache) == 0 and cache.get_stats()['hits'] == 0
+
+
+def test_tile_reused_across_batch():
+    """同一设置下批量处理只渲染一次水印块"""
+    watermark = TextWatermark()
+    watermark.tile_cache = WatermarkTileCache(max_size=8)
+    watermark.set_text("Batch")
+    watermark.set_shadow(True)
+    
+    sizes = [(400, 300), (800, 600), (1200, 900), (400, 300)]
+    tiles = [watermark.create_watermark_tile(size)[0] for size in sizes]
+    
+    assert all(tile is tiles[0] for tile in tiles), "不同尺寸图片应复用同一个水印块"
+    assert watermark.tile_cache.get_stats()['misses'] == 1
+    assert watermark.tile_cache.get_stats()['hits'] == len(sizes) - 1
+
+
+def test_settings_change_invalidates():
+    """影响渲染的设置变化后重新渲染"""
+    watermark = TextWatermark()
+    watermark.tile_cache = WatermarkTileCache(max_size=8)
+    watermark.rotation_cache = WatermarkTileCache(max_size=8)
+    watermark.set_text("Settings")
+    first, _ = watermark.create_watermark_tile((400, 300))
+    
+    for change in (lambda: watermark.set_color("#FF0000"),
+                   lambda: watermark.set_font_size(40),
+                   lambda: watermark.set_outline(True, "#000000", 2),
+                   lambda: watermark.set_angle(15)):
+        change()
+        tile, _ = watermark.create_watermark_tile((400, 300))
+        assert tile is not first
+        first = tile
+    
+    # 位置不影响水印块本身
+    watermark.set_position("top_left")
+    tile, position = watermark.create_watermark_tile((400, 300))
+    assert tile is first
+
+
+def test_rotation_reuses_base_tile():
+    """调整旋转角度时只旋转缓存的水印块，不重新绘制文本"""
+    watermark = TextWatermark()
+    watermark.tile_cache = WatermarkTileCache(max_size=8)
+    watermark.rotation_cache = WatermarkTileCache(max_size=8)
+    watermark.set_text("Rotate")
+    
+    # 模拟拖动旋转滑块
+    for angle in (0, 10, 20, 30, 20, 10):
+        watermark.set_angle(angle)
+        watermark.create_watermark_tile((800, 600))
+    
+    assert watermark.tile_cache.get_stats()['misses'] == 1, "文本只应绘制一次"
+    rotation_stats = watermark.rotation_cache.get_stats()
+    assert rotation_stats['misses'] == 3 and rotation_stats['hits'] == 2
+    
+    # 批量导出时复用旋转后的水印块
+    watermark.set_angle(30)
+    first, _ = watermark.create_watermark_tile((800, 600))
+    second, _ = watermark.create_watermark_tile((4000, 3000))
+    assert first is second
+
+
+def test_rotation_cache_is_optional():
+    """禁用旋转缓存时结果不变"""
+    image = Image.new('RGB', (400, 300), 'white')
+    cached = TextWatermark()
+    cached.rotation_cache = WatermarkTileCache(max_size=8)
+    uncached = TextWatermark()
+    uncached.rotation_cache = None
+    for watermark in (cached, uncached):
+        watermark.set_text("Optional")
+        watermark.set_angle(45)
+    
+    assert cached.apply_to_image(image).tobytes() == uncached.apply_to_image(image).tobytes()
+
+
+def test_cached_result_matches_uncached():
+    """缓存命中时的结果与首次渲染一致"""
+    watermark = TextWatermark()
+    watermark.tile_cache = WatermarkTileCache(max_size=8)
+    watermark.set_text("Same")
+    image = Image.new('RGB', (300, 200), 'white')
+    
+    first = watermark.apply_to_image(image)
+    second = watermark.apply_to_image(image)
+    assert first.tobytes() == second.tobytes()
+
+
+if __name__ == "__main__":
+    test_cache_counters_and_bound()
+    test_tile_reused_across_batch()
+    test_settings_change_invalidates()
+    test_rotation_reuses_base_tile()
+    test_rotation_cache_is_optional()
+    test_cached_result_matches_uncached()
+    print("[OK] Watermark cache tests passed")
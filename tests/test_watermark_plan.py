@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+水印渲染计划测试
+"""
+
+import sys
+import os
+import pickle
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageChops
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+from components.text_watermark import TextWatermark
+from components.image_watermark import ImageWatermark
+from components.exif_text_watermark import ExifTextWatermark
+from components.watermark_cache import WatermarkTileCache
+from components.watermark_plan import WatermarkPlan, TextWatermarkPlan
+
+
+def _same_pixels(a: Image.Image, b: Image.Image) -> bool:
+    return a.size == b.size and ImageChops.difference(a, b).getbbox() is None
+
+
+def _make_text_watermark() -> TextWatermark:
+    watermark = TextWatermark()
+    watermark.tile_cache = WatermarkTileCache(max_size=8)
+    watermark.rotation_cache = WatermarkTileCache(max_size=8)
+    watermark.set_text("Plan 水印")
+    watermark.set_angle(20)
+    watermark.set_shadow(True)
+    return watermark
+
+
+def test_text_plan_matches_apply_and_survives_pickle():
+    """文本水印计划的渲染结果与直接应用一致，序列化后结果不变"""
+    image = Image.new('RGB', (480, 320), (40, 80, 120))
+    watermark = _make_text_watermark()
+
+    plan = watermark.compile()
+    assert isinstance(plan, TextWatermarkPlan)
+    expected = watermark.apply_to_image(image)
+    assert _same_pixels(plan.render(image), expected)
+
+    restored = pickle.loads(pickle.dumps(plan))
+    assert _same_pixels(restored.render(image), expected)
+
+
+def test_plan_is_immutable_and_detached_from_settings():
+    """计划不可修改，编译后修改水印设置不影响已有计划"""
+    image = Image.new('RGB', (300, 200), (0, 0, 0))
+    watermark = _make_text_watermark()
+    plan = watermark.compile()
+    before = plan.render(image)
+
+    try:
+        plan.tile = None
+        assert False, "plan should be immutable"
+    except AttributeError:
+        pass
+
+    watermark.set_text("Changed")
+    watermark.set_position("top_left")
+    assert _same_pixels(plan.render(image), before)
+    assert isinstance(plan, WatermarkPlan)
+
+
+def test_plan_render_does_not_modify_input():
+    """渲染返回新图片，传入的RGBA图片保持不变"""
+    image = Image.new('RGBA', (200, 120), (10, 20, 30, 255))
+    original = image.copy()
+    _make_text_watermark().compile().render(image)
+    assert _same_pixels(image, original)
+
+
+def test_plan_shared_across_threads():
+    """同一计划可在多个线程中并发渲染"""
+    watermark = _make_text_watermark()
+    watermark.set_position("tiled")
+    plan = watermark.compile()
+    images = [Image.new('RGB', (320 + i * 10, 240), (i * 20, 0, 0)) for i in range(8)]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(plan.render, images))
+
+    for image, result in zip(images, results):
+        assert _same_pixels(result, watermark.apply_to_image(image))
+
+
+def test_image_plan_matches_apply_and_survives_pickle():
+    """图片水印计划与直接应用一致，未加载水印图片时不生成计划"""
+    watermark = ImageWatermark()
+    assert watermark.compile() is None
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        logo_path = os.path.join(temp_dir, 'logo.png')
+        Image.new('RGBA', (120, 60), (255, 0, 0, 200)).save(logo_path)
+        assert watermark.load_watermark_image(logo_path)
+    watermark.set_transparency(50)
+    watermark.set_position("top_left")
+
+    image = Image.new('RGB', (640, 480), (255, 255, 255))
+    plan = pickle.loads(pickle.dumps(watermark.compile()))
+    assert _same_pixels(plan.render(image), watermark.apply_to_image(image))
+
+
+def test_exif_plan_generates_text_per_image():
+    """EXIF水印计划在渲染时按图片路径生成文本，序列化后可继续使用"""
+    watermark = ExifTextWatermark()
+    watermark.set_prefix_suffix("Shot ", "")
+    watermark.outline = True
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = os.path.join(temp_dir, 'photo.jpg')
+        image = Image.new('RGB', (400, 300), (90, 90, 90))
+        image.save(image_path)
+
+        plan = pickle.loads(pickle.dumps(watermark.compile()))
+        result = plan.render(image, image_path)
+        assert _same_pixels(result, watermark.apply_to_image_with_path(image, image_path))
+        assert not _same_pixels(result, image.convert('RGBA'))
+
+    # 不允许使用文件时间且无EXIF日期时返回原图
+    watermark.fallback_to_file_time = False
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = os.path.join(temp_dir, 'photo.jpg')
+        image.save(image_path)
+        assert watermark.compile().render(image, image_path) is image
+
+
+def test_exif_plan_reused_until_settings_change():
+    """设置不变时复用已编译的计划，通过 set_*、load_from_dict 或直接赋值修改设置后重新编译"""
+    watermark = ExifTextWatermark()
+    plan = watermark.compile()
+    image = Image.new('RGB', (200, 100), (90, 90, 90))
+    watermark.apply_to_image(image, metadata={'date': '2021-07-04'})
+    assert watermark.compile() is plan
+
+    watermark.set_font_size(30)
+    resized = watermark.compile()
+    assert resized is not plan and resized.font_size == 30
+
+    watermark.outline = True
+    outlined = watermark.compile()
+    assert outlined is not resized and outlined.outline_color is not None
+
+    watermark.load_from_dict({'font_size': 40})
+    assert watermark.compile().font_size == 40
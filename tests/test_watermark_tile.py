@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+水印块渲染测试
+验证文本水印只渲染和合成边界框大小的区域
+"""
+
+import sys
+import os
+from PIL import Image
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(os.path.dirname(current_dir), 'src')
+sys.path.insert(0, src_dir)
+
+from components.text_watermark import TextWatermark
+from utils.image_utils import blend_tile
+
+
+def _make_watermark(**kwargs) -> TextWatermark:
+    """创建测试用文本水印"""
+    watermark = TextWatermark()
+    watermark.set_text(kwargs.get('text', "Tile Test"))
+    watermark.set_font_size(kwargs.get('font_size', 32))
+    watermark.set_position(kwargs.get('position', 'bottom_right'))
+    watermark.set_shadow(kwargs.get('shadow', False))
+    watermark.set_outline(kwargs.get('outline', False), "#000000", kwargs.get('outline_width', 1))
+    watermark.set_angle(kwargs.get('angle', 0))
+    return watermark
+
+
+def test_tile_is_smaller_than_image():
+    """水印块尺寸与文本相关，与图片尺寸无关"""
+    watermark = _make_watermark(shadow=True, outline=True, outline_width=2)
+    
+    small_tile, _ = watermark.create_watermark_tile((400, 300))
+    large_tile, large_pos = watermark.create_watermark_tile((6000, 4000))
+    
+    assert small_tile.size == large_tile.size, "水印块尺寸不应随图片变化"
+    assert large_tile.width < 6000 and large_tile.height < 4000
+    assert 0 <= large_pos[0] < 6000 and 0 <= large_pos[1] < 4000
+
+
+def test_apply_matches_full_canvas_composite():
+    """区域合成结果与整图合成结果一致"""
+    image = Image.new('RGB', (400, 300), 'lightblue')
+    for kwargs in ({}, {'shadow': True}, {'outline': True, 'outline_width': 2},
+                   {'position': 'center', 'angle': 30}):
+        watermark = _make_watermark(**kwargs)
+        
+        full_canvas = watermark.create_watermark_image(image.size)
+        assert full_canvas.size == image.size
+        expected = Image.alpha_composite(image.convert('RGBA'), full_canvas)
+        
+        result = watermark.apply_to_image(image)
+        assert result.mode == 'RGBA'
+        assert result.tobytes() == expected.tobytes(), f"合成结果不一致: {kwargs}"
+
+
+def test_apply_does_not_modify_source():
+    """应用水印不修改传入的RGBA图片"""
+    image = Image.new('RGBA', (200, 150), (10, 20, 30, 255))
+    original = image.tobytes()
+    
+    result = _make_watermark(position='center').apply_to_image(image)
+    
+    assert result is not image
+    assert image.tobytes() == original
+
+
+def test_blend_tile_clips_to_image():
+    """超出图片边界的水印块只合成可见部分"""
+    image = Image.new('RGBA', (50, 40), (0, 0, 0, 255))
+    tile = Image.new('RGBA', (20, 20), (255, 0, 0, 255))
+    
+    blend_tile(image, tile, (-10, 30))
+    assert image.getpixel((0, 30)) == (255, 0, 0, 255)
+    assert image.getpixel((9, 39)) == (255, 0, 0, 255)
+    assert image.getpixel((10, 30)) == (0, 0, 0, 255)
+    assert image.getpixel((0, 29)) == (0, 0, 0, 255)
+    
+    # 完全在图片外的水印块不做任何处理
+    before = image.tobytes()
+    blend_tile(image, tile, (100, 100))
+    assert image.tobytes() == before
+
+
+if __name__ == "__main__":
+    test_tile_is_smaller_than_image()
+    test_apply_matches_full_canvas_composite()
+    test_apply_does_not_modify_source()
+    test_blend_tile_clips_to_image()
+    print("[OK] Watermark tile tests passed")